@@ -28,8 +28,11 @@ load_dotenv()
 
 # Imports locaux
 from backend.config import get_config
-from backend.models import db, migrate, init_db
+from backend.models import db, init_db
 from backend.utils.decorators import owner_or_above_required
+from backend.utils.assets import init_assets
+from backend.utils.metrics import init_metrics
+from backend.utils.http_cache import init_http_cache
 
 # Initialiser Flask-Login
 login_manager = LoginManager()
@@ -59,6 +62,15 @@ def create_app():
     # Initialiser la base de données
     init_db(app)
     
+    # Fichiers statiques à empreinte (cache immuable) et service worker généré
+    init_assets(app)
+    
+    # Nombre de requêtes SQL et latences par endpoint (/metrics, Server-Timing)
+    init_metrics(app)
+    
+    # Compression des réponses et GET conditionnels (ETag / 304)
+    init_http_cache(app)
+    
     # Initialiser Flask-Login
     login_manager.init_app(app)
     login_manager.login_view = 'login_page'  # type: ignore
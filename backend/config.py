@@ -12,6 +12,73 @@ www.myoneart.com
 import os
 from datetime import timedelta
 
+
+def web_concurrency():
+    """Nombre de workers gunicorn (WEB_CONCURRENCY, par défaut 2 × CPU + 1)"""
+    return int(os.getenv('WEB_CONCURRENCY', 0)) or (os.cpu_count() or 1) * 2 + 1
+
+
+def worker_class():
+    """
+    Modèle de workers gunicorn (GUNICORN_WORKER_CLASS)
+
+    Par défaut gevent : chaque participant au direct d'une AG garde un flux
+    SSE ouvert, qu'un worker gevent sert sans immobiliser un thread ;
+    gthread si le direct est désactivé (LIVE_EVENTS_BROKER=none).
+    """
+    default = 'gthread' if os.getenv('LIVE_EVENTS_BROKER') == 'none' else 'gevent'
+    return os.getenv('GUNICORN_WORKER_CLASS', default)
+
+
+def worker_concurrency():
+    """Requêtes traitées simultanément par un worker (threads gthread ou connexions gevent)"""
+    if worker_class() == 'gevent':
+        return int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 1000))
+    return int(os.getenv('GUNICORN_THREADS', 8))
+
+
+def build_engine_options(database_url):
+    """
+    Options du moteur SQLAlchemy
+
+    Sur PostgreSQL, le pool de chaque processus est dimensionné pour ses
+    threads (requêtes + envoi des emails + traitement des images), dans la
+    limite de DB_MAX_CONNECTIONS réparties entre les WEB_CONCURRENCY
+    workers ; les instructions et transactions inactives trop longues sont
+    interrompues par le serveur.
+
+    Args:
+        database_url: URL de la base de données
+
+    Returns:
+        dict: Options passées à create_engine
+    """
+    options = {
+        'pool_pre_ping': True,
+        'pool_recycle': 300,
+    }
+    if not database_url.startswith('postgres'):
+        return options
+
+    threads = worker_concurrency() + int(os.getenv('MAIL_WORKERS', 2)) + int(os.getenv('IMAGE_WORKERS', 2))
+    available = int(os.getenv('DB_MAX_CONNECTIONS', 100)) - int(os.getenv('DB_RESERVED_CONNECTIONS', 10))
+    per_worker = max(2, available // web_concurrency())
+    pool_size = int(os.getenv('DB_POOL_SIZE', 0)) or min(threads, per_worker)
+    max_overflow = os.getenv('DB_MAX_OVERFLOW')
+
+    options.update({
+        'pool_size': pool_size,
+        'max_overflow': int(max_overflow) if max_overflow else max(0, per_worker - pool_size),
+        'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', 10)),  # secondes d'attente d'une connexion libre
+        'connect_args': {
+            'connect_timeout': 10,
+            'options': (f"-c statement_timeout={int(os.getenv('DB_STATEMENT_TIMEOUT', 30000))} "
+                        f"-c idle_in_transaction_session_timeout={int(os.getenv('DB_IDLE_TRANSACTION_TIMEOUT', 60000))}")
+        }
+    })
+    return options
+
+
 class Config:
     """Configuration de base pour tous les environnements"""
     
@@ -22,10 +89,7 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///mysindic.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_ECHO = False
-    SQLALCHEMY_ENGINE_OPTIONS = {
-        'pool_pre_ping': True,
-        'pool_recycle': 300,
-    }
+    SQLALCHEMY_ENGINE_OPTIONS = build_engine_options(SQLALCHEMY_DATABASE_URI)
     
     # Configuration JWT
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', SECRET_KEY)
@@ -46,17 +110,96 @@ class Config:
     MAIL_PASSWORD = os.getenv('MAIL_PASSWORD')
     MAIL_DEFAULT_SENDER = os.getenv('MAIL_DEFAULT_SENDER', 'noreply@mysindic.ma')
     
+    # File d'envoi des emails (table email_outbox)
+    MAIL_BACKEND = os.getenv('MAIL_BACKEND', 'log')  # 'smtp' pour un envoi réel, 'log' pour journaliser
+    MAIL_WORKERS = int(os.getenv('MAIL_WORKERS', 2))  # Threads d'envoi par processus (0 = aucun)
+    MAIL_BATCH_SIZE = 50
+    MAIL_MAX_ATTEMPTS = 5
+    MAIL_RETRY_BASE_DELAY = 30  # secondes, doublé à chaque nouvelle tentative
+    MAIL_POLL_INTERVAL = 10  # secondes entre deux vérifications de la file
+    MAIL_TIMEOUT = 30  # secondes
+    
     # Configuration de l'application
     APP_NAME = 'Shabaka Syndic'
     APP_VERSION = '0.1.0'
     
     # Pagination
     ITEMS_PER_PAGE = 20
+    MAX_ITEMS_PER_PAGE = 100
+    
+    # Cache des résidences assignées aux admins (secondes, 0 = désactivé).
+    # Propre à chaque processus : avec plusieurs workers, un retrait d'assignation
+    # reste visible jusqu'à l'expiration dans les autres workers.
+    RESIDENCE_SCOPE_CACHE_TTL = int(os.getenv('RESIDENCE_SCOPE_CACHE_TTL', 0))
+    
+    # Durée de vie (secondes) des statistiques du tableau de bord admin (0 = pas de cache)
+    DASHBOARD_CACHE_TTL = int(os.getenv('DASHBOARD_CACHE_TTL', 30))
+    
+    # Durée de vie (secondes) des décomptes de votes des sondages (0 = pas de cache)
+    POLL_RESULTS_CACHE_TTL = int(os.getenv('POLL_RESULTS_CACHE_TTL', 60))
+    
+    # Intervalle (secondes) de vérification de la version des paramètres (AppSettings)
+    SETTINGS_CACHE_CHECK_INTERVAL = int(os.getenv('SETTINGS_CACHE_CHECK_INTERVAL', 5))
+    
+    # Événements en direct des AG (flux SSE) : 'memory' (un processus) ou 'redis' (plusieurs workers)
+    LIVE_EVENTS_BROKER = os.getenv('LIVE_EVENTS_BROKER', 'memory')
+    LIVE_EVENTS_REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+    LIVE_EVENTS_HEARTBEAT = 15  # secondes entre deux messages de maintien de connexion
+    LIVE_EVENTS_QUEUE_SIZE = 100  # événements en attente par client avant déconnexion
+    # Flux simultanés par processus (0 = illimité) : la moitié des connexions gevent du worker
+    # (des threads en gthread, où chaque flux occupe un thread), le reste servant l'API
+    LIVE_EVENTS_MAX_STREAMS = int(os.getenv('LIVE_EVENTS_MAX_STREAMS', max(1, worker_concurrency() // 2)))
+    
+    # Fichiers statiques : noms à empreinte servis avec Cache-Control immutable
+    STATIC_FINGERPRINT = os.getenv('STATIC_FINGERPRINT', 'true').lower() == 'true'
+    STATIC_IMMUTABLE_MAX_AGE = 31536000  # secondes (1 an)
+    # Envoi des fichiers par le serveur frontal : X-Sendfile (Apache, lighttpd) ou
+    # X-Accel-Redirect vers une location interne nginx pour les uploads (ex: /_uploads/)
+    USE_X_SENDFILE = os.getenv('USE_X_SENDFILE', 'false').lower() == 'true'
+    UPLOADS_ACCEL_REDIRECT = os.getenv('UPLOADS_ACCEL_REDIRECT')
+    
+    # Instrumentation : /metrics (Prometheus), en-tête Server-Timing, alerte au-delà d'un nombre de requêtes SQL
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN')  # Jeton Bearer de /metrics (non exposé si absent) et de Server-Timing
+    METRICS_SERVER_TIMING = os.getenv('METRICS_SERVER_TIMING', 'true').lower() == 'true'
+    METRICS_QUERY_THRESHOLD = int(os.getenv('METRICS_QUERY_THRESHOLD', 30))  # 0 = pas d'alerte
+    
+    # Réponses HTTP : compression gzip/brotli au-delà de COMPRESS_MIN_SIZE octets, ETag et 304 sur l'API JSON
+    COMPRESS_ENABLED = os.getenv('COMPRESS_ENABLED', 'true').lower() == 'true'  # false si nginx compresse déjà
+    COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', 1024))
+    COMPRESS_LEVEL = 6  # gzip
+    COMPRESS_BROTLI_QUALITY = 5
+    HTTP_CONDITIONAL_GET = os.getenv('HTTP_CONDITIONAL_GET', 'true').lower() == 'true'
     
     # Upload de fichiers
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max
     UPLOAD_FOLDER = os.path.join(os.path.dirname(__file__), 'uploads')
     ALLOWED_EXTENSIONS = {'pdf', 'png', 'jpg', 'jpeg', 'gif', 'doc', 'docx', 'xls', 'xlsx'}
+    
+    # Stockage des uploads adressé par contenu : 'local' (static/uploads/objects) ou 's3'
+    STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'local')
+    STORAGE_LOCAL_ROOT = os.getenv('STORAGE_LOCAL_ROOT')  # None = frontend/static/uploads/objects
+    STORAGE_BASE_URL = os.getenv('STORAGE_BASE_URL', '/static/uploads/objects')
+    STORAGE_S3_BUCKET = os.getenv('STORAGE_S3_BUCKET')
+    STORAGE_S3_ENDPOINT_URL = os.getenv('STORAGE_S3_ENDPOINT_URL')  # MinIO, Scaleway...
+    STORAGE_S3_REGION = os.getenv('STORAGE_S3_REGION')
+    STORAGE_S3_PREFIX = os.getenv('STORAGE_S3_PREFIX', '')
+    STORAGE_CHUNK_SIZE = 64 * 1024  # octets lus et hachés par bloc
+    STORAGE_PURGE_GRACE = int(os.getenv('STORAGE_PURGE_GRACE', 86400))  # secondes avant purge d'un fichier sans référence
+    
+    # Variantes des photos (miniature et affichage) générées en arrière-plan
+    IMAGE_WORKERS = int(os.getenv('IMAGE_WORKERS', 2))  # Threads de traitement par processus (0 = aucun)
+    IMAGE_VARIANT_FORMAT = os.getenv('IMAGE_VARIANT_FORMAT', 'WEBP')  # 'WEBP' ou 'JPEG'
+    IMAGE_THUMBNAIL_SIZE = 320  # pixels (plus grand côté)
+    IMAGE_DISPLAY_SIZE = 1280
+    IMAGE_QUALITY = 80
+    IMAGE_BATCH_SIZE = 10
+    IMAGE_MAX_ATTEMPTS = 3
+    IMAGE_POLL_INTERVAL = 30  # secondes entre deux vérifications de la file
+    IMAGE_TIMEOUT = 120  # secondes avant reprise d'une image restée en traitement
+    
+    # Import de lots (CSV/XLSX) : lignes validées et insérées par lot
+    UNIT_IMPORT_BATCH_SIZE = 500
 
 
 class DevelopmentConfig(Config):
@@ -78,6 +221,9 @@ class ProductionConfig(Config):
     DEBUG = False
     TESTING = False
     
+    # Plusieurs workers gunicorn : les événements doivent passer par Redis
+    LIVE_EVENTS_BROKER = os.getenv('LIVE_EVENTS_BROKER', 'redis')
+    
     # Note: Les validations sont effectuées dans get_config()
     # pour éviter les erreurs lors de l'import du module
 
@@ -88,11 +234,16 @@ class TestingConfig(Config):
     DEBUG = False
     TESTING = True
     
-    # Base de données de test en mémoire
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    # Base de données de test en mémoire (TEST_DATABASE_URL pour les benchmarks sur PostgreSQL)
+    SQLALCHEMY_DATABASE_URI = os.getenv('TEST_DATABASE_URL', 'sqlite:///:memory:')
+    SQLALCHEMY_ENGINE_OPTIONS = build_engine_options(SQLALCHEMY_DATABASE_URI)
     
     # Désactiver la protection CSRF pour les tests
     WTF_CSRF_ENABLED = False
+    
+    # Emails et images traités explicitement par EmailDispatcher.drain() / ImagePipeline.drain()
+    MAIL_WORKERS = 0
+    IMAGE_WORKERS = 0
 
 
 # Dictionnaire des configurations
@@ -9,12 +9,25 @@ Mail : moa@myoneart.com
 www.myoneart.com
 """
 
+import click
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
 
 # Instances des extensions
 db = SQLAlchemy()
-migrate = Migrate()
+
+
+def init_migrate(app):
+    """
+    Installe Flask-Migrate (commandes `flask db`)
+    
+    Flask-Migrate importe alembic (~0,2 s) : init_db ne l'installe que si
+    l'application est chargée par la CLI flask, pas par gunicorn ou main.py.
+    
+    Args:
+        app: Instance de l'application Flask
+    """
+    from flask_migrate import Migrate
+    Migrate(app, db)
 
 
 def init_db(app):
@@ -25,21 +38,26 @@ def init_db(app):
         app: Instance de l'application Flask
     """
     db.init_app(app)
-    migrate.init_app(app, db)
+    if click.get_current_context(silent=True) is not None:
+        init_migrate(app)
     
     # Importer tous les modèles ici pour que Flask-Migrate les détecte
     from backend.models.user import User
     from backend.models.residence import Residence, Unit
     from backend.models.residence_admin import ResidenceAdmin
     from backend.models.maintenance import MaintenanceRequest
+    from backend.models.tracking_counter import TrackingCounter
     from backend.models.maintenance_comment import MaintenanceComment
     from backend.models.maintenance_document import MaintenanceDocument
     from backend.models.document import Document
     from backend.models.charge import Charge, ChargeDistribution
     from backend.models.payment import Payment
+    from backend.models.unit_balance import UnitBalance
     from backend.models.news import News
     from backend.models.poll import Poll, PollOption, PollVote
     from backend.models.general_assembly import GeneralAssembly, Resolution, Vote, Attendance
     from backend.models.litigation import Litigation
     from backend.models.maintenance_log import MaintenanceLog
-    from backend.models.app_settings import AppSettings
+    from backend.models.app_settings import AppSettings, AppSettingsVersion
+    from backend.models.email_outbox import EmailOutbox
+    from backend.models.stored_file import StoredFile
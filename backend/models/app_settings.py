@@ -5,12 +5,50 @@ Shabaka Syndic - Modèle pour les paramètres de l'application
 
 Stocke les paramètres personnalisés de l'application
 incluant le code <head> personnalisé
+
+Les paramètres sont servis depuis un cache en mémoire (par processus),
+invalidé à chaque écriture. Le compteur app_settings_version, incrémenté
+à chaque écriture, permet aux autres processus de détecter un changement
+(vérification au plus toutes les SETTINGS_CACHE_CHECK_INTERVAL secondes).
 """
 
+import threading
+import time
+from flask import current_app
+from sqlalchemy import update
 from backend.models import db
 from datetime import datetime
 
 
+# Cache de tous les paramètres du processus
+_cache = {'values': None, 'version': None, 'checked_at': 0.0}
+_cache_lock = threading.Lock()
+
+
+class AppSettingsVersion(db.Model):
+    """Compteur de version des paramètres (une seule ligne, id=1)"""
+    __tablename__ = 'app_settings_version'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, default=0, nullable=False)
+    
+    @staticmethod
+    def current():
+        """Récupère la version courante des paramètres"""
+        return db.session.query(AppSettingsVersion.version).filter_by(id=1).scalar() or 0
+    
+    @staticmethod
+    def bump():
+        """Incrémente la version (dans la transaction en cours)"""
+        result = db.session.execute(
+            update(AppSettingsVersion)
+            .where(AppSettingsVersion.id == 1)
+            .values(version=AppSettingsVersion.version + 1)
+        )
+        if not result.rowcount:
+            db.session.add(AppSettingsVersion(id=1, version=1))
+
+
 class AppSettings(db.Model):
     """Paramètres de l'application"""
     __tablename__ = 'app_settings'
@@ -33,11 +71,42 @@ class AppSettings(db.Model):
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
     
+    @staticmethod
+    def get_all_values():
+        """
+        Récupère tous les paramètres depuis le cache en mémoire
+        
+        Returns:
+            dict: Valeurs par clé
+        """
+        now = time.monotonic()
+        interval = current_app.config.get('SETTINGS_CACHE_CHECK_INTERVAL', 5)
+        
+        with _cache_lock:
+            values, version, checked_at = _cache['values'], _cache['version'], _cache['checked_at']
+        
+        if values is not None and now - checked_at < interval:
+            return values
+        
+        # Lire la version avant les valeurs : une écriture concurrente sera vue au prochain contrôle
+        current_version = AppSettingsVersion.current()
+        if values is None or current_version != version:
+            values = dict(db.session.query(AppSettings.key, AppSettings.value).all())
+        
+        with _cache_lock:
+            _cache.update(values=values, version=current_version, checked_at=now)
+        return values
+    
+    @staticmethod
+    def invalidate_cache():
+        """Vide le cache des paramètres du processus"""
+        with _cache_lock:
+            _cache.update(values=None, version=None, checked_at=0.0)
+    
     @staticmethod
     def get_value(key, default=None):
         """Récupère la valeur d'un paramètre"""
-        setting = AppSettings.query.filter_by(key=key).first()
-        return setting.value if setting else default
+        return AppSettings.get_all_values().get(key, default)
     
     @staticmethod
     def set_value(key, value, description=None):
@@ -51,7 +120,9 @@ class AppSettings(db.Model):
         else:
             setting = AppSettings(key=key, value=value, description=description)
             db.session.add(setting)
+        AppSettingsVersion.bump()
         db.session.commit()
+        AppSettings.invalidate_cache()
         return setting
     
     def __repr__(self):
@@ -9,6 +9,7 @@ Mail : moa@myoneart.com
 www.myoneart.com
 """
 
+import json
 from datetime import datetime
 from backend.models import db
 
@@ -41,6 +42,11 @@ class Charge(db.Model):
     period_month = db.Column(db.Integer)  # 1-12
     period_year = db.Column(db.Integer, nullable=False)
     
+    # Mode de répartition entre les lots
+    distribution_method = db.Column(db.String(20), default='equal')
+    # Modes: 'equal', 'surface', 'tantiemes', 'unit_type'
+    distribution_rates = db.Column(db.Text)  # JSON {type de lot: coefficient} pour 'unit_type'
+    
     # Statut
     status = db.Column(db.String(20), default='draft')
     # Statuts: 'draft', 'published', 'closed'
@@ -67,6 +73,8 @@ class Charge(db.Model):
             'period_month': self.period_month,
             'period_year': self.period_year,
             'status': self.status,
+            'distribution_method': self.distribution_method or 'equal',
+            'distribution_rates': json.loads(self.distribution_rates) if self.distribution_rates else None,
             'due_date': self.due_date.isoformat() if self.due_date else None,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
@@ -100,6 +108,11 @@ class ChargeDistribution(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Contrainte d'unicité: une seule distribution par lot et par charge (cible de l'upsert)
+    __table_args__ = (
+        db.UniqueConstraint('charge_id', 'unit_id', name='unique_charge_distribution'),
+    )
+    
     def to_dict(self):
         """Convertit la distribution en dictionnaire"""
         return {
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shabaka Syndic - Solution complète et digitale pour les syndics et résidents au Maroc.
+
+Shabaka Syndic
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+"""
+
+from datetime import datetime
+from backend.models import db
+
+
+class EmailOutbox(db.Model):
+    """
+    File d'attente persistante des emails sortants (un message par destinataire)
+    
+    Les notifications sont enregistrées ici dans la requête HTTP puis
+    envoyées en arrière-plan par EmailDispatcher.
+    """
+    
+    __tablename__ = 'email_outbox'
+    
+    # Identifiant
+    id = db.Column(db.Integer, primary_key=True)
+    
+    # Message
+    to_email = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.String(255), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    html_body = db.Column(db.Text)
+    
+    # Statut d'envoi
+    status = db.Column(db.String(20), default='pending', nullable=False, index=True)
+    # Statuts: 'pending', 'sending', 'sent', 'failed'
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    last_error = db.Column(db.Text)
+    
+    # Métadonnées
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    locked_at = db.Column(db.DateTime)  # Prise en charge par un worker
+    claimed_by = db.Column(db.String(32))  # Jeton du worker qui traite le message
+    sent_at = db.Column(db.DateTime)
+    
+    def to_dict(self):
+        """Convertit le message en dictionnaire"""
+        return {
+            'id': self.id,
+            'to_email': self.to_email,
+            'subject': self.subject,
+            'status': self.status,
+            'attempts': self.attempts,
+            'next_attempt_at': self.next_attempt_at.isoformat() if self.next_attempt_at else None,
+            'last_error': self.last_error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'sent_at': self.sent_at.isoformat() if self.sent_at else None
+        }
+    
+    def __repr__(self):
+        return f'<EmailOutbox {self.id} {self.to_email} {self.status}>'
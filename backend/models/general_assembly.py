@@ -65,6 +65,13 @@ class GeneralAssembly(db.Model):
     quorum_required = db.Column(db.Integer, default=50)  # Pourcentage
     quorum_reached = db.Column(db.Boolean, default=False)
     
+    # Totaux pondérés tenus à jour par AssemblyEngine (None = pas encore calculés)
+    weight_basis = db.Column(db.String(20))  # 'tantiemes' ou 'count' (un copropriétaire = une voix)
+    eligible_count = db.Column(db.Integer)  # Copropriétaires convoqués
+    eligible_weight = db.Column(db.Integer)  # Tantièmes de la résidence
+    present_count = db.Column(db.Integer, default=0)  # Copropriétaires présents ou représentés
+    present_weight = db.Column(db.Integer, default=0)  # Tantièmes présents ou représentés
+    
     # Métadonnées
     created_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
@@ -95,6 +102,11 @@ class GeneralAssembly(db.Model):
             'convocation_sent_date': self.convocation_sent_date.isoformat() if self.convocation_sent_date else None,
             'quorum_required': self.quorum_required,
             'quorum_reached': self.quorum_reached,
+            'weight_basis': self.weight_basis,
+            'eligible_count': self.eligible_count,
+            'eligible_weight': self.eligible_weight,
+            'present_count': self.present_count,
+            'present_weight': self.present_weight,
             'created_by': self.created_by,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
@@ -125,13 +137,19 @@ class Resolution(db.Model):
     
     # Type de vote
     vote_type = db.Column(db.String(50), default='simple')
-    # Types: 'simple', 'double_majorite', 'unanimite'
+    # Types: 'simple', 'absolue', 'double_majorite', 'unanimite'
     
-    # Résultats
+    # Résultats (nombre de bulletins)
     votes_for = db.Column(db.Integer, default=0)
     votes_against = db.Column(db.Integer, default=0)
     votes_abstain = db.Column(db.Integer, default=0)
     
+    # Résultats pondérés (tantièmes, procurations incluses)
+    weight_for = db.Column(db.Integer, default=0)
+    weight_against = db.Column(db.Integer, default=0)
+    weight_abstain = db.Column(db.Integer, default=0)
+    voices_for = db.Column(db.Integer, default=0)  # Copropriétaires pour (procurations incluses)
+    
     # Statut
     status = db.Column(db.String(20), default='pending')
     # Statuts: 'pending', 'voting', 'approved', 'rejected'
@@ -154,6 +172,10 @@ class Resolution(db.Model):
             'votes_for': self.votes_for,
             'votes_against': self.votes_against,
             'votes_abstain': self.votes_abstain,
+            'weight_for': self.weight_for,
+            'weight_against': self.weight_against,
+            'weight_abstain': self.weight_abstain,
+            'voices_for': self.voices_for,
             'status': self.status,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
@@ -180,6 +202,10 @@ class Vote(db.Model):
     vote_value = db.Column(db.String(20), nullable=False)
     # Valeurs: 'for', 'against', 'abstain'
     
+    # Poids du bulletin au moment du vote (tantièmes du votant et de ses mandants)
+    weight = db.Column(db.Integer, default=0)
+    voices = db.Column(db.Integer, default=1)  # Copropriétaires exprimés par ce bulletin
+    
     # Métadonnées
     voted_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     
@@ -195,6 +221,8 @@ class Vote(db.Model):
             'resolution_id': self.resolution_id,
             'user_id': self.user_id,
             'vote_value': self.vote_value,
+            'weight': self.weight,
+            'voices': self.voices,
             'voted_at': self.voted_at.isoformat() if self.voted_at else None
         }
     
@@ -220,6 +248,9 @@ class Attendance(db.Model):
     is_present = db.Column(db.Boolean, default=False)
     represented_by = db.Column(db.Integer, db.ForeignKey('users.id'))  # Représentant
     
+    # Poids du participant (tantièmes de son lot ; None si non copropriétaire, sans droit de vote pondéré)
+    weight = db.Column(db.Integer)
+    
     # Mode de présence (NOUVEAU)
     attendance_mode = db.Column(db.String(20))  # 'physical', 'online'
     presence_marked_at = db.Column(db.DateTime)
@@ -228,6 +259,11 @@ class Attendance(db.Model):
     # Métadonnées
     registered_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     
+    # Contrainte d'unicité: une présence par utilisateur et par AG
+    __table_args__ = (
+        db.UniqueConstraint('assembly_id', 'user_id', name='unique_attendance'),
+    )
+    
     def to_dict(self):
         """Convertit la présence en dictionnaire"""
         return {
@@ -236,6 +272,7 @@ class Attendance(db.Model):
             'user_id': self.user_id,
             'is_present': self.is_present,
             'represented_by': self.represented_by,
+            'weight': self.weight,
             'attendance_mode': self.attendance_mode,
             'presence_marked_at': self.presence_marked_at.isoformat() if self.presence_marked_at else None,
             'marked_by': self.marked_by,
@@ -24,7 +24,7 @@ class MaintenanceRequest(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     
     # Numéro de suivi unique
-    tracking_number = db.Column(db.String(20), unique=True, nullable=False)
+    tracking_number = db.Column(db.String(32), unique=True, nullable=False)
     
     # Type de demande
     request_type = db.Column(db.String(50), nullable=False, default='resident_request')  # 'resident_request' ou 'admin_announcement'
@@ -48,8 +48,10 @@ class MaintenanceRequest(db.Model):
     status = db.Column(db.String(20), default='pending')
     # Statuts possibles: 'pending', 'in_progress', 'resolved', 'rejected'
     
-    # Image
+    # Image (et variantes générées en arrière-plan par ImagePipeline)
     image_path = db.Column(db.String(500))
+    image_thumbnail_path = db.Column(db.String(500))
+    image_display_path = db.Column(db.String(500))
     
     # Intervenant assigné
     assigned_to = db.Column(db.String(200))  # Nom du technicien/prestataire externe
@@ -75,19 +77,23 @@ class MaintenanceRequest(db.Model):
     
     @staticmethod
     def generate_tracking_number(residence_id):
-        """Génère un numéro de suivi unique pour une demande"""
-        import random
-        import string
+        """
+        Génère le numéro de suivi suivant d'une résidence
+
+        Format: MNT-AAAA-RIII-NNNN (ex: MNT-2025-R001-0042), NNNN étant
+        attribué par TrackingCounter : numéros consécutifs par résidence
+        et par année, sans doublon entre requêtes simultanées. Le numéro
+        est réservé dans la transaction en cours.
+        """
+        from backend.models.tracking_counter import TrackingCounter
+
+        residence_id = int(residence_id)
         year = datetime.utcnow().year
-        # Format: MNT-YYYY-RESIDXXXX (ex: MNT-2025-RES001234)
-        count = MaintenanceRequest.query.filter_by(residence_id=residence_id).count() + 1
-        random_suffix = ''.join(random.choices(string.digits, k=4))
-        return f"MNT-{year}-R{residence_id:03d}{random_suffix}"
+        sequence = TrackingCounter.next_value(residence_id, year)
+        return f"MNT-{year}-R{residence_id:03d}-{sequence:04d}"
     
     def to_dict(self, include_relations=False):
         """Convertit la demande en dictionnaire"""
-        from backend.models.residence import Residence
-        
         result = {
             'id': self.id,
             'tracking_number': self.tracking_number,
@@ -101,6 +107,8 @@ class MaintenanceRequest(db.Model):
             'priority': self.priority,
             'status': self.status,
             'image_path': self.image_path,
+            'image_thumbnail_path': self.image_thumbnail_path,
+            'image_display_path': self.image_display_path,
             'assigned_to': self.assigned_to,
             'assigned_user_id': self.assigned_user_id,
             'assigned_at': self.assigned_at.isoformat() if self.assigned_at else None,
@@ -122,8 +130,7 @@ class MaintenanceRequest(db.Model):
             result['author_email'] = None
         
         # Ajouter le nom de la résidence
-        residence = Residence.query.get(self.residence_id)
-        result['residence_name'] = residence.name if residence else None
+        result['residence_name'] = self.residence.name if self.residence else None
         
         # Ajouter les informations de l'utilisateur assigné
         if self.assigned_user:
@@ -56,8 +56,6 @@ class News(db.Model):
     
     def to_dict(self):
         """Convertit l'actualité en dictionnaire"""
-        from backend.models.residence import Residence
-        
         result = {
             'id': self.id,
             'residence_id': self.residence_id,
@@ -83,8 +81,7 @@ class News(db.Model):
             result['author_role'] = None
         
         # Ajouter le nom de la résidence
-        residence = Residence.query.get(self.residence_id)
-        result['residence_name'] = residence.name if residence else None
+        result['residence_name'] = self.residence.name if self.residence else None
         
         return result
     
@@ -46,6 +46,8 @@ class Payment(db.Model):
     
     # Pièce jointe (justificatif de paiement)
     proof_document = db.Column(db.String(255))  # Chemin vers le fichier (image ou PDF)
+    proof_thumbnail_path = db.Column(db.String(255))  # Variantes d'une photo (ImagePipeline)
+    proof_display_path = db.Column(db.String(255))
     
     # Notes
     admin_notes = db.Column(db.Text)
@@ -70,6 +72,8 @@ class Payment(db.Model):
             'payment_date': self.payment_date.isoformat() if self.payment_date else None,
             'status': self.status,
             'proof_document': self.proof_document,
+            'proof_thumbnail_path': self.proof_thumbnail_path,
+            'proof_display_path': self.proof_display_path,
             'admin_notes': self.admin_notes,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
@@ -55,27 +55,9 @@ class Poll(db.Model):
     creator = db.relationship('User', backref='created_polls', lazy=True)
     
     def get_results(self):
-        """Calcule les résultats du sondage"""
-        results = []
-        total_votes = len(self.votes)
-        
-        for option in self.options:
-            vote_count = len(option.votes)
-            percentage = (vote_count / total_votes * 100) if total_votes > 0 else 0
-            
-            results.append({
-                'option_id': option.id,
-                'option_text': option.option_text,
-                'votes': vote_count,
-                'percentage': round(percentage, 2)
-            })
-        
-        return {
-            'poll_id': self.id,
-            'question': self.question,
-            'total_votes': total_votes,
-            'options': results
-        }
+        """Calcule les résultats du sondage (décomptes SQL, voir PollResults)"""
+        from backend.services.poll_results import PollResults
+        return PollResults.get(self)
     
     def to_dict(self):
         """Convertit le sondage en dictionnaire"""
@@ -119,14 +101,21 @@ class PollOption(db.Model):
     # Relations
     votes = db.relationship('PollVote', backref='option', lazy=True)
     
-    def to_dict(self):
-        """Convertit l'option en dictionnaire"""
+    def to_dict(self, vote_count=None):
+        """
+        Convertit l'option en dictionnaire
+        
+        Args:
+            vote_count: Nombre de votes déjà compté (évite de charger les votes)
+        """
+        if vote_count is None:
+            vote_count = PollVote.query.filter_by(option_id=self.id).count()
         return {
             'id': self.id,
             'poll_id': self.poll_id,
             'option_text': self.option_text,
             'order': self.order,
-            'vote_count': len(self.votes)
+            'vote_count': vote_count
         }
     
     def __repr__(self):
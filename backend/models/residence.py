@@ -101,6 +101,9 @@ class Unit(db.Model):
     # Superficie
     surface_area = db.Column(db.Float)  # en m²
     
+    # Quote-part dans la copropriété (tantièmes / millièmes)
+    tantiemes = db.Column(db.Integer)
+    
     # Propriétaire
     owner_name = db.Column(db.String(200))
     owner_email = db.Column(db.String(120))
@@ -127,6 +130,7 @@ class Unit(db.Model):
             'building': self.building,
             'unit_type': self.unit_type,
             'surface_area': self.surface_area,
+            'tantiemes': self.tantiemes,
             'owner_name': self.owner_name,
             'owner_email': self.owner_email,
             'owner_phone': self.owner_phone,
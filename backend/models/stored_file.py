@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shabaka Syndic - Solution complète et digitale pour les syndics et résidents au Maroc.
+
+Shabaka Syndic
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+"""
+
+from datetime import datetime
+from backend.models import db
+
+
+class StoredFile(db.Model):
+    """
+    Fichier uploadé, stocké une seule fois par contenu (empreinte SHA-256)
+
+    ref_count compte les enregistrements (demandes, paiements, documents)
+    qui pointent vers le fichier. Un fichier qui n'est plus référencé est
+    conservé jusqu'à la purge (purge_uploads.py), ce qui permet à un nouvel
+    upload identique de le réutiliser.
+    """
+
+    __tablename__ = 'stored_files'
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    # Empreinte du contenu et emplacement dans le stockage
+    digest = db.Column(db.String(64), unique=True, nullable=False, index=True)
+    storage_key = db.Column(db.String(255), nullable=False)
+
+    # Métadonnées
+    size = db.Column(db.BigInteger, nullable=False)  # Taille en octets
+    mime_type = db.Column(db.String(100))
+
+    # Variantes d'image (miniature et affichage), générées par ImagePipeline
+    thumbnail_key = db.Column(db.String(255))
+    display_key = db.Column(db.String(255))
+    variants_status = db.Column(db.String(20), index=True)
+    # Statuts: None (pas de variantes), 'pending', 'processing', 'ready', 'failed'
+    variants_attempts = db.Column(db.Integer, default=0, nullable=False)
+    variants_locked_at = db.Column(db.DateTime)
+    variants_claimed_by = db.Column(db.String(32))  # Jeton du worker qui traite l'image
+
+    # Références
+    ref_count = db.Column(db.Integer, default=0, nullable=False)
+    released_at = db.Column(db.DateTime)  # Dernier passage à 0 référence
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def to_dict(self):
+        """Convertit le fichier en dictionnaire"""
+        return {
+            'id': self.id,
+            'digest': self.digest,
+            'storage_key': self.storage_key,
+            'size': self.size,
+            'mime_type': self.mime_type,
+            'ref_count': self.ref_count,
+            'variants_status': self.variants_status,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+    def __repr__(self):
+        return f'<StoredFile {self.digest[:12]} ({self.ref_count} réf.)>'
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shabaka Syndic - Solution complète et digitale pour les syndics et résidents au Maroc.
+
+Shabaka Syndic
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+"""
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+from backend.models import db
+
+
+class TrackingCounter(db.Model):
+    """
+    Compteur des numéros de suivi par résidence et par année
+
+    Une ligne par (residence_id, year) contient le dernier numéro attribué.
+    L'incrément est un UPDATE atomique dans la transaction de l'appelant :
+    deux créations simultanées obtiennent des numéros distincts, et un
+    rollback rend le numéro (la séquence reste sans trou).
+    """
+
+    __tablename__ = 'tracking_counters'
+
+    residence_id = db.Column(db.Integer, db.ForeignKey('residences.id'), primary_key=True)
+    year = db.Column(db.Integer, primary_key=True)
+    last_value = db.Column(db.Integer, default=0, nullable=False)
+
+    @staticmethod
+    def next_value(residence_id, year):
+        """
+        Attribue le numéro suivant d'une résidence pour une année
+
+        PostgreSQL utilise INSERT ... ON CONFLICT DO UPDATE ... RETURNING
+        (une requête) ; les autres bases incrémentent la ligne puis la
+        relisent, et la créent dans un savepoint au premier numéro de
+        l'année. Ne valide pas la transaction.
+
+        Args:
+            residence_id: ID de la résidence
+            year: Année du numéro
+
+        Returns:
+            int: Numéro attribué (1 pour le premier de l'année)
+        """
+        key = (TrackingCounter.residence_id == residence_id, TrackingCounter.year == year)
+
+        if db.session.get_bind().dialect.name == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+            stmt = pg_insert(TrackingCounter).values(residence_id=residence_id, year=year, last_value=1)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['residence_id', 'year'],
+                set_={'last_value': TrackingCounter.last_value + 1}
+            ).returning(TrackingCounter.last_value)
+            return db.session.execute(stmt).scalar_one()
+
+        while True:
+            result = db.session.execute(
+                update(TrackingCounter)
+                .where(*key)
+                .values(last_value=TrackingCounter.last_value + 1)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount:
+                # La ligne reste verrouillée jusqu'au commit : la relecture voit notre incrément
+                return db.session.execute(select(TrackingCounter.last_value).where(*key)).scalar_one()
+
+            # Premier numéro de l'année : si une autre transaction crée la ligne
+            # entre-temps, le savepoint est annulé et l'incrément recommence
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(insert(TrackingCounter), [
+                        {'residence_id': residence_id, 'year': year, 'last_value': 1}
+                    ])
+                return 1
+            except IntegrityError:
+                continue
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shabaka Syndic - Solution complète et digitale pour les syndics et résidents au Maroc.
+
+Shabaka Syndic
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+"""
+
+from datetime import datetime
+from backend.models import db
+
+
+class UnitBalance(db.Model):
+    """
+    Grand livre matérialisé du solde de chaque lot
+    
+    Tenu à jour de façon incrémentale (publication de charge, déclaration
+    et validation de paiement) par LedgerService ; reconstructible à tout
+    moment à partir des distributions et des paiements.
+    """
+    
+    __tablename__ = 'unit_balances'
+    
+    # Un solde par lot
+    unit_id = db.Column(db.Integer, db.ForeignKey('units.id'), primary_key=True)
+    
+    # Totaux
+    total_charged = db.Column(db.Numeric(12, 2), default=0, nullable=False)  # Charges publiées
+    total_validated = db.Column(db.Numeric(12, 2), default=0, nullable=False)  # Paiements validés
+    pending_amount = db.Column(db.Numeric(12, 2), default=0, nullable=False)  # Paiements en attente
+    pending_count = db.Column(db.Integer, default=0, nullable=False)
+    
+    # Dernier paiement validé
+    last_payment_date = db.Column(db.DateTime)
+    last_payment_amount = db.Column(db.Numeric(10, 2))
+    
+    # Métadonnées
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Relation
+    unit = db.relationship('Unit', backref=db.backref('balance', uselist=False, cascade='all, delete-orphan'))
+    
+    @property
+    def balance(self):
+        """Solde du lot (paiements validés - charges)"""
+        return (self.total_validated or 0) - (self.total_charged or 0)
+    
+    def to_dict(self):
+        """Convertit le solde en dictionnaire"""
+        balance = float(self.balance)
+        return {
+            'unit_id': self.unit_id,
+            'total_charges': float(self.total_charged or 0),
+            'total_payments': float(self.total_validated or 0),
+            'balance': balance,
+            'status': 'credit' if balance > 0 else 'debit' if balance < 0 else 'balanced',
+            'pending_amount': float(self.pending_amount or 0),
+            'pending_payments': self.pending_count or 0,
+            'last_payment_date': self.last_payment_date.isoformat() if self.last_payment_date else None,
+            'last_payment_amount': float(self.last_payment_amount) if self.last_payment_amount else 0
+        }
+    
+    def __repr__(self):
+        return f'<UnitBalance unit_id={self.unit_id}: {self.balance} MAD>'
@@ -9,10 +9,14 @@ Mail : moa@myoneart.com
 www.myoneart.com
 """
 
-from flask import Blueprint, request, jsonify
+import csv
+import io
+import json
+import logging
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
 from flask_login import login_required, current_user
 from datetime import datetime
-from decimal import Decimal
+from decimal import Decimal, InvalidOperation
 
 from backend.models import db
 from backend.models.residence import Residence, Unit
@@ -28,16 +32,29 @@ from backend.models.general_assembly import GeneralAssembly, Resolution, Vote, A
 from backend.models.litigation import Litigation
 from backend.models.maintenance_log import MaintenanceLog
 from backend.models.app_settings import AppSettings
-from backend.services.charge_calculator import ChargeCalculator
+from backend.services.charge_calculator import ChargeCalculator, get_strategy
+from backend.services.ledger_service import LedgerService
+from backend.services.unit_import import UnitImportService
+from backend.services.dashboard_stats import DashboardStats
+from backend.services.resolution_votes import ResolutionVoteService
+from backend.services.live_events import AssemblyEvents
+from backend.services.attendance_service import AttendanceService
+from backend.services.assembly_engine import AssemblyEngine, VOTE_TYPES
 from backend.services.notification_service import NotificationService
 from backend.services.agora_service import AgoraService
+from backend.services.file_storage import FileStorage
 from backend.utils.decorators import (
     get_user_residence_ids, 
     check_residence_access, 
     residence_access_required,
     superadmin_required,
-    admin_or_superadmin_required
+    admin_or_superadmin_required,
+    invalidate_residence_scope
 )
+from backend.utils.serializers import serialize_many
+from backend.utils.pagination import PaginationError, apply_filters, get_pagination_args, paginate
+
+logger = logging.getLogger(__name__)
 
 # Créer le blueprint
 admin_bp = Blueprint('admin', __name__)
@@ -51,106 +68,31 @@ admin_bp = Blueprint('admin', __name__)
 def dashboard():
     """Tableau de bord avec statistiques (superadmin ou admin)"""
     try:
-        if current_user.is_superadmin():
-            # Superadmin voit toutes les statistiques
-            total_residences = Residence.query.count()
-            total_users = User.query.count()
-            total_units = Unit.query.count()
-            total_charges = Charge.query.filter_by(status='published').count()
-            total_maintenance = MaintenanceRequest.query.count()
-            pending_maintenance = MaintenanceRequest.query.filter_by(status='pending').count()
-            
-            # Statistiques financières
-            # Optimisation: Utilisation de SUM() en base de données
-            total_unpaid = db.session.query(db.func.sum(ChargeDistribution.amount))\
-                .filter_by(is_paid=False).scalar() or 0
-
-            # Conversion en float pour la compatibilité JSON
-            total_unpaid = float(total_unpaid) if total_unpaid else 0.0
-            
-            return jsonify({
-                'success': True,
-                'stats': {
-                    'total_residences': total_residences,
-                    'total_users': total_users,
-                    'total_units': total_units,
-                    'total_charges': total_charges,
-                    'total_maintenance': total_maintenance,
-                    'pending_maintenance': pending_maintenance,
-                    'total_unpaid': total_unpaid
-                }
-            }), 200
+        if not (current_user.is_superadmin() or current_user.is_admin()):
+            return jsonify({'success': False, 'error': 'Accès non autorisé'}), 403
         
-        elif current_user.is_admin():
-            # Admin voit seulement les stats de ses résidences assignées
-            assignments = ResidenceAdmin.query.filter_by(user_id=current_user.id).all()
-            residence_ids = [a.residence_id for a in assignments]
-            
-            if not residence_ids:
-                return jsonify({
-                    'success': True,
-                    'stats': {
-                        'total_residences': 0,
-                        'total_users': 0,
-                        'total_units': 0,
-                        'total_charges': 0,
-                        'total_maintenance': 0,
-                        'pending_maintenance': 0,
-                        'total_unpaid': 0
-                    }
-                }), 200
-            
-            # Compter les résidences assignées
-            total_residences = len(residence_ids)
-            
-            # Compter les unités dans ces résidences
-            total_units = Unit.query.filter(Unit.residence_id.in_(residence_ids)).count()
-            
-            # Compter les utilisateurs de ces résidences
-            total_users = User.query.filter(User.residence_id.in_(residence_ids)).count()
-            
-            # Compter les charges de ces résidences
-            total_charges = Charge.query.filter(
-                Charge.residence_id.in_(residence_ids),
-                Charge.status == 'published'
-            ).count()
-            
-            # Compter les maintenances de ces résidences
-            total_maintenance = MaintenanceRequest.query.filter(
-                MaintenanceRequest.residence_id.in_(residence_ids)
-            ).count()
-            
-            pending_maintenance = MaintenanceRequest.query.filter(
-                MaintenanceRequest.residence_id.in_(residence_ids),
-                MaintenanceRequest.status == 'pending'
-            ).count()
-            
-            # Statistiques financières pour ces résidences
-            # Optimisation: Utilisation de SUM() en base de données avec jointure
-            total_unpaid = db.session.query(db.func.sum(ChargeDistribution.amount))\
-                .join(Unit)\
-                .filter(Unit.residence_id.in_(residence_ids))\
-                .filter(ChargeDistribution.is_paid == False)\
-                .scalar() or 0
-            
-            # Conversion en float pour la compatibilité JSON
-            total_unpaid = float(total_unpaid) if total_unpaid else 0.0
-            
+        # Superadmin: toutes les résidences (None) ; admin: résidences assignées
+        residence_ids = get_user_residence_ids()
+        
+        if residence_ids is not None and not residence_ids:
             return jsonify({
                 'success': True,
                 'stats': {
-                    'total_residences': total_residences,
-                    'total_users': total_users,
-                    'total_units': total_units,
-                    'total_charges': total_charges,
-                    'total_maintenance': total_maintenance,
-                    'pending_maintenance': pending_maintenance,
-                    'total_unpaid': total_unpaid
+                    'total_residences': 0,
+                    'total_users': 0,
+                    'total_units': 0,
+                    'total_charges': 0,
+                    'total_maintenance': 0,
+                    'pending_maintenance': 0,
+                    'total_unpaid': 0
                 }
             }), 200
         
-        else:
-            return jsonify({'success': False, 'error': 'Accès non autorisé'}), 403
+        # Statistiques calculées en une requête, mises en cache par périmètre
+        return jsonify({
+            'success': True,
+            'stats': DashboardStats.get(residence_ids)
+        }), 200
             
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -172,8 +114,7 @@ def get_residences():
             residences = Residence.query.all()
         elif current_user.is_admin():
             # Admin/Syndic voit seulement les résidences qui lui sont assignées
-            assignments = ResidenceAdmin.query.filter_by(user_id=current_user.id).all()
-            residence_ids = [a.residence_id for a in assignments]
+            residence_ids = get_user_residence_ids()
             residences = Residence.query.filter(Residence.id.in_(residence_ids)).all() if residence_ids else []
         elif current_user.is_owner():
             # Owner voit seulement sa résidence
@@ -185,7 +126,7 @@ def get_residences():
         else:
             residences = []
         
-        return jsonify({'success': True, 'residences': [r.to_dict() for r in residences]}), 200
+        return jsonify({'success': True, 'residences': serialize_many(Residence, residences)}), 200
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -226,24 +167,22 @@ def create_residence():
             db.session.add(residence)
             db.session.flush()  # Pour obtenir l'ID de la résidence
             
-            # Créer les unités
-            created_units = []
-            for unit_data in units_data:
-                unit = Unit(
-                    residence_id=residence.id,
-                    unit_number=unit_data['unit_number'],
-                    floor=unit_data.get('floor'),
-                    building=unit_data.get('division'),  # Stocker la division/bâtiment
-                    unit_type=unit_data.get('unit_type', 'appartement')
-                )
-                db.session.add(unit)
-                created_units.append(unit)
+            # Créer les unités (insertion groupée)
+            created_units = UnitImportService.insert_units(residence.id, [
+                {
+                    'unit_number': unit_data['unit_number'],
+                    'floor': unit_data.get('floor'),
+                    'building': unit_data.get('division'),  # Stocker la division/bâtiment
+                    'unit_type': unit_data.get('unit_type', 'appartement')
+                }
+                for unit_data in units_data
+            ])
             
             db.session.commit()
             
             return jsonify({
                 'success': True,
-                'message': f'Résidence créée avec succès avec {len(created_units)} unité(s)',
+                'message': f'Résidence créée avec succès avec {created_units} unité(s)',
                 'residence': residence.to_dict()
             }), 201
             
@@ -308,11 +247,48 @@ def get_units(residence_id):
     """Récupère les lots d'une résidence"""
     try:
         units = Unit.query.filter_by(residence_id=residence_id).all()
-        return jsonify({'success': True, 'units': [u.to_dict() for u in units]}), 200
+        return jsonify({'success': True, 'units': serialize_many(Unit, units)}), 200
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+@admin_bp.route('/residences/<int:residence_id>/units/import', methods=['POST'])
+@login_required
+@admin_or_superadmin_required
+@residence_access_required
+def import_units(residence_id):
+    """
+    Importe les lots d'une résidence depuis un fichier CSV ou XLSX
+    
+    Le fichier (champ 'file') est lu ligne par ligne ; la réponse est un
+    flux NDJSON : une ligne de progression par lot de lignes importé,
+    puis le bilan final ('done': true) avec les erreurs par ligne.
+    """
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        return jsonify({'success': False, 'error': 'Fichier requis (champ file)'}), 400
+    
+    extension = upload.filename.rsplit('.', 1)[-1].lower() if '.' in upload.filename else ''
+    if extension not in ('csv', 'xlsx'):
+        return jsonify({'success': False, 'error': 'Format de fichier non supporté (CSV ou XLSX attendu)'}), 400
+    
+    if not Residence.query.get(residence_id):
+        return jsonify({'success': False, 'error': 'Résidence non trouvée'}), 404
+    
+    batch_size = current_app.config.get('UNIT_IMPORT_BATCH_SIZE', 500)
+    
+    def generate():
+        try:
+            rows = UnitImportService.iter_rows(upload.stream, upload.filename)
+            for progress in UnitImportService.import_units(residence_id, rows, batch_size):
+                yield json.dumps({'success': True, **progress}) + '\n'
+        except Exception as e:
+            db.session.rollback()
+            yield json.dumps({'success': False, 'error': str(e)}) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
 @admin_bp.route('/residences/<int:residence_id>/units', methods=['POST'])
 @login_required
 @admin_or_superadmin_required
@@ -333,6 +309,7 @@ def create_unit(residence_id):
             building=data.get('building'),
             unit_type=data.get('unit_type'),
             surface_area=data.get('surface_area'),
+            tantiemes=data.get('tantiemes'),
             owner_name=data.get('owner_name'),
             owner_email=data.get('owner_email'),
             owner_phone=data.get('owner_phone'),
@@ -367,6 +344,7 @@ def create_unit_simple():
             building=data.get('building'),
             unit_type=data.get('unit_type'),
             surface_area=data.get('surface_area'),
+            tantiemes=data.get('tantiemes'),
             owner_name=data.get('owner_name'),
             owner_email=data.get('owner_email'),
             owner_phone=data.get('owner_phone'),
@@ -397,7 +375,7 @@ def update_unit(unit_id):
             return jsonify({'success': False, 'error': 'Accès non autorisé à cette résidence'}), 403
         
         data = request.get_json()
-        for field in ['unit_number', 'floor', 'building', 'unit_type', 'surface_area', 
+        for field in ['unit_number', 'floor', 'building', 'unit_type', 'surface_area', 'tantiemes',
                       'owner_name', 'owner_email', 'owner_phone', 'is_occupied']:
             if field in data:
                 setattr(unit, field, data[field])
@@ -437,30 +415,38 @@ def delete_unit(unit_id):
 @login_required
 @admin_or_superadmin_required
 def get_charges():
-    """Récupère toutes les charges"""
+    """Récupère toutes les charges (paginées par curseur)"""
     try:
         residence_ids = get_user_residence_ids()
+        residence_id = request.args.get('residence_id')
         
         if residence_ids is None:
             # Superadmin voit toutes les charges
-            residence_id = request.args.get('residence_id')
             query = Charge.query
             if residence_id:
                 query = query.filter_by(residence_id=int(residence_id))
-            charges = query.order_by(Charge.created_at.desc()).all()
         else:
             # Admin/Owner voit seulement les charges de ses résidences
-            residence_id = request.args.get('residence_id')
             if residence_id:
                 # Vérifier que la résidence demandée est autorisée
                 if int(residence_id) in residence_ids:
-                    charges = Charge.query.filter_by(residence_id=int(residence_id)).order_by(Charge.created_at.desc()).all()
+                    query = Charge.query.filter_by(residence_id=int(residence_id))
                 else:
                     return jsonify({'success': False, 'error': 'Accès non autorisé à cette résidence'}), 403
             else:
-                charges = Charge.query.filter(Charge.residence_id.in_(residence_ids)).order_by(Charge.created_at.desc()).all()
+                query = Charge.query.filter(Charge.residence_id.in_(residence_ids))
+        
+        query = apply_filters(query, Charge.created_at, status=Charge.status, charge_type=Charge.charge_type)
+        limit, cursor = get_pagination_args()
+        charges, next_cursor = paginate(query, [(Charge.created_at, True), (Charge.id, True)], limit, cursor)
         
-        return jsonify({'success': True, 'charges': [c.to_dict() for c in charges]}), 200
+        return jsonify({
+            'success': True,
+            'charges': serialize_many(Charge, charges),
+            'next_cursor': next_cursor
+        }), 200
+    except PaginationError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -481,15 +467,31 @@ def create_charge():
         if not check_residence_access(data['residence_id']):
             return jsonify({'success': False, 'error': 'Accès non autorisé à cette résidence'}), 403
         
+        # Valider le mode de répartition
+        distribution_method = data.get('distribution_method') or 'equal'
+        try:
+            distribution_rates = get_strategy(distribution_method).validate(data.get('distribution_rates'))
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        try:
+            total_amount = Decimal(str(data['total_amount']))
+        except InvalidOperation:
+            return jsonify({'success': False, 'error': 'Le montant total doit être un nombre'}), 400
+        if not total_amount.is_finite() or total_amount <= 0:
+            return jsonify({'success': False, 'error': 'Le montant total doit être un nombre positif'}), 400
+        
         charge = Charge(
             residence_id=data['residence_id'],
             title=data['title'],
             description=data.get('description'),
             charge_type=data['charge_type'],
-            total_amount=Decimal(str(data['total_amount'])),
+            total_amount=total_amount,
             period_month=data.get('period_month'),
             period_year=data['period_year'],
             status='draft',
+            distribution_method=distribution_method,
+            distribution_rates=json.dumps(distribution_rates) if distribution_rates else None,
             due_date=datetime.fromisoformat(data['due_date']) if data.get('due_date') else None
         )
         
@@ -517,10 +519,10 @@ def publish_charge(charge_id):
             return jsonify({'success': False, 'error': 'Accès non autorisé à cette résidence'}), 403
         
         # Calculer la répartition
-        distributions = ChargeCalculator.calculate_distribution(charge_id)
+        distributions_count = ChargeCalculator.calculate_distribution(charge_id)
         
-        # Publier la charge
-        charge.status = 'published'
+        # Publier la charge et reporter les parts sur les soldes des lots
+        LedgerService.record_charge_distributed(charge)
         db.session.commit()
         
         # Notifier les résidents
@@ -529,8 +531,11 @@ def publish_charge(charge_id):
         return jsonify({
             'success': True,
             'message': 'Charge publiée et répartie',
-            'distributions_created': len(distributions)
+            'distributions_created': distributions_count
         }), 200
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -551,7 +556,7 @@ def get_charge_distributions(charge_id):
             return jsonify({'success': False, 'error': 'Accès non autorisé à cette résidence'}), 403
         
         distributions = ChargeDistribution.query.filter_by(charge_id=charge_id).all()
-        return jsonify({'success': True, 'distributions': [d.to_dict() for d in distributions]}), 200
+        return jsonify({'success': True, 'distributions': serialize_many(ChargeDistribution, distributions)}), 200
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -567,32 +572,33 @@ def get_payments():
         if not (current_user.is_superadmin() or current_user.is_admin() or current_user.is_owner()):
             return jsonify({'success': False, 'error': 'Accès non autorisé. Seuls les administrateurs, syndics et propriétaires peuvent voir tous les paiements.'}), 403
         
-        # Filtrer les paiements selon le rôle
+        # Filtrer les paiements selon le rôle (sous-requête sur les lots, sans les charger)
         if current_user.is_superadmin():
             # Superadmin voit tous les paiements
-            payments = Payment.query.order_by(Payment.created_at.desc()).all()
+            query = Payment.query
         elif current_user.is_admin():
             # Admin/Syndic voit les paiements de ses résidences assignées
-            assignments = ResidenceAdmin.query.filter_by(user_id=current_user.id).all()
-            residence_ids = [a.residence_id for a in assignments]
-            
-            # Récupérer les unités de ces résidences
-            units = Unit.query.filter(Unit.residence_id.in_(residence_ids)).all() if residence_ids else []
-            unit_ids = [u.id for u in units]
-            
-            payments = Payment.query.filter(Payment.unit_id.in_(unit_ids)).order_by(Payment.created_at.desc()).all() if unit_ids else []
-        elif current_user.is_owner():
+            residence_ids = get_user_residence_ids()
+            unit_ids = db.session.query(Unit.id).filter(Unit.residence_id.in_(residence_ids))
+            query = Payment.query.filter(Payment.unit_id.in_(unit_ids))
+        elif current_user.is_owner() and current_user.residence_id:
             # Owner voit les paiements de sa résidence
-            if current_user.residence_id:
-                units = Unit.query.filter_by(residence_id=current_user.residence_id).all()
-                unit_ids = [u.id for u in units]
-                payments = Payment.query.filter(Payment.unit_id.in_(unit_ids)).order_by(Payment.created_at.desc()).all() if unit_ids else []
-            else:
-                payments = []
+            unit_ids = db.session.query(Unit.id).filter_by(residence_id=current_user.residence_id)
+            query = Payment.query.filter(Payment.unit_id.in_(unit_ids))
         else:
-            payments = []
+            return jsonify({'success': True, 'payments': [], 'next_cursor': None}), 200
         
-        return jsonify({'success': True, 'payments': [p.to_dict() for p in payments]}), 200
+        query = apply_filters(query, Payment.payment_date, status=Payment.status, unit_id=Payment.unit_id)
+        limit, cursor = get_pagination_args()
+        payments, next_cursor = paginate(query, [(Payment.created_at, True), (Payment.id, True)], limit, cursor)
+        
+        return jsonify({
+            'success': True,
+            'payments': serialize_many(Payment, payments),
+            'next_cursor': next_cursor
+        }), 200
+    except PaginationError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -614,16 +620,18 @@ def validate_payment(payment_id):
                 return jsonify({'success': False, 'error': 'Unité non trouvée'}), 404
             
             # Vérifier que le syndic est assigné à cette résidence
-            assignment = ResidenceAdmin.query.filter_by(
-                residence_id=unit.residence_id,
-                user_id=current_user.id
-            ).first()
-            
-            if not assignment:
+            if not check_residence_access(unit.residence_id):
                 return jsonify({'success': False, 'error': 'Vous n\'êtes pas autorisé à valider ce paiement'}), 403
         
-        payment.status = 'validated'
-        payment.admin_notes = f"Validé par {current_user.get_full_name()} le {datetime.utcnow().strftime('%d/%m/%Y')}"
+        previous_status = payment.status
+        if previous_status == 'validated':
+            return jsonify({'success': True, 'message': 'Paiement déjà validé'}), 200
+        
+        admin_notes = f"Validé par {current_user.get_full_name()} le {datetime.utcnow().strftime('%d/%m/%Y')}"
+        if not LedgerService.record_payment_validated(payment, previous_status, admin_notes=admin_notes):
+            # Validé ou modifié par une autre requête depuis la lecture
+            db.session.rollback()
+            return jsonify({'success': False, 'error': 'Le paiement a été modifié entre-temps, veuillez recharger'}), 409
         db.session.commit()
         
         return jsonify({'success': True, 'message': 'Paiement validé'}), 200
@@ -649,41 +657,82 @@ def get_unit_balance(unit_id):
 @login_required
 @superadmin_required
 def get_charge_payment_status(charge_id):
-    """Récupère le statut des paiements pour une charge"""
+    """
+    Récupère le statut des paiements pour une charge
+    
+    Rapport calculé en une requête (distributions, lots et paiements
+    validés agrégés par lot). Avec ?format=csv, le rapport est renvoyé
+    en CSV, écrit ligne par ligne au fil de la lecture.
+    """
     try:
-        from backend.models.charge import ChargeDistribution
         charge = Charge.query.get(charge_id)
         if not charge:
             return jsonify({'success': False, 'error': 'Charge non trouvée'}), 404
         
-        distributions = ChargeDistribution.query.filter_by(charge_id=charge_id).all()
-        payment_status = []
+        # Paiements validés depuis la création de la charge, agrégés pour les seuls lots de la charge
+        charge_units = db.session.query(ChargeDistribution.unit_id).filter(
+            ChargeDistribution.charge_id == charge_id
+        )
+        paid = db.session.query(
+            Payment.unit_id,
+            db.func.sum(Payment.amount).label('amount_paid')
+        ).filter(
+            Payment.status == 'validated',
+            Payment.payment_date >= charge.created_at,
+            Payment.unit_id.in_(charge_units)
+        ).group_by(Payment.unit_id).subquery()
         
-        for dist in distributions:
-            unit = Unit.query.get(dist.unit_id)
-            if not unit:
-                continue
+        query = db.session.query(
+            Unit.id.label('unit_id'),
+            Unit.unit_number,
+            Unit.owner_name,
+            ChargeDistribution.amount.label('amount_due'),
+            db.func.coalesce(paid.c.amount_paid, 0).label('amount_paid')
+        ).join(
+            Unit, ChargeDistribution.unit_id == Unit.id
+        ).outerjoin(
+            paid, paid.c.unit_id == Unit.id
+        ).filter(
+            ChargeDistribution.charge_id == charge_id
+        ).order_by(Unit.unit_number, Unit.id)
+        
+        def status_row(row):
+            amount_due = Decimal(str(row.amount_due))
+            amount_paid = Decimal(str(row.amount_paid))
+            return {
+                'unit_id': row.unit_id,
+                'unit_number': row.unit_number,
+                'owner_name': row.owner_name,
+                'amount_due': float(amount_due),
+                'amount_paid': float(amount_paid),
+                'balance': float(amount_due - amount_paid),
+                'is_paid': amount_paid >= amount_due
+            }
+        
+        if request.args.get('format') == 'csv':
+            columns = ['unit_id', 'unit_number', 'owner_name', 'amount_due', 'amount_paid', 'balance', 'is_paid']
             
-            paid_amount = db.session.query(db.func.sum(Payment.amount)).filter(
-                Payment.unit_id == dist.unit_id,
-                Payment.status == 'validated',
-                Payment.payment_date >= charge.created_at
-            ).scalar() or 0
+            def generate():
+                buffer = io.StringIO()
+                writer = csv.DictWriter(buffer, fieldnames=columns)
+                writer.writeheader()
+                for row in query.yield_per(500):
+                    writer.writerow(status_row(row))
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+                yield buffer.getvalue()
             
-            payment_status.append({
-                'unit_id': unit.id,
-                'unit_number': unit.unit_number,
-                'owner_name': unit.owner_name,
-                'amount_due': float(dist.amount_due),
-                'amount_paid': float(paid_amount),
-                'balance': float(dist.amount_due - paid_amount),
-                'is_paid': paid_amount >= dist.amount_due
-            })
+            return Response(
+                stream_with_context(generate()),
+                mimetype='text/csv',
+                headers={'Content-Disposition': f'attachment; filename=charge_{charge_id}_paiements.csv'}
+            )
         
         return jsonify({
             'success': True,
             'charge': charge.to_dict(),
-            'payment_status': payment_status
+            'payment_status': [status_row(row) for row in query]
         }), 200
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -694,10 +743,7 @@ def get_charge_payment_status(charge_id):
 def get_payment_registry():
     """Récupère le registre des paiements par unité avec le statut de chaque propriétaire"""
     try:
-        from backend.models.charge import ChargeDistribution
         from sqlalchemy.orm import joinedload
-        from sqlalchemy import func, and_, case
-        from decimal import Decimal
         
         residence_id = request.args.get('residence_id', type=int)
         
@@ -708,8 +754,7 @@ def get_payment_registry():
                 query = query.filter_by(residence_id=residence_id)
             query = query.order_by(Unit.residence_id, Unit.unit_number)
         elif current_user.is_admin():
-            assignments = ResidenceAdmin.query.filter_by(user_id=current_user.id).all()
-            residence_ids = [a.residence_id for a in assignments]
+            residence_ids = get_user_residence_ids()
             if not residence_ids:
                 return jsonify({'success': True, 'registry': [], 'summary': {
                     'total_units': 0, 'units_paid': 0, 'units_pending': 0, 'total_outstanding': 0
@@ -739,71 +784,19 @@ def get_payment_registry():
                 'total_units': 0, 'units_paid': 0, 'units_pending': 0, 'total_outstanding': 0
             }}), 200
         
-        unit_ids = [u.id for u in units]
-        
-        charges_by_unit = db.session.query(
-            ChargeDistribution.unit_id,
-            func.sum(ChargeDistribution.amount).label('total')
-        ).join(
-            Charge, ChargeDistribution.charge_id == Charge.id
-        ).filter(
-            ChargeDistribution.unit_id.in_(unit_ids),
-            Charge.status == 'published'
-        ).group_by(ChargeDistribution.unit_id).all()
-        
-        charges_map = {row.unit_id: row.total for row in charges_by_unit}
-        
-        paid_by_unit = db.session.query(
-            Payment.unit_id,
-            func.sum(Payment.amount).label('total')
-        ).filter(
-            Payment.unit_id.in_(unit_ids),
-            Payment.status == 'validated'
-        ).group_by(Payment.unit_id).all()
-        
-        paid_map = {row.unit_id: row.total for row in paid_by_unit}
-        
-        pending_by_unit = db.session.query(
-            Payment.unit_id,
-            func.sum(Payment.amount).label('total'),
-            func.count(Payment.id).label('count')
-        ).filter(
-            Payment.unit_id.in_(unit_ids),
-            Payment.status == 'pending'
-        ).group_by(Payment.unit_id).all()
-        
-        pending_map = {row.unit_id: {'amount': row.total, 'count': row.count} for row in pending_by_unit}
-        
-        last_payment_subquery = db.session.query(
-            Payment.unit_id,
-            func.max(Payment.payment_date).label('max_date')
-        ).filter(
-            Payment.unit_id.in_(unit_ids),
-            Payment.status == 'validated'
-        ).group_by(Payment.unit_id).subquery()
-        
-        last_payments = db.session.query(Payment).join(
-            last_payment_subquery,
-            and_(
-                Payment.unit_id == last_payment_subquery.c.unit_id,
-                Payment.payment_date == last_payment_subquery.c.max_date
-            )
-        ).filter(Payment.status == 'validated').all()
-        
-        last_payment_map = {p.unit_id: p for p in last_payments}
+        # Soldes lus dans le grand livre (une requête par clé primaire)
+        balances = LedgerService.get_balances([u.id for u in units])
         
         registry = []
         for unit in units:
-            total_charges_dec = Decimal(str(charges_map.get(unit.id, 0)))
-            total_paid_dec = Decimal(str(paid_map.get(unit.id, 0)))
-            pending_info = pending_map.get(unit.id, {'amount': 0, 'count': 0})
-            pending_amount_dec = Decimal(str(pending_info['amount']))
+            ledger = balances.get(unit.id)
+            total_charges_dec = Decimal(str(ledger.total_charged)) if ledger else Decimal('0')
+            total_paid_dec = Decimal(str(ledger.total_validated)) if ledger else Decimal('0')
+            pending_amount_dec = Decimal(str(ledger.pending_amount)) if ledger else Decimal('0')
             
             balance = total_paid_dec - total_charges_dec
             projected_balance = balance + pending_amount_dec
             
-            last_payment = last_payment_map.get(unit.id)
-            
             registry.append({
                 'unit_id': unit.id,
                 'unit_number': unit.unit_number,
@@ -821,9 +814,9 @@ def get_payment_registry():
                 'projected_balance': float(projected_balance),
                 'status': 'À jour' if balance >= 0 else 'En retard',
                 'projected_status': 'À jour' if projected_balance >= 0 else 'En retard',
-                'pending_payments': pending_info['count'],
-                'last_payment_date': last_payment.payment_date.isoformat() if last_payment else None,
-                'last_payment_amount': float(last_payment.amount) if last_payment else 0
+                'pending_payments': ledger.pending_count if ledger else 0,
+                'last_payment_date': ledger.last_payment_date.isoformat() if ledger and ledger.last_payment_date else None,
+                'last_payment_amount': float(ledger.last_payment_amount) if ledger and ledger.last_payment_amount else 0
             })
         
         units_up_to_date = len([r for r in registry if r['balance'] >= 0])
@@ -867,7 +860,7 @@ def get_all_news():
         news = query.order_by(News.is_pinned.desc(), News.published_at.desc()).all()
         return jsonify({
             'success': True,
-            'news': [n.to_dict() for n in news]
+            'news': serialize_many(News, news)
         }), 200
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -964,18 +957,36 @@ def delete_news(news_id):
 @login_required
 @admin_or_superadmin_required
 def get_all_maintenance():
-    """Récupère toutes les demandes de maintenance"""
+    """Récupère toutes les demandes de maintenance (paginées par curseur)"""
     try:
         residence_ids = get_user_residence_ids()
         
         if residence_ids is None:
             # Superadmin voit toutes les demandes
-            requests = MaintenanceRequest.query.order_by(MaintenanceRequest.created_at.desc()).all()
+            query = MaintenanceRequest.query
         else:
             # Admin/Owner voit seulement les demandes de ses résidences
-            requests = MaintenanceRequest.query.filter(MaintenanceRequest.residence_id.in_(residence_ids)).order_by(MaintenanceRequest.created_at.desc()).all()
+            query = MaintenanceRequest.query.filter(MaintenanceRequest.residence_id.in_(residence_ids))
+        
+        query = apply_filters(
+            query, MaintenanceRequest.created_at,
+            status=MaintenanceRequest.status,
+            priority=MaintenanceRequest.priority,
+            request_type=MaintenanceRequest.request_type,
+            residence_id=MaintenanceRequest.residence_id
+        )
+        limit, cursor = get_pagination_args()
+        requests, next_cursor = paginate(
+            query, [(MaintenanceRequest.created_at, True), (MaintenanceRequest.id, True)], limit, cursor
+        )
         
-        return jsonify({'success': True, 'maintenance_requests': [r.to_dict() for r in requests]}), 200
+        return jsonify({
+            'success': True,
+            'maintenance_requests': serialize_many(MaintenanceRequest, requests),
+            'next_cursor': next_cursor
+        }), 200
+    except PaginationError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -1112,7 +1123,7 @@ def get_maintenance_comments(request_id):
         
         return jsonify({
             'success': True,
-            'comments': [c.to_dict() for c in comments]
+            'comments': serialize_many(MaintenanceComment, comments)
         }), 200
         
     except Exception as e:
@@ -1195,7 +1206,7 @@ def get_maintenance_documents(request_id):
         
         return jsonify({
             'success': True,
-            'documents': [d.to_dict() for d in documents]
+            'documents': serialize_many(MaintenanceDocument, documents)
         }), 200
         
     except Exception as e:
@@ -1207,7 +1218,6 @@ def get_maintenance_documents(request_id):
 @admin_or_superadmin_required
 def upload_maintenance_document(request_id):
     """Upload un document pour une demande de maintenance"""
-    import os
     from werkzeug.utils import secure_filename
     from backend.models.maintenance_document import MaintenanceDocument
     
@@ -1234,22 +1244,8 @@ def upload_maintenance_document(request_id):
         title = request.form.get('title', file.filename)
         description = request.form.get('description', '')
         
-        # Créer le dossier uploads si nécessaire
-        upload_folder = os.path.join('frontend', 'static', 'uploads', 'maintenance', 'documents')
-        os.makedirs(upload_folder, exist_ok=True)
-        
-        # Sécuriser le nom de fichier
-        filename = secure_filename(file.filename)
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"{timestamp}_{filename}"
-        
-        # Sauvegarder le fichier
-        file_path = os.path.join(upload_folder, filename)
-        file.save(file_path)
-        
-        # Obtenir la taille et le type MIME
-        file_size = os.path.getsize(file_path)
-        mime_type = file.content_type
+        # Stockage par contenu : taille et type MIME relevés pendant la réception
+        stored_file = FileStorage.store(file)
         
         # Créer l'entrée dans la base de données
         document = MaintenanceDocument(
@@ -1257,10 +1253,10 @@ def upload_maintenance_document(request_id):
             document_type=document_type,
             title=title,
             description=description,
-            filename=filename,
-            file_path=f"/static/uploads/maintenance/documents/{filename}",
-            file_size=file_size,
-            mime_type=mime_type,
+            filename=secure_filename(file.filename),
+            file_path=FileStorage.url(stored_file),
+            file_size=stored_file.size,
+            mime_type=stored_file.mime_type,
             uploaded_by=current_user.id
         )
         
@@ -1283,7 +1279,6 @@ def upload_maintenance_document(request_id):
 @admin_or_superadmin_required
 def delete_maintenance_document(document_id):
     """Supprime un document de maintenance"""
-    import os
     from backend.models.maintenance_document import MaintenanceDocument
     
     try:
@@ -1296,13 +1291,8 @@ def delete_maintenance_document(document_id):
         if maintenance_request and not check_residence_access(maintenance_request.residence_id):
             return jsonify({'success': False, 'error': 'Accès non autorisé à cette résidence'}), 403
         
-        # Supprimer le fichier physique
-        try:
-            file_path = os.path.join('frontend', document.file_path.lstrip('/'))
-            if os.path.exists(file_path):
-                os.remove(file_path)
-        except Exception as e:
-            print(f"Erreur lors de la suppression du fichier: {e}")
+        # Retirer la référence au fichier (supprimé par la purge s'il n'est plus utilisé)
+        FileStorage.release(document.file_path)
         
         # Supprimer l'entrée de la base de données
         db.session.delete(document)
@@ -1321,30 +1311,44 @@ def delete_maintenance_document(document_id):
 @login_required
 @admin_or_superadmin_required
 def get_maintenance_logs():
-    """Récupère le carnet d'entretien"""
+    """Récupère le carnet d'entretien (paginé par curseur)"""
     try:
         residence_ids = get_user_residence_ids()
+        residence_id = request.args.get('residence_id')
         
         if residence_ids is None:
             # Superadmin voit tous les logs
-            residence_id = request.args.get('residence_id')
             query = MaintenanceLog.query
             if residence_id:
                 query = query.filter_by(residence_id=int(residence_id))
-            logs = query.order_by(MaintenanceLog.intervention_date.desc()).all()
         else:
             # Admin/Owner voit seulement les logs de ses résidences
-            residence_id = request.args.get('residence_id')
             if residence_id:
                 # Vérifier que la résidence demandée est autorisée
                 if int(residence_id) in residence_ids:
-                    logs = MaintenanceLog.query.filter_by(residence_id=int(residence_id)).order_by(MaintenanceLog.intervention_date.desc()).all()
+                    query = MaintenanceLog.query.filter_by(residence_id=int(residence_id))
                 else:
                     return jsonify({'success': False, 'error': 'Accès non autorisé à cette résidence'}), 403
             else:
-                logs = MaintenanceLog.query.filter(MaintenanceLog.residence_id.in_(residence_ids)).order_by(MaintenanceLog.intervention_date.desc()).all()
+                query = MaintenanceLog.query.filter(MaintenanceLog.residence_id.in_(residence_ids))
         
-        return jsonify({'success': True, 'logs': [l.to_dict() for l in logs]}), 200
+        query = apply_filters(
+            query, MaintenanceLog.intervention_date,
+            category=MaintenanceLog.category,
+            intervention_type=MaintenanceLog.intervention_type
+        )
+        limit, cursor = get_pagination_args()
+        logs, next_cursor = paginate(
+            query, [(MaintenanceLog.intervention_date, True), (MaintenanceLog.id, True)], limit, cursor
+        )
+        
+        return jsonify({
+            'success': True,
+            'logs': serialize_many(MaintenanceLog, logs),
+            'next_cursor': next_cursor
+        }), 200
+    except PaginationError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -1399,30 +1403,40 @@ def create_maintenance_log():
 @login_required
 @admin_or_superadmin_required
 def get_assemblies():
-    """Récupère les assemblées générales"""
+    """Récupère les assemblées générales (paginées par curseur)"""
     try:
         residence_ids = get_user_residence_ids()
+        residence_id = request.args.get('residence_id')
         
         if residence_ids is None:
             # Superadmin voit toutes les assemblées
-            residence_id = request.args.get('residence_id')
             query = GeneralAssembly.query
             if residence_id:
                 query = query.filter_by(residence_id=int(residence_id))
-            assemblies = query.order_by(GeneralAssembly.scheduled_date.desc()).all()
         else:
             # Admin/Owner voit seulement les assemblées de ses résidences
-            residence_id = request.args.get('residence_id')
             if residence_id:
                 # Vérifier que la résidence demandée est autorisée
                 if int(residence_id) in residence_ids:
-                    assemblies = GeneralAssembly.query.filter_by(residence_id=int(residence_id)).order_by(GeneralAssembly.scheduled_date.desc()).all()
+                    query = GeneralAssembly.query.filter_by(residence_id=int(residence_id))
                 else:
                     return jsonify({'success': False, 'error': 'Accès non autorisé à cette résidence'}), 403
             else:
-                assemblies = GeneralAssembly.query.filter(GeneralAssembly.residence_id.in_(residence_ids)).order_by(GeneralAssembly.scheduled_date.desc()).all()
+                query = GeneralAssembly.query.filter(GeneralAssembly.residence_id.in_(residence_ids))
         
-        return jsonify({'success': True, 'assemblies': [a.to_dict() for a in assemblies]}), 200
+        query = apply_filters(query, GeneralAssembly.scheduled_date, status=GeneralAssembly.status)
+        limit, cursor = get_pagination_args()
+        assemblies, next_cursor = paginate(
+            query, [(GeneralAssembly.scheduled_date, True), (GeneralAssembly.id, True)], limit, cursor
+        )
+        
+        return jsonify({
+            'success': True,
+            'assemblies': serialize_many(GeneralAssembly, assemblies),
+            'next_cursor': next_cursor
+        }), 200
+    except PaginationError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -1518,12 +1532,16 @@ def start_assembly(assembly_id):
         assembly.status = 'in_progress'
         assembly.agora_started_at = datetime.utcnow()
         
+        # Copropriétaires convoqués et tantièmes figés à l'ouverture
+        AssemblyEngine.rebuild(assembly)
+        
         # Démarrer l'enregistrement Agora si mode online/both
         if assembly.meeting_mode in ['online', 'both'] and assembly.agora_channel_name:
             recording_sid = AgoraService.start_cloud_recording(assembly.agora_channel_name, 0)
             assembly.agora_recording_sid = recording_sid
         
         db.session.commit()
+        AssemblyEvents.publish_assembly(assembly)
         
         return jsonify({'success': True, 'message': 'AG démarrée', 'assembly': assembly.to_dict()}), 200
     except Exception as e:
@@ -1553,6 +1571,7 @@ def end_assembly(assembly_id):
             AgoraService.stop_cloud_recording(assembly.agora_recording_sid)
         
         db.session.commit()
+        AssemblyEvents.publish_assembly(assembly)
         
         return jsonify({'success': True, 'message': 'AG terminée', 'assembly': assembly.to_dict()}), 200
     except Exception as e:
@@ -1602,6 +1621,25 @@ def get_agora_token(assembly_id):
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+@admin_bp.route('/assemblies/<int:assembly_id>/events', methods=['GET'])
+@login_required
+@admin_or_superadmin_required
+def assembly_events(assembly_id):
+    """Flux SSE des présences, votes et statuts d'une AG en cours"""
+    try:
+        assembly = GeneralAssembly.query.get(assembly_id)
+        if not assembly:
+            return jsonify({'success': False, 'error': 'AG non trouvée'}), 404
+        
+        # Vérifier que l'utilisateur a accès à cette résidence
+        if not check_residence_access(assembly.residence_id):
+            return jsonify({'success': False, 'error': 'Accès non autorisé à cette résidence'}), 403
+        
+        return AssemblyEvents.response(assembly_id, admin=True)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
 @admin_bp.route('/assemblies/<int:assembly_id>/attendance', methods=['GET'])
 @login_required
 @admin_or_superadmin_required
@@ -1616,23 +1654,14 @@ def get_attendance(assembly_id):
         if not check_residence_access(assembly.residence_id):
             return jsonify({'success': False, 'error': 'Accès non autorisé à cette résidence'}), 403
         
-        attendances = Attendance.query.filter_by(assembly_id=assembly_id).all()
-        users_data = []
-        
-        for attendance in attendances:
-            user = User.query.get(attendance.user_id)
-            if user:
-                users_data.append({
-                    'attendance_id': attendance.id,
-                    'user_id': user.id,
-                    'user_name': f"{user.first_name} {user.last_name}",
-                    'email': user.email,
-                    'is_present': attendance.is_present,
-                    'attendance_mode': attendance.attendance_mode,
-                    'presence_marked_at': attendance.presence_marked_at.isoformat() if attendance.presence_marked_at else None
-                })
+        # Présences et participants chargés en une requête
+        users_data = AttendanceService.roster(assembly_id)
         
-        return jsonify({'success': True, 'attendances': users_data}), 200
+        return jsonify({
+            'success': True,
+            'attendances': users_data,
+            'quorum': AssemblyEngine.quorum(assembly)
+        }), 200
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -1651,40 +1680,49 @@ def mark_attendance(assembly_id):
         if not check_residence_access(assembly.residence_id):
             return jsonify({'success': False, 'error': 'Accès non autorisé à cette résidence'}), 403
         
-        data = request.get_json()
-        user_ids = data.get('user_ids', [])
+        data = request.get_json() or {}
         attendance_mode = data.get('attendance_mode', 'physical')
+        is_present = data.get('is_present', True)
+        
+        if attendance_mode not in ['physical', 'online']:
+            return jsonify({'success': False, 'error': 'Mode de présence invalide'}), 400
+        
+        # Toute la salle (copropriétaires de la résidence) ou une liste d'utilisateurs
+        if data.get('all_owners'):
+            user_ids = AttendanceService.owner_ids(assembly.residence_id)
+        else:
+            user_ids = AttendanceService.residence_member_ids(assembly.residence_id, data.get('user_ids', []))
         
         if not user_ids:
             return jsonify({'success': False, 'error': 'Aucun utilisateur spécifié'}), 400
         
-        marked_count = 0
-        for user_id in user_ids:
-            # Chercher ou créer l'attendance
-            attendance = Attendance.query.filter_by(
-                assembly_id=assembly_id,
-                user_id=user_id
-            ).first()
-            
-            if not attendance:
-                attendance = Attendance(
-                    assembly_id=assembly_id,
-                    user_id=user_id
-                )
-                db.session.add(attendance)
-            
-            attendance.is_present = True
-            attendance.attendance_mode = attendance_mode
-            attendance.presence_marked_at = datetime.utcnow()
-            attendance.marked_by = current_user.id
-            marked_count += 1
+        # Procuration : les utilisateurs sont représentés par un membre de la résidence
+        represented_by = data.get('represented_by')
+        if represented_by is not None and \
+                not AttendanceService.residence_member_ids(assembly.residence_id, [represented_by]):
+            return jsonify({'success': False, 'error': 'Mandataire invalide'}), 400
+        
+        # Présences existantes résolues et écrites en une opération groupée
+        marked_count = AttendanceService.mark(
+            assembly, user_ids,
+            attendance_mode=attendance_mode,
+            marked_by=current_user.id,
+            is_present=bool(is_present),
+            represented_by=represented_by
+        )
         
         db.session.commit()
         
+        quorum = AssemblyEngine.quorum(assembly)
+        roster = AttendanceService.roster(assembly_id)
+        AssemblyEvents.publish_attendance(assembly, user_ids, quorum)
+        
         return jsonify({
             'success': True,
             'message': f'{marked_count} présence(s) marquée(s)',
-            'count': marked_count
+            'count': marked_count,
+            'attendances': roster,
+            'quorum': quorum
         }), 200
     except Exception as e:
         db.session.rollback()
@@ -1696,25 +1734,16 @@ def mark_attendance(assembly_id):
 def join_online(assembly_id):
     """Auto-marque la présence en ligne lorsqu'un utilisateur rejoint"""
     try:
-        # Chercher ou créer l'attendance
-        attendance = Attendance.query.filter_by(
-            assembly_id=assembly_id,
-            user_id=current_user.id
-        ).first()
-        
-        if not attendance:
-            attendance = Attendance(
-                assembly_id=assembly_id,
-                user_id=current_user.id
-            )
-            db.session.add(attendance)
-        
-        attendance.is_present = True
-        attendance.attendance_mode = 'online'
-        attendance.presence_marked_at = datetime.utcnow()
-        attendance.marked_by = current_user.id  # Auto-marqué
+        assembly = GeneralAssembly.query.get(assembly_id)
+        if not assembly:
+            return jsonify({'success': False, 'error': 'AG non trouvée'}), 404
         
+        # Présence créée ou mise à jour (auto-marquée)
+        AttendanceService.mark(assembly, [current_user.id], attendance_mode='online', marked_by=current_user.id)
         db.session.commit()
+        AssemblyEvents.publish_attendance(assembly, [current_user.id])
+        
+        attendance = Attendance.query.filter_by(assembly_id=assembly_id, user_id=current_user.id).first()
         
         return jsonify({
             'success': True,
@@ -1732,7 +1761,7 @@ def get_resolutions(assembly_id):
     """Récupère les résolutions d'une AG"""
     try:
         resolutions = Resolution.query.filter_by(assembly_id=assembly_id).order_by(Resolution.order).all()
-        return jsonify({'success': True, 'resolutions': [r.to_dict() for r in resolutions]}), 200
+        return jsonify({'success': True, 'resolutions': serialize_many(Resolution, resolutions)}), 200
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -1749,6 +1778,9 @@ def create_resolution(assembly_id):
             if field not in data:
                 return jsonify({'success': False, 'error': f'Le champ {field} est requis'}), 400
         
+        if data.get('vote_type', 'simple') not in VOTE_TYPES:
+            return jsonify({'success': False, 'error': f"Type de vote invalide (valeurs: {', '.join(VOTE_TYPES)})"}), 400
+        
         resolution = Resolution(
             assembly_id=assembly_id,
             title=data['title'],
@@ -1759,6 +1791,7 @@ def create_resolution(assembly_id):
         
         db.session.add(resolution)
         db.session.commit()
+        AssemblyEvents.publish_resolution(resolution)
         
         return jsonify({'success': True, 'message': 'Résolution créée', 'resolution': resolution.to_dict()}), 201
     except Exception as e:
@@ -1791,47 +1824,18 @@ def submit_vote(resolution_id):
         if vote_value not in ['for', 'against', 'abstain']:
             return jsonify({'success': False, 'error': 'Valeur de vote invalide'}), 400
         
-        # Chercher ou créer le vote
-        vote = Vote.query.filter_by(
-            resolution_id=resolution_id,
-            user_id=current_user.id
-        ).first()
-        
-        if vote:
-            # Mettre à jour le vote existant
-            old_value = vote.vote_value
-            vote.vote_value = vote_value
-            vote.voted_at = datetime.utcnow()
-            
-            # Ajuster les compteurs
-            if old_value == 'for':
-                resolution.votes_for -= 1
-            elif old_value == 'against':
-                resolution.votes_against -= 1
-            elif old_value == 'abstain':
-                resolution.votes_abstain -= 1
-        else:
-            # Créer un nouveau vote
-            vote = Vote(
-                resolution_id=resolution_id,
-                user_id=current_user.id,
-                vote_value=vote_value
-            )
-            db.session.add(vote)
-        
-        # Incrémenter les compteurs
-        if vote_value == 'for':
-            resolution.votes_for += 1
-        elif vote_value == 'against':
-            resolution.votes_against += 1
-        elif vote_value == 'abstain':
-            resolution.votes_abstain += 1
-        
-        # Mettre à jour le statut si nécessaire
-        if resolution.status == 'pending':
-            resolution.status = 'voting'
+        # Votant sans tantièmes ni mandat : aucun poids dans les majorités, le bulletin est refusé
+        power = AssemblyEngine.voting_power(resolution.assembly_id, current_user.id)
+        if not power[1]:
+            return jsonify({'success': False, 'error': 'Seuls les copropriétaires convoqués (ou leurs mandataires) peuvent voter'}), 403
         
+        # Vote inséré ou modifié, compteurs ajustés atomiquement en SQL
+        ResolutionVoteService.record_vote(resolution_id, current_user.id, vote_value, resolution.assembly_id,
+                                          power=power)
         db.session.commit()
+        AssemblyEvents.publish_resolution(resolution)
+        
+        vote = Vote.query.filter_by(resolution_id=resolution_id, user_id=current_user.id).first()
         
         return jsonify({
             'success': True,
@@ -1854,21 +1858,20 @@ def close_resolution(resolution_id):
         if not resolution:
             return jsonify({'success': False, 'error': 'Résolution non trouvée'}), 404
         
-        total_votes = resolution.votes_for + resolution.votes_against + resolution.votes_abstain
-        
-        if total_votes == 0:
-            resolution.status = 'rejected'
-        elif resolution.votes_for > resolution.votes_against:
-            resolution.status = 'approved'
-        else:
-            resolution.status = 'rejected'
+        # Totaux recomptés depuis les bulletins, puis majorité pondérée
+        # (tantièmes, procurations) selon le type de vote, quorum requis
+        AssemblyEngine.recount(resolution)
+        result = AssemblyEngine.decide(resolution, resolution.assembly)
+        resolution.status = 'approved' if result['approved'] else 'rejected'
         
         db.session.commit()
+        AssemblyEvents.publish_resolution(resolution)
         
         return jsonify({
             'success': True,
             'message': 'Résolution clôturée',
-            'resolution': resolution.to_dict()
+            'resolution': resolution.to_dict(),
+            'result': result
         }), 200
     except Exception as e:
         db.session.rollback()
@@ -1881,30 +1884,44 @@ def close_resolution(resolution_id):
 @login_required
 @admin_or_superadmin_required
 def get_litigations():
-    """Récupère les contentieux"""
+    """Récupère les contentieux (paginés par curseur)"""
     try:
         residence_ids = get_user_residence_ids()
+        residence_id = request.args.get('residence_id')
         
         if residence_ids is None:
             # Superadmin voit tous les contentieux
-            residence_id = request.args.get('residence_id')
             query = Litigation.query
             if residence_id:
                 query = query.filter_by(residence_id=int(residence_id))
-            litigations = query.order_by(Litigation.start_date.desc()).all()
         else:
             # Admin/Owner voit seulement les contentieux de ses résidences
-            residence_id = request.args.get('residence_id')
             if residence_id:
                 # Vérifier que la résidence demandée est autorisée
                 if int(residence_id) in residence_ids:
-                    litigations = Litigation.query.filter_by(residence_id=int(residence_id)).order_by(Litigation.start_date.desc()).all()
+                    query = Litigation.query.filter_by(residence_id=int(residence_id))
                 else:
                     return jsonify({'success': False, 'error': 'Accès non autorisé à cette résidence'}), 403
             else:
-                litigations = Litigation.query.filter(Litigation.residence_id.in_(residence_ids)).order_by(Litigation.start_date.desc()).all()
+                query = Litigation.query.filter(Litigation.residence_id.in_(residence_ids))
         
-        return jsonify({'success': True, 'litigations': [l.to_dict() for l in litigations]}), 200
+        query = apply_filters(
+            query, Litigation.start_date,
+            status=Litigation.status,
+            litigation_type=Litigation.litigation_type
+        )
+        limit, cursor = get_pagination_args()
+        litigations, next_cursor = paginate(
+            query, [(Litigation.start_date, True), (Litigation.id, True)], limit, cursor
+        )
+        
+        return jsonify({
+            'success': True,
+            'litigations': serialize_many(Litigation, litigations),
+            'next_cursor': next_cursor
+        }), 200
+    except PaginationError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -2066,18 +2083,32 @@ def close_poll(poll_id):
 @login_required
 @admin_or_superadmin_required
 def get_users():
-    """Récupère la liste des utilisateurs"""
+    """Récupère la liste des utilisateurs (paginée par curseur)"""
     try:
         residence_ids = get_user_residence_ids()
         
         if residence_ids is None:
             # Superadmin voit tous les utilisateurs
-            users = User.query.all()
+            query = User.query
         else:
             # Admin/Owner voit seulement les utilisateurs de ses résidences
-            users = User.query.filter(User.residence_id.in_(residence_ids)).all()
+            query = User.query.filter(User.residence_id.in_(residence_ids))
+        
+        query = apply_filters(
+            query, User.created_at,
+            role=User.role,
+            residence_id=User.residence_id
+        )
+        limit, cursor = get_pagination_args()
+        users, next_cursor = paginate(query, [(User.id, False)], limit, cursor)
         
-        return jsonify({'success': True, 'users': [u.to_dict() for u in users]}), 200
+        return jsonify({
+            'success': True,
+            'users': serialize_many(User, users),
+            'next_cursor': next_cursor
+        }), 200
+    except PaginationError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -2108,6 +2139,8 @@ def update_user(user_id):
                 setattr(user, field, data[field])
         
         db.session.commit()
+        if 'role' in data or 'residence_id' in data:
+            invalidate_residence_scope(user.id)
         return jsonify({'success': True, 'message': 'Utilisateur mis à jour'}), 200
     except Exception as e:
         db.session.rollback()
@@ -2147,6 +2180,7 @@ def update_user_role(user_id):
         user.updated_at = datetime.utcnow()
         
         db.session.commit()
+        invalidate_residence_scope(user.id)
         
         return jsonify({
             'success': True, 
@@ -2211,16 +2245,16 @@ def save_permissions():
                     'error': f'Rôle invalide: {role}. Seuls {", ".join(valid_roles)} peuvent être modifiés.'
                 }), 400
         
-        # TODO: Implémenter la persistance des permissions
-        # Options possibles:
-        # 1. Table Permission(role, resource, action, allowed)
-        # 2. Fichier JSON de configuration
-        # 3. Variables d'environnement
+        # Persister la configuration dans les paramètres (invalide le cache des paramètres).
+        # Le contrôle d'accès reste celui des décorateurs de rôle.
+        AppSettings.set_value(
+            key='role_permissions',
+            value=json.dumps(data),
+            description='Permissions des rôles (JSON)'
+        )
         
-        # Pour l'instant, on log les changements
-        print(f"[PERMISSIONS] Superadmin {current_user.email} a modifié les permissions:")
-        for role, permissions in data.items():
-            print(f"  - {role}: {len(permissions)} permissions activées")
+        logger.info("Permissions des rôles modifiées par %s: %s", current_user.email,
+                    ', '.join(f'{role}={len(permissions)}' for role, permissions in data.items()))
         
         return jsonify({
             'success': True,
@@ -2230,6 +2264,7 @@ def save_permissions():
         }), 200
         
     except Exception as e:
+        db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
@@ -2273,6 +2308,7 @@ def assign_admin_to_residence(residence_id):
                 assigned_count += 1
         
         db.session.commit()
+        invalidate_residence_scope()
         
         return jsonify({
             'success': True,
@@ -2296,7 +2332,7 @@ def get_residence_admins(residence_id):
         
         return jsonify({
             'success': True,
-            'admins': [admin.to_dict() for admin in admins]
+            'admins': serialize_many(User, admins)
         }), 200
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -2318,6 +2354,7 @@ def remove_admin_from_residence(residence_id, admin_id):
         
         db.session.delete(assignment)
         db.session.commit()
+        invalidate_residence_scope(admin_id)
         
         return jsonify({'success': True, 'message': 'Admin retiré de la résidence'}), 200
     except Exception as e:
@@ -2357,25 +2394,23 @@ def create_residence_wizard():
         db.session.add(residence)
         db.session.flush()  # Pour obtenir l'ID
         
-        # Créer les unités si fournies
+        # Créer les unités si fournies (insertion groupée)
         units_data = data.get('units', [])
-        created_units = 0
-        
-        for unit_data in units_data:
-            unit = Unit(
-                residence_id=residence.id,
-                unit_number=unit_data.get('unit_number'),
-                floor=unit_data.get('floor'),
-                building=unit_data.get('building') or unit_data.get('division'),
-                unit_type=unit_data.get('unit_type'),
-                surface_area=unit_data.get('surface_area'),
-                owner_name=unit_data.get('owner_name'),
-                owner_email=unit_data.get('owner_email'),
-                owner_phone=unit_data.get('owner_phone'),
-                is_occupied=unit_data.get('is_occupied', True)
-            )
-            db.session.add(unit)
-            created_units += 1
+        created_units = UnitImportService.insert_units(residence.id, [
+            {
+                'unit_number': unit_data.get('unit_number'),
+                'floor': unit_data.get('floor'),
+                'building': unit_data.get('building') or unit_data.get('division'),
+                'unit_type': unit_data.get('unit_type'),
+                'surface_area': unit_data.get('surface_area'),
+                'tantiemes': unit_data.get('tantiemes'),
+                'owner_name': unit_data.get('owner_name'),
+                'owner_email': unit_data.get('owner_email'),
+                'owner_phone': unit_data.get('owner_phone'),
+                'is_occupied': unit_data.get('is_occupied', True)
+            }
+            for unit_data in units_data
+        ])
         
         # Mettre à jour le nombre total d'unités
         if created_units > 0:
@@ -2385,18 +2420,21 @@ def create_residence_wizard():
         admin_ids = data.get('admin_ids', [])
         assigned_admins = 0
         
-        for admin_id in admin_ids:
-            admin = User.query.get(admin_id)
-            if admin and admin.role in ['admin', 'superadmin']:
-                assignment = ResidenceAdmin(
-                    residence_id=residence.id,
-                    user_id=admin_id,
-                    assigned_by=current_user.id
-                )
-                db.session.add(assignment)
-                assigned_admins += 1
+        admins = User.query.filter(
+            User.id.in_(admin_ids),
+            User.role.in_(['admin', 'superadmin'])
+        ).all() if admin_ids else []
+        for admin in admins:
+            assignment = ResidenceAdmin(
+                residence_id=residence.id,
+                user_id=admin.id,
+                assigned_by=current_user.id
+            )
+            db.session.add(assignment)
+            assigned_admins += 1
         
         db.session.commit()
+        invalidate_residence_scope()
         
         return jsonify({
             'success': True,
@@ -9,9 +9,10 @@ Mail : moa@myoneart.com
 www.myoneart.com
 """
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from flask_login import login_required, current_user
 from datetime import datetime
+from sqlalchemy.orm import selectinload
 from decimal import Decimal
 
 from backend.models import db
@@ -24,7 +25,17 @@ from backend.models.payment import Payment
 from backend.models.general_assembly import GeneralAssembly, Resolution, Vote, Attendance
 from backend.models.maintenance_log import MaintenanceLog
 from backend.services.charge_calculator import ChargeCalculator
+from backend.services.ledger_service import LedgerService
 from backend.services.notification_service import NotificationService
+from backend.services.poll_results import PollResults, mark_polls_changed
+from backend.services.resolution_votes import ResolutionVoteService
+from backend.services.live_events import AssemblyEvents
+from backend.services.attendance_service import AttendanceService
+from backend.services.assembly_engine import AssemblyEngine
+from backend.services.file_storage import FileStorage
+from backend.services.image_pipeline import ImagePipeline
+from backend.utils.serializers import serialize_many, prefetch_related
+from backend.utils.pagination import PaginationError, apply_filters, get_pagination_args, paginate
 
 # Créer le blueprint
 resident_bp = Blueprint('resident', __name__)
@@ -74,10 +85,10 @@ def dashboard():
         
         return jsonify({
             'success': True,
-            'maintenance_requests': [m.to_dict() for m in maintenance_requests],
-            'news': [n.to_dict() for n in news],
+            'maintenance_requests': serialize_many(MaintenanceRequest, maintenance_requests),
+            'news': serialize_many(News, news),
             'balance': balance,
-            'upcoming_assemblies': [a.to_dict() for a in upcoming_assemblies]
+            'upcoming_assemblies': serialize_many(GeneralAssembly, upcoming_assemblies)
         }), 200
         
     except Exception as e:
@@ -89,10 +100,10 @@ def dashboard():
 @resident_bp.route('/news', methods=['GET'])
 @login_required
 def get_news():
-    """Récupère les actualités de la résidence"""
+    """Récupère les actualités de la résidence (paginées par curseur)"""
     try:
         if not current_user.residence_id:
-            return jsonify({'success': True, 'news': []}), 200
+            return jsonify({'success': True, 'news': [], 'next_cursor': None}), 200
         
         news_type = request.args.get('type', 'feed')  # 'feed' ou 'announcement'
         
@@ -107,10 +118,21 @@ def get_news():
         if current_user.role == 'resident' and news_type == 'announcement':
             return jsonify({'success': False, 'error': 'Accès non autorisé'}), 403
         
-        news = query.order_by(News.is_pinned.desc(), News.published_at.desc()).all()
+        query = apply_filters(query, News.published_at, category=News.category)
+        limit, cursor = get_pagination_args()
+        news, next_cursor = paginate(
+            query, [(News.is_pinned, True, False), (News.published_at, True, News.created_at), (News.id, True)],
+            limit, cursor
+        )
         
-        return jsonify({'success': True, 'news': [n.to_dict() for n in news]}), 200
+        return jsonify({
+            'success': True,
+            'news': serialize_many(News, news),
+            'next_cursor': next_cursor
+        }), 200
         
+    except PaginationError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -191,9 +213,6 @@ def create_news():
 @login_required
 def create_maintenance_request():
     """Crée une nouvelle demande de maintenance"""
-    import os
-    from werkzeug.utils import secure_filename
-    
     try:
         # Gérer les données multipart/form-data pour l'upload d'images
         if request.content_type and 'multipart/form-data' in request.content_type:
@@ -215,20 +234,14 @@ def create_maintenance_request():
         
         # Gérer l'upload d'image
         image_path = None
+        image_thumbnail_path = image_display_path = None
+        queued = False
         if image_file and image_file.filename:
-            # Créer le dossier uploads si nécessaire
-            upload_folder = os.path.join('frontend', 'static', 'uploads', 'maintenance')
-            os.makedirs(upload_folder, exist_ok=True)
-            
-            # Sécuriser le nom de fichier
-            filename = secure_filename(image_file.filename)
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f"{timestamp}_{filename}"
-            
-            # Sauvegarder le fichier
-            file_path = os.path.join(upload_folder, filename)
-            image_file.save(file_path)
-            image_path = f"/static/uploads/maintenance/{filename}"
+            # Stockage par contenu : une photo déjà envoyée n'est pas réécrite
+            stored_file = FileStorage.store(image_file)
+            image_path = FileStorage.url(stored_file)
+            queued = ImagePipeline.enqueue(stored_file)
+            image_thumbnail_path, image_display_path = ImagePipeline.variant_urls(stored_file)
         
         # Générer un numéro de suivi unique
         tracking_number = MaintenanceRequest.generate_tracking_number(current_user.residence_id)
@@ -244,12 +257,18 @@ def create_maintenance_request():
             title=data['title'],
             description=data['description'],
             priority=data.get('priority', 'medium'),
-            image_path=image_path
+            image_path=image_path,
+            image_thumbnail_path=image_thumbnail_path,
+            image_display_path=image_display_path
         )
         
         db.session.add(maintenance_request)
         db.session.commit()
         
+        # Miniature et version d'affichage générées en arrière-plan
+        if queued and not image_thumbnail_path and not ImagePipeline.link_if_ready(stored_file):
+            ImagePipeline.wake(current_app._get_current_object())
+        
         # Notifier les administrateurs
         NotificationService.notify_new_maintenance_request(maintenance_request)
         
@@ -274,7 +293,7 @@ def get_maintenance_requests():
             author_id=current_user.id
         ).order_by(MaintenanceRequest.created_at.desc()).all()
         
-        return jsonify({'success': True, 'maintenance_requests': [r.to_dict() for r in requests]}), 200
+        return jsonify({'success': True, 'maintenance_requests': serialize_many(MaintenanceRequest, requests)}), 200
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -325,7 +344,7 @@ def get_resident_maintenance_comments(request_id):
         
         return jsonify({
             'success': True,
-            'comments': [c.to_dict() for c in comments]
+            'comments': serialize_many(MaintenanceComment, comments)
         }), 200
         
     except Exception as e:
@@ -402,7 +421,7 @@ def get_resident_maintenance_documents(request_id):
         
         return jsonify({
             'success': True,
-            'documents': [d.to_dict() for d in documents]
+            'documents': serialize_many(MaintenanceDocument, documents)
         }), 200
         
     except Exception as e:
@@ -422,6 +441,7 @@ def get_my_charges():
         
         # SÉCURISÉ: Filtre par unit_id de l'utilisateur
         distributions = ChargeDistribution.query.filter_by(unit_id=current_user.unit_id).all()
+        prefetch_related(ChargeDistribution, distributions)
         
         charges_data = []
         for dist in distributions:
@@ -477,9 +497,6 @@ def get_balance():
 @login_required
 def declare_payment():
     """Déclare un paiement"""
-    import os
-    from werkzeug.utils import secure_filename
-    
     try:
         # SÉCURITÉ: Vérifier unit_id
         if not current_user.unit_id:
@@ -500,20 +517,14 @@ def declare_payment():
         
         # Gérer l'upload du justificatif
         proof_document_path = None
+        proof_thumbnail_path = proof_display_path = None
+        queued = False
         if proof_file and proof_file.filename:
-            # Créer le dossier uploads si nécessaire
-            upload_folder = os.path.join('frontend', 'static', 'uploads', 'payments')
-            os.makedirs(upload_folder, exist_ok=True)
-            
-            # Sécuriser le nom de fichier
-            filename = secure_filename(proof_file.filename)
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f"{timestamp}_{filename}"
-            
-            # Sauvegarder le fichier
-            file_path = os.path.join(upload_folder, filename)
-            proof_file.save(file_path)
-            proof_document_path = f"/static/uploads/payments/{filename}"
+            # Stockage par contenu : un justificatif déjà envoyé n'est pas réécrit
+            stored_file = FileStorage.store(proof_file)
+            proof_document_path = FileStorage.url(stored_file)
+            queued = ImagePipeline.enqueue(stored_file)
+            proof_thumbnail_path, proof_display_path = ImagePipeline.variant_urls(stored_file)
         
         # SÉCURITÉ: Utiliser unit_id et user_id de current_user (pas de la requête)
         payment = Payment(
@@ -525,12 +536,20 @@ def declare_payment():
             description=data.get('description'),
             payment_date=datetime.fromisoformat(data['payment_date']),
             proof_document=proof_document_path,
+            proof_thumbnail_path=proof_thumbnail_path,
+            proof_display_path=proof_display_path,
             status='pending'
         )
         
         db.session.add(payment)
+        db.session.flush()
+        LedgerService.record_payment_declared(payment)
         db.session.commit()
         
+        # Miniature et version d'affichage d'une photo générées en arrière-plan
+        if queued and not proof_thumbnail_path and not ImagePipeline.link_if_ready(stored_file):
+            ImagePipeline.wake(current_app._get_current_object())
+        
         return jsonify({'success': True, 'message': 'Paiement enregistré', 'payment': payment.to_dict()}), 201
         
     except Exception as e:
@@ -546,7 +565,7 @@ def get_my_payments():
         # SÉCURISÉ: Filtre par user_id
         payments = Payment.query.filter_by(user_id=current_user.id).order_by(Payment.payment_date.desc()).all()
         
-        return jsonify({'success': True, 'payments': [p.to_dict() for p in payments]}), 200
+        return jsonify({'success': True, 'payments': serialize_many(Payment, payments)}), 200
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -568,7 +587,7 @@ def get_documents():
             is_public=True
         ).order_by(Document.document_date.desc()).all()
         
-        return jsonify({'success': True, 'documents': [d.to_dict() for d in documents]}), 200
+        return jsonify({'success': True, 'documents': serialize_many(Document, documents)}), 200
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -608,16 +627,20 @@ def get_polls():
         polls = Poll.query.filter_by(
             residence_id=current_user.residence_id,
             status='active'
-        ).order_by(Poll.created_at.desc()).all()
+        ).options(selectinload(Poll.options)).order_by(Poll.created_at.desc()).all()
+        
+        poll_ids = [poll.id for poll in polls]
+        
+        # Une requête pour les votes de l'utilisateur, une pour les décomptes
+        voted_ids = PollResults.get_voted_poll_ids(current_user.id, poll_ids)
+        tallies = PollResults.get_tallies(poll_ids)
         
         polls_data = []
         for poll in polls:
             poll_dict = poll.to_dict()
-            
-            # Vérifier si l'utilisateur a déjà voté
-            user_vote = PollVote.query.filter_by(poll_id=poll.id, user_id=current_user.id).first()
-            poll_dict['has_voted'] = user_vote is not None
-            poll_dict['options'] = [opt.to_dict() for opt in poll.options]
+            counts = tallies[poll.id]
+            poll_dict['has_voted'] = poll.id in voted_ids
+            poll_dict['options'] = [opt.to_dict(vote_count=counts.get(opt.id, 0)) for opt in poll.options]
             
             polls_data.append(poll_dict)
         
@@ -641,16 +664,18 @@ def get_poll_detail(poll_id):
         if poll.residence_id != current_user.residence_id:
             return jsonify({'success': False, 'error': 'Accès non autorisé'}), 403
         
+        counts = PollResults.get_tallies([poll.id])[poll.id]
+        
         poll_dict = poll.to_dict()
-        poll_dict['options'] = [opt.to_dict() for opt in poll.options]
+        poll_dict['options'] = [opt.to_dict(vote_count=counts.get(opt.id, 0)) for opt in poll.options]
         
         # Vérifier si l'utilisateur a déjà voté
-        user_vote = PollVote.query.filter_by(poll_id=poll.id, user_id=current_user.id).first()
-        poll_dict['has_voted'] = user_vote is not None
+        has_voted = poll.id in PollResults.get_voted_poll_ids(current_user.id, [poll.id])
+        poll_dict['has_voted'] = has_voted
         
         # Si le sondage est fermé ou l'utilisateur a voté, afficher les résultats
-        if poll.status == 'closed' or user_vote:
-            poll_dict['results'] = poll.get_results()
+        if poll.status == 'closed' or has_voted:
+            poll_dict['results'] = PollResults.build(poll, counts)
         
         return jsonify({'success': True, 'poll': poll_dict}), 200
         
@@ -699,6 +724,7 @@ def vote_poll(poll_id):
         )
         
         db.session.add(vote)
+        mark_polls_changed([poll_id])
         db.session.commit()
         
         return jsonify({'success': True, 'message': 'Vote enregistré'}), 201
@@ -723,7 +749,7 @@ def get_assemblies():
             residence_id=current_user.residence_id
         ).order_by(GeneralAssembly.scheduled_date.desc()).all()
         
-        return jsonify({'success': True, 'assemblies': [a.to_dict() for a in assemblies]}), 200
+        return jsonify({'success': True, 'assemblies': serialize_many(GeneralAssembly, assemblies)}), 200
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -747,7 +773,7 @@ def get_assembly_detail(assembly_id):
         
         # Ajouter les résolutions
         resolutions = Resolution.query.filter_by(assembly_id=assembly_id).order_by(Resolution.order).all()
-        assembly_dict['resolutions'] = [r.to_dict() for r in resolutions]
+        assembly_dict['resolutions'] = serialize_many(Resolution, resolutions)
         
         # Vérifier la présence de l'utilisateur
         attendance = Attendance.query.filter_by(assembly_id=assembly_id, user_id=current_user.id).first()
@@ -759,6 +785,26 @@ def get_assembly_detail(assembly_id):
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+@resident_bp.route('/assemblies/<int:assembly_id>/events', methods=['GET'])
+@login_required
+def assembly_events(assembly_id):
+    """Flux SSE des présences, votes et statuts d'une AG"""
+    try:
+        assembly = GeneralAssembly.query.get(assembly_id)
+        
+        # SÉCURITÉ: Vérifier residence_id
+        if not assembly:
+            return jsonify({'success': False, 'error': 'AG non trouvée'}), 404
+        
+        if assembly.residence_id != current_user.residence_id:
+            return jsonify({'success': False, 'error': 'Accès non autorisé'}), 403
+        
+        return AssemblyEvents.response(assembly_id)
+        
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
 @resident_bp.route('/assemblies/<int:assembly_id>/attend', methods=['POST'])
 @login_required
 def register_attendance(assembly_id):
@@ -773,21 +819,16 @@ def register_attendance(assembly_id):
         if assembly.residence_id != current_user.residence_id:
             return jsonify({'success': False, 'error': 'Accès non autorisé'}), 403
         
-        # Vérifier si déjà enregistré
-        attendance = Attendance.query.filter_by(assembly_id=assembly_id, user_id=current_user.id).first()
-        
-        if attendance:
-            attendance.is_present = True
-        else:
-            # SÉCURITÉ: Utiliser user_id de current_user
-            attendance = Attendance(
-                assembly_id=assembly_id,
-                user_id=current_user.id,  # Dérivé de l'utilisateur authentifié
-                is_present=True
-            )
-            db.session.add(attendance)
+        data = request.get_json(silent=True) or {}
+        attendance_mode = data.get('attendance_mode', 'physical')
+        if attendance_mode not in ['physical', 'online']:
+            return jsonify({'success': False, 'error': 'Mode de présence invalide'}), 400
         
+        # SÉCURITÉ: Présence créée ou mise à jour pour current_user uniquement
+        AttendanceService.mark(assembly, [current_user.id], attendance_mode=attendance_mode,
+                               marked_by=current_user.id)
         db.session.commit()
+        AssemblyEvents.publish_attendance(assembly, [current_user.id])
         
         return jsonify({'success': True, 'message': 'Présence enregistrée'}), 200
         
@@ -827,40 +868,16 @@ def vote_resolution(resolution_id):
         if vote_value not in ['for', 'against', 'abstain']:
             return jsonify({'success': False, 'error': 'Vote invalide'}), 400
         
-        # Vérifier si l'utilisateur a déjà voté
-        existing_vote = Vote.query.filter_by(resolution_id=resolution_id, user_id=current_user.id).first()
-        
-        if existing_vote:
-            # Mettre à jour le vote existant
-            old_value = existing_vote.vote_value
-            existing_vote.vote_value = vote_value
-            existing_vote.voted_at = datetime.utcnow()
-            
-            # Ajuster les compteurs
-            if old_value == 'for':
-                resolution.votes_for -= 1
-            elif old_value == 'against':
-                resolution.votes_against -= 1
-            elif old_value == 'abstain':
-                resolution.votes_abstain -= 1
-        else:
-            # SÉCURITÉ: Créer un nouveau vote avec user_id de current_user
-            vote = Vote(
-                resolution_id=resolution_id,
-                user_id=current_user.id,  # Dérivé de l'utilisateur authentifié
-                vote_value=vote_value
-            )
-            db.session.add(vote)
-        
-        # Incrémenter les compteurs
-        if vote_value == 'for':
-            resolution.votes_for += 1
-        elif vote_value == 'against':
-            resolution.votes_against += 1
-        elif vote_value == 'abstain':
-            resolution.votes_abstain += 1
+        # Résident sans lot ni mandat : aucun poids dans les majorités, le bulletin est refusé
+        power = AssemblyEngine.voting_power(resolution.assembly_id, current_user.id)
+        if not power[1]:
+            return jsonify({'success': False, 'error': 'Seuls les copropriétaires convoqués (ou leurs mandataires) peuvent voter'}), 403
         
+        # SÉCURITÉ: Vote enregistré avec user_id de current_user, compteurs ajustés atomiquement
+        ResolutionVoteService.record_vote(resolution_id, current_user.id, vote_value, resolution.assembly_id,
+                                          power=power)
         db.session.commit()
+        AssemblyEvents.publish_resolution(resolution)
         
         return jsonify({'success': True, 'message': 'Vote enregistré', 'attendance_mode': attendance.attendance_mode}), 200
         
@@ -884,7 +901,7 @@ def get_maintenance_logs():
             residence_id=current_user.residence_id
         ).order_by(MaintenanceLog.intervention_date.desc()).limit(50).all()
         
-        return jsonify({'success': True, 'logs': [l.to_dict() for l in logs]}), 200
+        return jsonify({'success': True, 'logs': serialize_many(MaintenanceLog, logs)}), 200
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
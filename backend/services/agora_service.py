@@ -8,7 +8,6 @@ Service pour gérer l'intégration avec Agora.io pour les réunions en ligne
 
 import os
 import time
-from agora_token_builder import RtcTokenBuilder, RtmTokenBuilder
 
 
 class AgoraService:
@@ -52,6 +51,9 @@ class AgoraService:
             return None
         
         try:
+            # SDK importé à la demande : seules les AG en ligne en ont besoin
+            from agora_token_builder import RtcTokenBuilder
+            
             # Calculer l'expiration (timestamp Unix)
             privilege_expired_ts = int(time.time()) + expiration_seconds
             
@@ -94,6 +96,8 @@ class AgoraService:
             return None
         
         try:
+            from agora_token_builder import RtmTokenBuilder
+            
             # Calculer l'expiration
             privilege_expired_ts = int(time.time()) + expiration_seconds
             
@@ -0,0 +1,505 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shabaka Syndic - Solution complète et digitale pour les syndics et résidents au Maroc.
+
+Shabaka Syndic
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+"""
+
+from datetime import datetime
+from sqlalchemy import and_, bindparam, case, func, insert, or_, select, update
+from backend.models import db
+from backend.models.general_assembly import GeneralAssembly, Resolution, Vote, Attendance
+from backend.models.residence import Unit
+from backend.models.user import User
+
+
+# Types de vote acceptés et règle de majorité correspondante
+VOTE_TYPES = {
+    'simple': 'simple',
+    'absolue': 'absolute',
+    'absolute': 'absolute',
+    'double_majorite': 'double',
+    'double': 'double',
+    'unanimite': 'unanimity',
+}
+
+# Résolutions dont les bulletins suivent les changements de procuration
+OPEN_STATUSES = ('pending', 'voting')
+
+
+class AssemblyEngine:
+    """
+    Quorum et majorités pondérés des assemblées générales
+
+    Chaque copropriétaire pèse les tantièmes de son lot (ou une voix si la
+    résidence n'a pas de tantièmes). Les totaux sont tenus à jour par des
+    incréments SQL atomiques à chaque présence et à chaque vote :
+    - general_assemblies.present_count / present_weight (présents et représentés)
+    - resolutions.weight_for / weight_against / weight_abstain / voices_for
+
+    Un bulletin pèse les tantièmes du votant présent et de ses mandants
+    (Attendance.represented_by). rebuild() fige les copropriétaires convoqués
+    (une ligne de présence par copropriétaire, avec son poids dans
+    Attendance.weight) et recalcule tout depuis les tables (ouverture de l'AG
+    ou réparation) ; les présences suivantes réutilisent ces poids.
+    """
+
+    # ==================== POIDS ====================
+
+    @staticmethod
+    def owner_weights(residence_id, user_ids=None, basis='tantiemes'):
+        """
+        Poids des copropriétaires actifs d'une résidence (une requête)
+
+        Args:
+            residence_id: ID de la résidence
+            user_ids: Limiter à ces utilisateurs (None = tous les copropriétaires)
+            basis: 'tantiemes' ou 'count' (une voix par copropriétaire)
+
+        Returns:
+            dict: {user_id: poids} (les non-copropriétaires sont absents)
+        """
+        query = select(User.id, func.coalesce(Unit.tantiemes, 0))\
+            .outerjoin(Unit, User.unit_id == Unit.id)\
+            .where(User.residence_id == residence_id, User.role == 'owner', User.is_active == True)
+        if user_ids is not None:
+            if not user_ids:
+                return {}
+            query = query.where(User.id.in_(set(user_ids)))
+
+        return {
+            user_id: (1 if basis == 'count' else tantiemes)
+            for user_id, tantiemes in db.session.execute(query)
+        }
+
+    @staticmethod
+    def _power(rows, user_id):
+        """Poids et voix d'un votant d'après les présences (les siennes et ses mandats)"""
+        weight = 0
+        voices = 0
+        for row in rows:
+            if row.weight is None:
+                continue
+            if row.user_id == user_id:
+                # Absent (ou mandat confié à un autre copropriétaire) : ses voix ne comptent pas ici
+                if not row.is_present:
+                    continue
+            elif row.represented_by != user_id or row.is_present:
+                continue
+            weight += row.weight
+            voices += 1
+        return weight, voices
+
+    @staticmethod
+    def voting_power(assembly_id, user_id):
+        """
+        Poids d'un bulletin : tantièmes du votant et de ses mandants (une requête)
+
+        Returns:
+            tuple: (poids, nombre de copropriétaires exprimés)
+        """
+        rows = db.session.execute(
+            select(Attendance.user_id, Attendance.represented_by, Attendance.is_present, Attendance.weight)
+            .where(
+                Attendance.assembly_id == assembly_id,
+                or_(Attendance.user_id == user_id, Attendance.represented_by == user_id)
+            )
+        ).all()
+        return AssemblyEngine._power(rows, user_id)
+
+    # ==================== RECONSTRUCTION ====================
+
+    @staticmethod
+    def rebuild(assembly):
+        """
+        Recalcule tous les totaux pondérés d'une AG depuis les tables
+
+        Fige la liste des copropriétaires convoqués et leurs tantièmes,
+        puis recalcule présences, poids des bulletins et résultats des
+        résolutions. Ne valide pas la transaction.
+
+        Args:
+            assembly: Assemblée générale
+
+        Returns:
+            dict: Quorum de l'AG
+        """
+        weights = AssemblyEngine.owner_weights(assembly.residence_id)
+        total_tantiemes = sum(weights.values())
+        basis = 'tantiemes' if total_tantiemes > 0 else 'count'
+        if basis == 'count':
+            weights = {user_id: 1 for user_id in weights}
+
+        assembly.weight_basis = basis
+        assembly.eligible_count = len(weights)
+        assembly.eligible_weight = sum(weights.values())
+
+        # Poids des présences
+        attendances = db.session.execute(
+            select(Attendance.id, Attendance.user_id, Attendance.represented_by, Attendance.is_present)
+            .where(Attendance.assembly_id == assembly.id)
+        ).all()
+        if attendances:
+            db.session.execute(update(Attendance), [
+                {'id': row.id, 'weight': weights.get(row.user_id)} for row in attendances
+            ])
+
+        # Copropriétaires convoqués sans présence : ligne absente portant leur poids figé
+        attending = {row.user_id for row in attendances}
+        missing = [user_id for user_id in weights if user_id not in attending]
+        if missing:
+            now = datetime.utcnow()
+            db.session.execute(insert(Attendance), [
+                {'assembly_id': assembly.id, 'user_id': user_id, 'is_present': False,
+                 'weight': weights[user_id], 'registered_at': now}
+                for user_id in missing
+            ])
+
+        counted = [
+            row.user_id for row in attendances
+            if row.user_id in weights and (row.is_present or row.represented_by is not None)
+        ]
+        assembly.present_count = len(counted)
+        assembly.present_weight = sum(weights[user_id] for user_id in counted)
+        assembly.quorum_reached = AssemblyEngine._quorum_reached(
+            assembly.present_weight, assembly.eligible_weight, assembly.quorum_required
+        )
+
+        # Poids des bulletins et résultats des résolutions
+        rows = [
+            _Presence(row.user_id, row.represented_by, row.is_present, weights.get(row.user_id))
+            for row in attendances
+        ]
+        votes = db.session.execute(
+            select(Vote.id, Vote.resolution_id, Vote.user_id, Vote.vote_value)
+            .join(Resolution, Vote.resolution_id == Resolution.id)
+            .where(Resolution.assembly_id == assembly.id)
+        ).all()
+
+        powers = {}
+        totals = {}
+        vote_updates = []
+        for vote in votes:
+            if vote.user_id not in powers:
+                powers[vote.user_id] = AssemblyEngine._power(rows, vote.user_id)
+            weight, voices = powers[vote.user_id]
+            vote_updates.append({'id': vote.id, 'weight': weight, 'voices': voices})
+
+            total = totals.setdefault(vote.resolution_id, _empty_totals())
+            if vote.vote_value in ('for', 'against', 'abstain'):
+                total[f'weight_{vote.vote_value}'] += weight
+                if vote.vote_value == 'for':
+                    total['voices_for'] += voices
+
+        if vote_updates:
+            db.session.execute(update(Vote), vote_updates)
+
+        resolution_ids = db.session.execute(
+            select(Resolution.id).where(Resolution.assembly_id == assembly.id)
+        ).scalars().all()
+        if resolution_ids:
+            db.session.execute(update(Resolution), [
+                dict(totals.get(resolution_id, _empty_totals()), id=resolution_id)
+                for resolution_id in resolution_ids
+            ])
+
+        return AssemblyEngine.quorum(assembly)
+
+    @staticmethod
+    def recount(resolution):
+        """
+        Recalcule les résultats d'une résolution depuis ses bulletins
+
+        Les totaux sont tenus par incréments au fil des votes et des
+        procurations ; avant la clôture, ils sont recalculés depuis les
+        bulletins et les présences (poids figés de l'AG). Ne valide pas la
+        transaction.
+
+        Args:
+            resolution: Résolution à recompter
+        """
+        AssemblyEngine.ensure(resolution.assembly)
+        AssemblyEngine.lock(resolution.assembly_id)
+
+        rows = db.session.execute(
+            select(Attendance.user_id, Attendance.represented_by, Attendance.is_present, Attendance.weight)
+            .where(Attendance.assembly_id == resolution.assembly_id)
+        ).all()
+        votes = db.session.execute(
+            select(Vote.id, Vote.user_id, Vote.vote_value).where(Vote.resolution_id == resolution.id)
+        ).all()
+
+        totals = _empty_totals()
+        vote_updates = []
+        for vote in votes:
+            weight, voices = AssemblyEngine._power(rows, vote.user_id)
+            vote_updates.append({'id': vote.id, 'weight': weight, 'voices': voices})
+            if vote.vote_value in ('for', 'against', 'abstain'):
+                totals[f'weight_{vote.vote_value}'] += weight
+                if vote.vote_value == 'for':
+                    totals['voices_for'] += voices
+
+        if vote_updates:
+            db.session.execute(update(Vote), vote_updates)
+        for column, value in totals.items():
+            setattr(resolution, column, value)
+        db.session.flush()
+
+    @staticmethod
+    def ensure(assembly):
+        """Initialise les totaux d'une AG qui n'en a pas encore"""
+        if assembly.eligible_count is None:
+            AssemblyEngine.rebuild(assembly)
+            db.session.flush()
+
+    # ==================== PRÉSENCES ====================
+
+    @staticmethod
+    def lock(assembly_id):
+        """
+        Verrouille la ligne de l'AG jusqu'à la fin de la transaction
+
+        Sérialise les écritures de présences d'une même AG (lecture de
+        l'état précédent puis écriture) ; sans effet sur SQLite, dont les
+        écritures sont déjà sérialisées.
+        """
+        db.session.execute(
+            select(GeneralAssembly.id).where(GeneralAssembly.id == assembly_id).with_for_update()
+        )
+
+    @staticmethod
+    def apply_presence(assembly, count_delta, weight_delta):
+        """
+        Ajuste les présents et le quorum par un UPDATE atomique
+
+        Args:
+            assembly: Assemblée générale
+            count_delta: Variation du nombre de copropriétaires présents ou représentés
+            weight_delta: Variation des tantièmes présents ou représentés
+        """
+        if not count_delta and not weight_delta:
+            return
+
+        present_weight = func.coalesce(GeneralAssembly.present_weight, 0) + weight_delta
+        db.session.execute(
+            update(GeneralAssembly)
+            .where(GeneralAssembly.id == assembly.id)
+            .values(
+                present_count=func.coalesce(GeneralAssembly.present_count, 0) + count_delta,
+                present_weight=present_weight,
+                quorum_reached=case(
+                    (and_(
+                        GeneralAssembly.eligible_weight > 0,
+                        present_weight * 100 >= func.coalesce(GeneralAssembly.quorum_required, 50)
+                        * GeneralAssembly.eligible_weight
+                    ), True),
+                    else_=False
+                )
+            )
+            .execution_options(synchronize_session=False)
+        )
+        db.session.expire(assembly, ['present_count', 'present_weight', 'quorum_reached'])
+
+    @staticmethod
+    def refresh_voting_power(assembly_id, user_ids):
+        """
+        Met à jour les bulletins déjà déposés après un changement de procuration
+
+        Seuls les bulletins des votants concernés sur les résolutions encore
+        ouvertes sont ajustés ; les résultats des résolutions reçoivent la
+        différence de poids (col = col + delta).
+
+        Args:
+            assembly_id: ID de l'AG
+            user_ids: Votants dont les mandats ont changé
+        """
+        user_ids = {user_id for user_id in user_ids if user_id is not None}
+        if not user_ids:
+            return
+
+        votes = db.session.execute(
+            select(Vote.id, Vote.resolution_id, Vote.user_id, Vote.vote_value, Vote.weight, Vote.voices)
+            .join(Resolution, Vote.resolution_id == Resolution.id)
+            .where(
+                Resolution.assembly_id == assembly_id,
+                Resolution.status.in_(OPEN_STATUSES),
+                Vote.user_id.in_(user_ids)
+            )
+        ).all()
+        if not votes:
+            return
+
+        rows = db.session.execute(
+            select(Attendance.user_id, Attendance.represented_by, Attendance.is_present, Attendance.weight)
+            .where(
+                Attendance.assembly_id == assembly_id,
+                or_(Attendance.user_id.in_(user_ids), Attendance.represented_by.in_(user_ids))
+            )
+        ).all()
+
+        vote_updates = []
+        deltas = {}
+        for vote in votes:
+            weight, voices = AssemblyEngine._power(rows, vote.user_id)
+            weight_delta = weight - (vote.weight or 0)
+            voices_delta = voices - (vote.voices or 0)
+            if not weight_delta and not voices_delta:
+                continue
+            vote_updates.append({'id': vote.id, 'weight': weight, 'voices': voices})
+
+            delta = deltas.setdefault(vote.resolution_id, _empty_totals())
+            if vote.vote_value in ('for', 'against', 'abstain'):
+                delta[f'weight_{vote.vote_value}'] += weight_delta
+                if vote.vote_value == 'for':
+                    delta['voices_for'] += voices_delta
+
+        if vote_updates:
+            db.session.execute(update(Vote), vote_updates)
+        if deltas:
+            AssemblyEngine._apply_resolution_deltas([
+                dict(delta, resolution_id=resolution_id) for resolution_id, delta in deltas.items()
+            ])
+
+    # ==================== VOTES ====================
+
+    @staticmethod
+    def _apply_resolution_deltas(rows):
+        """Applique des incréments aux résultats pondérés de plusieurs résolutions (executemany)"""
+        statement = update(Resolution.__table__)\
+            .where(Resolution.__table__.c.id == bindparam('resolution_id'))\
+            .values({
+                column: func.coalesce(getattr(Resolution.__table__.c, column), 0) + bindparam(column)
+                for column in _empty_totals()
+            })
+        db.session.execute(statement, rows)
+
+    @staticmethod
+    def vote_deltas(previous, current):
+        """
+        Incréments des résultats d'une résolution pour un bulletin déposé ou modifié
+
+        Args:
+            previous: (valeur, poids, voix) du bulletin précédent ou None
+            current: (valeur, poids, voix) du nouveau bulletin
+
+        Returns:
+            dict: {colonne: incrément} (colonnes de Resolution)
+        """
+        deltas = {}
+
+        def add(ballot, sign):
+            value, weight, voices = ballot
+            for column, amount in ((f'votes_{value}', 1), (f'weight_{value}', weight or 0)):
+                deltas[column] = deltas.get(column, 0) + sign * amount
+            if value == 'for':
+                deltas['voices_for'] = deltas.get('voices_for', 0) + sign * (voices or 0)
+
+        if previous is not None:
+            add(previous, -1)
+        add(current, 1)
+        return {column: delta for column, delta in deltas.items() if delta}
+
+    # ==================== QUORUM ET MAJORITÉS ====================
+
+    @staticmethod
+    def _quorum_reached(present_weight, eligible_weight, required):
+        required = required if required is not None else 50
+        return bool(eligible_weight) and (present_weight or 0) * 100 >= required * eligible_weight
+
+    @staticmethod
+    def quorum(assembly):
+        """
+        Quorum de l'AG d'après les totaux tenus à jour (sans recalcul)
+
+        Returns:
+            dict: basis, eligible, present, eligible_weight, present_weight,
+                  percentage, required, reached
+        """
+        AssemblyEngine.ensure(assembly)
+        eligible_weight = assembly.eligible_weight or 0
+        present_weight = assembly.present_weight or 0
+        required = assembly.quorum_required if assembly.quorum_required is not None else 50
+
+        return {
+            'basis': assembly.weight_basis,
+            'eligible': assembly.eligible_count,
+            'present': assembly.present_count or 0,
+            'eligible_weight': eligible_weight,
+            'present_weight': present_weight,
+            'percentage': round(present_weight / eligible_weight * 100, 2) if eligible_weight else 0,
+            'required': required,
+            'reached': AssemblyEngine._quorum_reached(present_weight, eligible_weight, required)
+        }
+
+    @staticmethod
+    def decide(resolution, assembly):
+        """
+        Détermine le résultat d'une résolution selon son type de majorité
+
+        - simple : tantièmes pour > tantièmes contre (abstentions exclues)
+        - absolue : tantièmes pour > moitié des tantièmes de la résidence
+        - double_majorite : majorité des copropriétaires représentant au
+          moins les deux tiers des tantièmes
+        - unanimite : tous les tantièmes de la résidence pour
+
+        Une résolution n'est adoptée que si le quorum est atteint.
+
+        Returns:
+            dict: approved, rule, quorum_reached et les totaux utilisés
+
+        Raises:
+            ValueError: Si le type de vote est inconnu
+        """
+        rule = VOTE_TYPES.get(resolution.vote_type or 'simple')
+        if rule is None:
+            raise ValueError(f'Type de vote inconnu: {resolution.vote_type}')
+
+        quorum = AssemblyEngine.quorum(assembly)
+        eligible_weight = quorum['eligible_weight']
+        eligible_count = quorum['eligible'] or 0
+        weight_for = resolution.weight_for or 0
+        weight_against = resolution.weight_against or 0
+        voices_for = resolution.voices_for or 0
+
+        if rule == 'simple':
+            majority = weight_for > weight_against
+        elif rule == 'absolute':
+            majority = weight_for * 2 > eligible_weight
+        elif rule == 'double':
+            majority = voices_for * 2 > eligible_count and weight_for * 3 >= eligible_weight * 2
+        else:
+            majority = eligible_weight > 0 and weight_for == eligible_weight
+
+        return {
+            'approved': bool(quorum['reached'] and majority),
+            'rule': rule,
+            'majority': bool(majority),
+            'quorum_reached': quorum['reached'],
+            'weight_for': weight_for,
+            'weight_against': weight_against,
+            'weight_abstain': resolution.weight_abstain or 0,
+            'voices_for': voices_for,
+            'eligible_weight': eligible_weight,
+            'eligible': eligible_count
+        }
+
+
+class _Presence:
+    """Ligne de présence minimale utilisée par AssemblyEngine._power()"""
+
+    __slots__ = ('user_id', 'represented_by', 'is_present', 'weight')
+
+    def __init__(self, user_id, represented_by, is_present, weight):
+        self.user_id = user_id
+        self.represented_by = represented_by
+        self.is_present = is_present
+        self.weight = weight
+
+
+def _empty_totals():
+    """Résultats pondérés nuls d'une résolution"""
+    return {'weight_for': 0, 'weight_against': 0, 'weight_abstain': 0, 'voices_for': 0}
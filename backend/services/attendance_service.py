@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shabaka Syndic - Solution complète et digitale pour les syndics et résidents au Maroc.
+
+Shabaka Syndic
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+"""
+
+from datetime import datetime
+from sqlalchemy import insert, select, update
+from backend.models import db
+from backend.models.general_assembly import Attendance
+from backend.models.user import User
+
+
+class AttendanceService:
+    """
+    Feuille de présence des assemblées générales
+
+    Les présences sont écrites en une opération groupée (upsert sur
+    (assembly_id, user_id)) et la feuille de présence est relue avec les
+    participants en une requête. Le quorum est tenu à jour par AssemblyEngine.
+    """
+
+    @staticmethod
+    def owner_ids(residence_id):
+        """
+        Copropriétaires actifs d'une résidence (votants de l'AG)
+
+        Returns:
+            list: IDs des utilisateurs
+        """
+        return list(db.session.execute(
+            select(User.id).where(
+                User.residence_id == residence_id,
+                User.role == 'owner',
+                User.is_active == True
+            )
+        ).scalars())
+
+    @staticmethod
+    def residence_member_ids(residence_id, user_ids):
+        """
+        Filtre une liste d'utilisateurs sur les membres d'une résidence
+
+        Returns:
+            list: IDs appartenant à la résidence
+        """
+        if not user_ids:
+            return []
+        return list(db.session.execute(
+            select(User.id).where(User.residence_id == residence_id, User.id.in_(set(user_ids)))
+        ).scalars())
+
+    @staticmethod
+    def mark(assembly, user_ids, attendance_mode='physical', marked_by=None, is_present=True,
+             represented_by=None):
+        """
+        Marque la présence de plusieurs utilisateurs en une opération groupée
+
+        PostgreSQL utilise INSERT ... ON CONFLICT DO UPDATE ; les autres
+        bases exécutent un INSERT et un UPDATE groupés (executemany). Les
+        présences existantes sont lues en une requête, sous verrou de l'AG,
+        pour ajuster les totaux pondérés (AssemblyEngine) par différence.
+        Ne valide pas la transaction.
+
+        Args:
+            assembly: Assemblée générale
+            user_ids: Utilisateurs à marquer
+            attendance_mode: 'physical' ou 'online'
+            marked_by: ID de l'utilisateur qui marque la présence
+            is_present: False pour retirer la présence
+            represented_by: ID du mandataire (procuration) ; les
+                utilisateurs sont alors représentés et non présents
+
+        Returns:
+            int: Nombre de présences écrites
+        """
+        from backend.services.assembly_engine import AssemblyEngine
+
+        user_ids = [user_id for user_id in dict.fromkeys(user_ids) if user_id != represented_by]
+        if not user_ids:
+            return 0
+
+        AssemblyEngine.ensure(assembly)
+        AssemblyEngine.lock(assembly.id)
+
+        if represented_by is not None:
+            is_present = False
+
+        now = datetime.utcnow()
+        values = {
+            'is_present': is_present,
+            'represented_by': represented_by,
+            'attendance_mode': attendance_mode if is_present else None,
+            'presence_marked_at': now if is_present or represented_by is not None else None,
+            'marked_by': marked_by
+        }
+
+        # Présences existantes, avec les poids figés à l'ouverture de l'AG (rebuild) : un
+        # compte créé ou des tantièmes modifiés ensuite ne faussent pas le quorum
+        existing = {
+            row.user_id: row for row in db.session.execute(
+                select(Attendance.id, Attendance.user_id, Attendance.is_present,
+                       Attendance.represented_by, Attendance.weight)
+                .where(Attendance.assembly_id == assembly.id, Attendance.user_id.in_(user_ids))
+            )
+        }
+        weights = {user_id: row.weight for user_id, row in existing.items() if row.weight is not None}
+
+        if db.session.get_bind().dialect.name == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+            stmt = pg_insert(Attendance.__table__).values([
+                dict(values, assembly_id=assembly.id, user_id=user_id,
+                     weight=weights.get(user_id), registered_at=now)
+                for user_id in user_ids
+            ])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['assembly_id', 'user_id'],
+                set_={column: stmt.excluded[column] for column in list(values) + ['weight']}
+            )
+            db.session.execute(stmt)
+        else:
+            to_update = [
+                dict(values, id=existing[user_id].id, weight=weights.get(user_id))
+                for user_id in user_ids if user_id in existing
+            ]
+            to_insert = [
+                dict(values, assembly_id=assembly.id, user_id=user_id,
+                     weight=weights.get(user_id), registered_at=now)
+                for user_id in user_ids if user_id not in existing
+            ]
+            if to_update:
+                db.session.execute(update(Attendance), to_update)
+            if to_insert:
+                db.session.execute(insert(Attendance), to_insert)
+
+        # Totaux pondérés ajustés par différence avec l'état précédent
+        counted = is_present or represented_by is not None
+        count_delta = 0
+        weight_delta = 0
+        proxies = {represented_by}
+        for user_id in user_ids:
+            row = existing.get(user_id)
+            if row is not None and row.weight is not None and (row.is_present or row.represented_by is not None):
+                count_delta -= 1
+                weight_delta -= row.weight
+            if counted and user_id in weights:
+                count_delta += 1
+                weight_delta += weights[user_id]
+            if row is not None:
+                proxies.add(row.represented_by)
+
+        AssemblyEngine.apply_presence(assembly, count_delta, weight_delta)
+        # Les bulletins des copropriétaires modifiés changent aussi de poids (mandat donné ou repris)
+        AssemblyEngine.refresh_voting_power(assembly.id, set(user_ids) | proxies)
+        return len(user_ids)
+
+    @staticmethod
+    def roster(assembly_id, user_ids=None):
+        """
+        Présences d'une AG avec les informations des participants (une requête)
+
+        Args:
+            assembly_id: ID de l'AG
+            user_ids: Limiter à ces utilisateurs (None = toutes les présences)
+
+        Returns:
+            list: Présences au format de GET /assemblies/<id>/attendance
+        """
+        query = db.session.query(Attendance, User)\
+            .join(User, Attendance.user_id == User.id)\
+            .filter(Attendance.assembly_id == assembly_id)
+        if user_ids is not None:
+            query = query.filter(Attendance.user_id.in_(list(user_ids)))
+
+        return [{
+            'attendance_id': attendance.id,
+            'user_id': user.id,
+            'user_name': f"{user.first_name} {user.last_name}",
+            'email': user.email,
+            'role': user.role,
+            'is_present': attendance.is_present,
+            'represented_by': attendance.represented_by,
+            'weight': attendance.weight,
+            'attendance_mode': attendance.attendance_mode,
+            'presence_marked_at': attendance.presence_marked_at.isoformat() if attendance.presence_marked_at else None
+        } for attendance, user in query.order_by(Attendance.id)]
@@ -9,10 +9,178 @@ Mail : moa@myoneart.com
 www.myoneart.com
 """
 
-from decimal import Decimal
+import json
+from datetime import datetime
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from sqlalchemy import insert, update
 from backend.models import db
 from backend.models.residence import Unit
 from backend.models.charge import Charge, ChargeDistribution
+from backend.services.dashboard_stats import mark_dashboard_changed
+from backend.services.ledger_service import LedgerService
+
+
+CENT = Decimal('0.01')
+
+
+def allocate(total_amount, weights):
+    """
+    Répartit un montant proportionnellement à des poids, au centime près
+    
+    Les parts sont calculées en centimes entiers (arithmétique exacte) ;
+    les centimes restants après arrondi inférieur sont attribués aux lots
+    ayant les plus forts restes, à égalité dans l'ordre des poids. La somme
+    des parts est toujours égale au montant total.
+    
+    Args:
+        total_amount: Montant à répartir (Decimal)
+        weights: Liste des poids (un par lot)
+        
+    Returns:
+        list: Montants (Decimal à 2 décimales) dans l'ordre des poids
+    """
+    weights = [Decimal(str(weight)) for weight in weights]
+    if any(weight < 0 for weight in weights):
+        raise ValueError("Les poids de répartition doivent être positifs")
+    
+    weight_sum = sum(weights)
+    if weight_sum <= 0:
+        raise ValueError("La somme des poids de répartition est nulle")
+    
+    total_cents = int(Decimal(str(total_amount)).quantize(CENT, rounding=ROUND_HALF_UP) / CENT)
+    
+    shares = []
+    remainders = []
+    for weight in weights:
+        share, remainder = divmod(total_cents * weight, weight_sum)
+        shares.append(int(share))
+        remainders.append(remainder)
+    
+    # Attribuer les centimes restants aux plus forts restes (tri stable)
+    leftover = total_cents - sum(shares)
+    for index in sorted(range(len(weights)), key=remainders.__getitem__, reverse=True)[:leftover]:
+        shares[index] += 1
+    
+    return [Decimal(share) * CENT for share in shares]
+
+
+class DistributionStrategy:
+    """
+    Stratégie de répartition d'une charge entre les lots
+    
+    Une stratégie déclare les colonnes de Unit dont elle a besoin et
+    renvoie un poids par lot ; l'arrondi est commun (voir allocate()).
+    """
+    
+    # Colonnes de Unit chargées en plus de l'identifiant
+    columns = ()
+    
+    def validate(self, rates):
+        """
+        Contrôle les paramètres de répartition fournis à la création de la charge
+        
+        Args:
+            rates: Valeur de distribution_rates reçue
+            
+        Returns:
+            Paramètres à enregistrer dans Charge.distribution_rates
+            
+        Raises:
+            ValueError: Si les paramètres sont invalides
+        """
+        return rates
+    
+    def weights(self, charge, units):
+        """
+        Calcule les poids des lots
+        
+        Args:
+            charge: Charge à répartir
+            units: Lignes (id, colonnes déclarées) triées par identifiant
+            
+        Returns:
+            list: Un poids par lot
+        """
+        raise NotImplementedError
+
+
+class EqualStrategy(DistributionStrategy):
+    """Répartition égale entre tous les lots"""
+    
+    def weights(self, charge, units):
+        return [1] * len(units)
+
+
+class ColumnWeightStrategy(DistributionStrategy):
+    """Répartition au prorata d'une colonne numérique de Unit (surface, tantièmes...)"""
+    
+    def __init__(self, column, label=None):
+        self.columns = (column,)
+        self.label = label or column
+    
+    def weights(self, charge, units):
+        column = self.columns[0]
+        missing = sum(1 for unit in units if getattr(unit, column) is None)
+        if missing:
+            raise ValueError(f"{missing} lot(s) sans {self.label} renseigné(e)")
+        return [getattr(unit, column) for unit in units]
+
+
+class UnitTypeRateStrategy(DistributionStrategy):
+    """Répartition selon un coefficient par type de lot (Charge.distribution_rates)"""
+    
+    columns = ('unit_type',)
+    
+    def validate(self, rates):
+        if not isinstance(rates, dict) or not rates:
+            raise ValueError("Le champ distribution_rates est requis pour une répartition par type de lot")
+        for unit_type, rate in rates.items():
+            try:
+                if isinstance(rate, bool) or not isinstance(rate, (int, float, str)):
+                    raise InvalidOperation
+                value = Decimal(str(rate))
+                if not value.is_finite() or value < 0:
+                    raise InvalidOperation
+            except InvalidOperation:
+                raise ValueError(f"Coefficient invalide pour le type de lot {unit_type or '(sans type)'}: "
+                                 f"un nombre positif ou nul est attendu")
+        return rates
+    
+    def weights(self, charge, units):
+        rates = self.validate(json.loads(charge.distribution_rates)) if charge.distribution_rates else {}
+        unknown = sorted({unit.unit_type or '' for unit in units} - set(rates))
+        if unknown:
+            raise ValueError(f"Coefficient manquant pour le(s) type(s) de lot: {', '.join(unknown)}")
+        return [rates[unit.unit_type or ''] for unit in units]
+
+
+# Registre des stratégies par mode de répartition (Charge.distribution_method)
+_STRATEGIES = {}
+
+
+def register_strategy(name, strategy):
+    """
+    Déclare une stratégie de répartition
+    
+    Args:
+        name: Nom du mode (valeur de Charge.distribution_method)
+        strategy: Instance de DistributionStrategy
+    """
+    _STRATEGIES[name] = strategy
+
+
+def get_strategy(name):
+    """Retourne la stratégie d'un mode de répartition"""
+    strategy = _STRATEGIES.get(name or 'equal')
+    if strategy is None:
+        raise ValueError(f"Mode de répartition inconnu: {name}")
+    return strategy
+
+
+register_strategy('equal', EqualStrategy())
+register_strategy('surface', ColumnWeightStrategy('surface_area', 'surface'))
+register_strategy('tantiemes', ColumnWeightStrategy('tantiemes', 'tantièmes'))
+register_strategy('unit_type', UnitTypeRateStrategy())
 
 
 class ChargeCalculator:
@@ -23,84 +191,126 @@ class ChargeCalculator:
     @staticmethod
     def calculate_distribution(charge_id):
         """
-        Calcule la répartition égale des charges pour tous les lots
+        Calcule la répartition des charges entre les lots
+        
+        Le mode de répartition est celui de la charge (égal, surface,
+        tantièmes, type de lot). Les lots sont lus en une requête, les
+        montants calculés en une passe puis écrits en un seul upsert groupé.
+        Ne valide pas la transaction : l'appelant publie la charge et met à
+        jour les soldes avant un commit unique.
         
         Args:
             charge_id: ID de la charge à répartir
             
         Returns:
-            list: Liste des distributions créées
+            int: Nombre de distributions créées ou mises à jour
         """
         charge = Charge.query.get(charge_id)
         if not charge:
             raise ValueError("Charge non trouvée")
         
-        # Récupérer tous les lots de la résidence
-        units = Unit.query.filter_by(residence_id=charge.residence_id).all()
+        strategy = get_strategy(charge.distribution_method)
+        
+        # Charger uniquement les colonnes utiles à la stratégie
+        units = (
+            db.session.query(Unit.id, *[getattr(Unit, column) for column in strategy.columns])
+            .filter_by(residence_id=charge.residence_id)
+            .order_by(Unit.id)
+            .all()
+        )
         
         if not units:
             raise ValueError("Aucun lot trouvé pour cette résidence")
         
-        # Calculer le nombre total de lots
-        total_units = len(units)
+        shares = allocate(charge.total_amount, strategy.weights(charge, units))
+        amounts = {unit.id: share for unit, share in zip(units, shares)}
         
-        distributions = []
+        ChargeCalculator._upsert_distributions(charge_id, amounts)
+        return len(amounts)
+    
+    @staticmethod
+    def _upsert_distributions(charge_id, amounts):
+        """
+        Écrit les distributions d'une charge en une opération groupée
         
-        for unit in units:
-            # Calculer le montant égal pour chaque lot
-            amount = charge.total_amount / Decimal(str(total_units))
-            
-            # Créer ou mettre à jour la distribution
-            distribution = ChargeDistribution.query.filter_by(
-                charge_id=charge_id,
-                unit_id=unit.id
-            ).first()
-            
-            if distribution:
-                distribution.amount = amount
-            else:
-                distribution = ChargeDistribution(
-                    charge_id=charge_id,
-                    unit_id=unit.id,
-                    amount=amount
-                )
-                db.session.add(distribution)
+        PostgreSQL utilise INSERT ... ON CONFLICT DO UPDATE ; les autres
+        bases lisent les distributions existantes en une requête puis
+        exécutent un INSERT et un UPDATE groupés (executemany).
+        
+        Args:
+            charge_id: ID de la charge
+            amounts: Montants par lot ({unit_id: Decimal})
+        """
+        now = datetime.utcnow()
+        # Écriture Core : non vue par l'invalidation des statistiques au flush
+        mark_dashboard_changed()
+        
+        if db.session.get_bind().dialect.name == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert as pg_insert
             
-            distributions.append(distribution)
+            stmt = pg_insert(ChargeDistribution.__table__).values([
+                {
+                    'charge_id': charge_id,
+                    'unit_id': unit_id,
+                    'amount': amount,
+                    'is_paid': False,
+                    'created_at': now,
+                    'updated_at': now
+                }
+                for unit_id, amount in amounts.items()
+            ])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['charge_id', 'unit_id'],
+                set_={'amount': stmt.excluded.amount, 'updated_at': stmt.excluded.updated_at}
+            )
+            db.session.execute(stmt)
+            return
+        
+        # Distributions existantes en une seule requête
+        existing = dict(
+            db.session.query(ChargeDistribution.unit_id, ChargeDistribution.id)
+            .filter_by(charge_id=charge_id)
+            .all()
+        )
+        
+        to_update = [
+            {'id': existing[unit_id], 'amount': amount, 'updated_at': now}
+            for unit_id, amount in amounts.items() if unit_id in existing
+        ]
+        to_insert = [
+            {'charge_id': charge_id, 'unit_id': unit_id, 'amount': amount, 'created_at': now, 'updated_at': now}
+            for unit_id, amount in amounts.items() if unit_id not in existing
+        ]
         
-        db.session.commit()
-        return distributions
+        if to_update:
+            db.session.execute(update(ChargeDistribution), to_update)
+        if to_insert:
+            db.session.execute(insert(ChargeDistribution), to_insert)
     
     @staticmethod
     def get_unit_balance(unit_id):
         """
         Calcule le solde d'un lot (charges dues - paiements)
         
+        Lecture du grand livre matérialisé (table unit_balances).
+        
         Args:
             unit_id: ID du lot
             
         Returns:
             dict: Détails du solde
         """
-        from backend.models.payment import Payment
-        
-        # Total des charges
-        distributions = ChargeDistribution.query.filter_by(unit_id=unit_id).all()
-        total_charges = sum(float(d.amount) for d in distributions)
-        
-        # Total des paiements validés
-        payments = Payment.query.filter_by(unit_id=unit_id, status='validated').all()
-        total_payments = sum(float(p.amount) for p in payments)
-        
-        balance = total_payments - total_charges
+        balance = LedgerService.get_balance(unit_id)
+        if balance is None:
+            return {
+                'unit_id': unit_id,
+                'total_charges': 0,
+                'total_payments': 0,
+                'balance': 0,
+                'status': 'balanced'
+            }
         
-        return {
-            'unit_id': unit_id,
-            'total_charges': total_charges,
-            'total_payments': total_payments,
-            'balance': balance,
-            'status': 'credit' if balance > 0 else 'debit' if balance < 0 else 'balanced'
-        }
+        return balance.to_dict()
     
     @staticmethod
     def get_unpaid_charges(unit_id):
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shabaka Syndic - Solution complète et digitale pour les syndics et résidents au Maroc.
+
+Shabaka Syndic
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+"""
+
+import threading
+import time
+from flask import current_app
+from sqlalchemy import func, inspect, select
+from backend.models import db
+from backend.models.residence import Residence, Unit
+from backend.models.user import User
+from backend.models.charge import Charge, ChargeDistribution
+from backend.models.payment import Payment
+from backend.models.maintenance import MaintenanceRequest
+from backend.utils.session_invalidation import register_session_invalidation
+
+
+# Instantanés par périmètre : {clé: (expiration, stats)} ; clé None = toutes les résidences
+_snapshots = {}
+_snapshots_lock = threading.Lock()
+
+# Modèles dont l'écriture invalide les instantanés
+_WATCHED_MODELS = (Residence, Unit, User, Charge, ChargeDistribution, Payment, MaintenanceRequest)
+
+
+class DashboardStats:
+    """
+    Statistiques du tableau de bord administrateur
+    
+    Les sept indicateurs sont calculés en une seule requête SQL (sous-requêtes
+    scalaires) puis conservés par périmètre de résidences pendant
+    DASHBOARD_CACHE_TTL secondes. Toute écriture validée sur les résidences,
+    lots, utilisateurs, charges, paiements ou demandes de maintenance
+    invalide les instantanés concernés.
+    """
+    
+    @staticmethod
+    def compute(residence_ids=None):
+        """
+        Calcule les statistiques en une requête
+        
+        Args:
+            residence_ids: Périmètre (None = toutes les résidences)
+            
+        Returns:
+            dict: Statistiques du tableau de bord
+        """
+        def scoped(query, column):
+            return query if residence_ids is None else query.where(column.in_(residence_ids))
+        
+        unpaid = select(func.coalesce(func.sum(ChargeDistribution.amount), 0))\
+            .where(ChargeDistribution.is_paid == False)
+        if residence_ids is not None:
+            unpaid = unpaid.join(Unit, ChargeDistribution.unit_id == Unit.id)\
+                .where(Unit.residence_id.in_(residence_ids))
+        
+        statement = select(
+            scoped(select(func.count(Residence.id)), Residence.id).scalar_subquery().label('total_residences'),
+            scoped(select(func.count(User.id)), User.residence_id).scalar_subquery().label('total_users'),
+            scoped(select(func.count(Unit.id)), Unit.residence_id).scalar_subquery().label('total_units'),
+            scoped(select(func.count(Charge.id)).where(Charge.status == 'published'),
+                   Charge.residence_id).scalar_subquery().label('total_charges'),
+            scoped(select(func.count(MaintenanceRequest.id)),
+                   MaintenanceRequest.residence_id).scalar_subquery().label('total_maintenance'),
+            scoped(select(func.count(MaintenanceRequest.id)).where(MaintenanceRequest.status == 'pending'),
+                   MaintenanceRequest.residence_id).scalar_subquery().label('pending_maintenance'),
+            unpaid.scalar_subquery().label('total_unpaid')
+        )
+        
+        row = db.session.execute(statement).one()
+        stats = dict(row._mapping)
+        # Conversion en float pour la compatibilité JSON
+        stats['total_unpaid'] = float(stats['total_unpaid'] or 0)
+        return stats
+    
+    @staticmethod
+    def get(residence_ids=None):
+        """
+        Récupère les statistiques d'un périmètre (instantané en cache si valide)
+        
+        Args:
+            residence_ids: Périmètre (None = toutes les résidences)
+            
+        Returns:
+            dict: Statistiques du tableau de bord
+        """
+        key = None if residence_ids is None else tuple(sorted(set(residence_ids)))
+        ttl = current_app.config.get('DASHBOARD_CACHE_TTL', 0)
+        
+        if ttl:
+            with _snapshots_lock:
+                cached = _snapshots.get(key)
+            if cached and cached[0] > time.monotonic():
+                return dict(cached[1])
+        
+        stats = DashboardStats.compute(None if key is None else list(key))
+        
+        if ttl:
+            with _snapshots_lock:
+                _snapshots[key] = (time.monotonic() + ttl, stats)
+        return dict(stats)
+    
+    @staticmethod
+    def invalidate(residence_ids=None):
+        """
+        Invalide les instantanés
+        
+        Args:
+            residence_ids: Résidences modifiées (None = tous les instantanés ;
+                un ID None ne concerne que l'instantané global)
+        """
+        with _snapshots_lock:
+            if residence_ids is None:
+                _snapshots.clear()
+                return
+            changed = set(residence_ids)
+            for key in list(_snapshots):
+                # L'instantané global (clé None) dépend de toutes les résidences
+                if key is None or changed.intersection(key):
+                    del _snapshots[key]
+
+
+def _changed_residence_ids(obj):
+    """Résidences touchées par un objet modifié (None = impossible à déterminer)"""
+    if isinstance(obj, Residence):
+        return [obj.id]
+    if isinstance(obj, (Payment, ChargeDistribution)):
+        # Paiements et distributions : rattachés à la résidence via le lot
+        return None
+    # None : utilisateur sans résidence (seul l'instantané global est concerné) ;
+    # un lot ou un utilisateur déplacé touche aussi son ancienne résidence
+    return [obj.residence_id, *inspect(obj).attrs.residence_id.history.deleted]
+
+
+# Invalidation après commit ; mark_dashboard_changed() pour les écritures Core
+mark_dashboard_changed = register_session_invalidation(
+    _WATCHED_MODELS, DashboardStats.invalidate, _changed_residence_ids
+)
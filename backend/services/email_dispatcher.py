@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shabaka Syndic - Solution complète et digitale pour les syndics et résidents au Maroc.
+
+Shabaka Syndic
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+"""
+
+import logging
+import os
+import smtplib
+import threading
+import uuid
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from sqlalchemy import and_, or_, update
+from backend.models import db
+from backend.models.email_outbox import EmailOutbox
+
+logger = logging.getLogger(__name__)
+
+
+class LogTransport:
+    """Transport de développement : journalise les emails sans les envoyer"""
+    
+    def send(self, message):
+        logger.info(f"Email envoyé à {message['To']}: {message['Subject']}")
+    
+    def close(self):
+        pass
+
+
+class SMTPTransport:
+    """
+    Transport SMTP réutilisant une même connexion pour une série d'envois
+    
+    La connexion est ouverte au premier envoi et rétablie une fois si le
+    serveur l'a fermée entre deux messages.
+    """
+    
+    def __init__(self, config):
+        self.config = config
+        self._connection = None
+    
+    def _connect(self):
+        config = self.config
+        connection = smtplib.SMTP(config['MAIL_SERVER'], config['MAIL_PORT'],
+                                  timeout=config.get('MAIL_TIMEOUT', 30))
+        if config.get('MAIL_USE_TLS'):
+            connection.starttls()
+        if config.get('MAIL_USERNAME'):
+            connection.login(config['MAIL_USERNAME'], config['MAIL_PASSWORD'])
+        self._connection = connection
+    
+    def send(self, message):
+        if self._connection is None:
+            self._connect()
+        try:
+            self._connection.send_message(message)
+        except smtplib.SMTPServerDisconnected:
+            self._connect()
+            self._connection.send_message(message)
+    
+    def close(self):
+        if self._connection is not None:
+            try:
+                self._connection.quit()
+            except smtplib.SMTPException:
+                pass
+            except OSError:
+                pass
+            self._connection = None
+
+
+class EmailDispatcher:
+    """
+    Envoi en arrière-plan des emails de la table email_outbox
+    
+    Un pool de threads (MAIL_WORKERS par processus) vide la file : chaque
+    worker réserve un lot de messages par un UPDATE atomique (plusieurs
+    processus peuvent donc travailler en parallèle), renouvelle la
+    réservation de chaque message avant de l'envoyer sur une connexion SMTP
+    réutilisée, n'enregistre le résultat que s'il détient toujours la
+    réservation et reprogramme les échecs avec un délai exponentiel jusqu'à
+    MAIL_MAX_ATTEMPTS tentatives.
+    """
+    
+    _lock = threading.Lock()
+    _wakeup = threading.Event()
+    _threads = []
+    _pid = None
+    
+    @staticmethod
+    def create_transport(config):
+        """Crée le transport configuré (MAIL_BACKEND: 'smtp' ou 'log')"""
+        if config.get('MAIL_BACKEND') == 'smtp':
+            return SMTPTransport(config)
+        return LogTransport()
+    
+    @staticmethod
+    def build_message(email, sender):
+        """Construit le message MIME d'un email de la file"""
+        message = EmailMessage()
+        message['From'] = sender
+        message['To'] = email.to_email
+        message['Subject'] = email.subject
+        message.set_content(email.body)
+        if email.html_body:
+            message.add_alternative(email.html_body, subtype='html')
+        return message
+    
+    @staticmethod
+    def claim_batch(config):
+        """
+        Réserve un lot de messages à envoyer
+        
+        Les messages restés 'sending' plus de 2 × MAIL_TIMEOUT sans
+        renouvellement de leur réservation (worker interrompu) sont repris ;
+        l'expéditeur la renouvelle avant chaque envoi (voir send_batch()).
+        
+        Returns:
+            list: Messages réservés par ce worker
+        """
+        now = datetime.utcnow()
+        stale = now - timedelta(seconds=config.get('MAIL_TIMEOUT', 30) * 2)
+        claimable = or_(
+            and_(EmailOutbox.status == 'pending', EmailOutbox.next_attempt_at <= now),
+            and_(EmailOutbox.status == 'sending', EmailOutbox.locked_at < stale)
+        )
+        
+        candidate_ids = [
+            row.id for row in
+            db.session.query(EmailOutbox.id).filter(claimable)
+            .order_by(EmailOutbox.next_attempt_at, EmailOutbox.id)
+            .limit(config.get('MAIL_BATCH_SIZE', 50))
+        ]
+        if not candidate_ids:
+            db.session.rollback()
+            return []
+        
+        # Réservation atomique : un autre worker ne peut pas prendre les mêmes lignes
+        token = uuid.uuid4().hex
+        db.session.execute(
+            update(EmailOutbox)
+            .where(EmailOutbox.id.in_(candidate_ids), claimable)
+            .values(status='sending', locked_at=now, claimed_by=token),
+            execution_options={'synchronize_session': False}
+        )
+        db.session.commit()
+        
+        return EmailOutbox.query.filter_by(claimed_by=token, status='sending').order_by(EmailOutbox.id).all()
+    
+    @staticmethod
+    def _update_claimed(email_id, token, **values):
+        """
+        Met à jour un message seulement s'il est toujours réservé par ce worker
+        
+        Returns:
+            bool: False si le message a été repris par un autre worker
+        """
+        result = db.session.execute(
+            update(EmailOutbox)
+            .where(EmailOutbox.id == email_id, EmailOutbox.claimed_by == token,
+                   EmailOutbox.status == 'sending')
+            .values(**values),
+            execution_options={'synchronize_session': False}
+        )
+        db.session.commit()
+        return result.rowcount == 1
+    
+    @staticmethod
+    def send_batch(emails, transport, config):
+        """
+        Envoie un lot de messages et enregistre le statut de chacun
+        
+        Avant chaque envoi, la réservation du message est renouvelée
+        (locked_at) : un lot long ne laisse pas les derniers messages être
+        repris par un autre worker pendant que celui-ci les envoie encore.
+        Un message repris entre-temps n'est ni envoyé ni mis à jour.
+        
+        Returns:
+            int: Nombre de messages envoyés
+        """
+        sender = config.get('MAIL_DEFAULT_SENDER')
+        max_attempts = config.get('MAIL_MAX_ATTEMPTS', 5)
+        base_delay = config.get('MAIL_RETRY_BASE_DELAY', 30)
+        sent = 0
+        
+        # Lus avant les commits par message (qui expirent les objets de la session)
+        batch = [
+            (email.id, email.claimed_by, email.attempts, EmailDispatcher.build_message(email, sender))
+            for email in emails
+        ]
+        
+        for email_id, token, attempts, message in batch:
+            if not EmailDispatcher._update_claimed(email_id, token, locked_at=datetime.utcnow()):
+                continue
+            
+            attempts += 1
+            try:
+                transport.send(message)
+            except smtplib.SMTPRecipientsRefused as e:
+                # Adresse refusée : inutile de réessayer
+                values = {'status': 'failed', 'last_error': str(e)}
+            except (smtplib.SMTPException, OSError) as e:
+                transport.close()
+                values = {'status': 'failed' if attempts >= max_attempts else 'pending', 'last_error': str(e)}
+                if attempts < max_attempts:
+                    values['next_attempt_at'] = datetime.utcnow() + timedelta(seconds=base_delay * 2 ** (attempts - 1))
+            else:
+                values = {'status': 'sent', 'sent_at': datetime.utcnow(), 'last_error': None}
+                sent += 1
+            
+            if not EmailDispatcher._update_claimed(email_id, token, attempts=attempts, claimed_by=None, **values):
+                logger.warning(f"Email {email_id} repris par un autre worker pendant son envoi")
+        
+        return sent
+    
+    @staticmethod
+    def drain(config, transport=None):
+        """
+        Envoie tous les messages dus (contexte d'application requis)
+        
+        Args:
+            config: Configuration de l'application
+            transport: Transport à réutiliser (créé si absent)
+            
+        Returns:
+            int: Nombre de messages traités
+        """
+        own_transport = transport is None
+        transport = transport or EmailDispatcher.create_transport(config)
+        processed = 0
+        try:
+            while True:
+                emails = EmailDispatcher.claim_batch(config)
+                if not emails:
+                    return processed
+                EmailDispatcher.send_batch(emails, transport, config)
+                processed += len(emails)
+        finally:
+            if own_transport:
+                transport.close()
+    
+    @staticmethod
+    def _worker(app):
+        """Boucle d'un worker : vide la file puis attend un réveil ou l'intervalle de scrutation"""
+        config = app.config
+        with app.app_context():
+            transport = EmailDispatcher.create_transport(config)
+            while True:
+                try:
+                    processed = EmailDispatcher.drain(config, transport)
+                except Exception:
+                    logger.exception("Erreur lors de l'envoi des emails")
+                    db.session.rollback()
+                    processed = 0
+                finally:
+                    db.session.remove()
+                
+                if not processed:
+                    # Fermer la connexion SMTP inactive
+                    transport.close()
+                    EmailDispatcher._wakeup.wait(config.get('MAIL_POLL_INTERVAL', 10))
+                    EmailDispatcher._wakeup.clear()
+    
+    @staticmethod
+    def wake(app):
+        """
+        Réveille les workers (démarrés au premier appel du processus)
+        
+        Args:
+            app: Application Flask
+        """
+        workers = app.config.get('MAIL_WORKERS', 0)
+        if not workers:
+            return
+        
+        with EmailDispatcher._lock:
+            # Après un fork (gunicorn), les threads du processus parent n'existent pas
+            if EmailDispatcher._pid != os.getpid():
+                EmailDispatcher._threads = []
+                EmailDispatcher._pid = os.getpid()
+            if not EmailDispatcher._threads:
+                for index in range(workers):
+                    thread = threading.Thread(
+                        target=EmailDispatcher._worker, args=(app,),
+                        name=f'email-worker-{index}', daemon=True
+                    )
+                    thread.start()
+                    EmailDispatcher._threads.append(thread)
+        
+        EmailDispatcher._wakeup.set()
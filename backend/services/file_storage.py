@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shabaka Syndic - Solution complète et digitale pour les syndics et résidents au Maroc.
+
+Shabaka Syndic
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+"""
+
+import hashlib
+import io
+import mimetypes
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from werkzeug.utils import secure_filename
+from backend.models import db
+from backend.models.stored_file import StoredFile
+
+
+class LocalStorage:
+    """
+    Stockage des fichiers sur le disque local
+
+    Les objets sont écrits sous root/<2 premiers caractères>/<empreinte>.<ext>
+    et servis par le dossier static de l'application (base_url). Le fichier
+    temporaire est créé sous root pour que la mise en place soit un simple
+    renommage atomique.
+    """
+
+    def __init__(self, root, base_url):
+        self.root = root
+        self.base_url = base_url.rstrip('/')
+
+    def _path(self, key):
+        return os.path.join(self.root, *key.split('/'))
+
+    def temp_dir(self):
+        """Dossier des fichiers en cours de réception"""
+        path = os.path.join(self.root, '.tmp')
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def save(self, temp_path, key, mime_type=None):
+        """Déplace un fichier reçu vers son emplacement définitif"""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(temp_path, path)
+
+    def exists(self, key):
+        """Indique si un objet est présent"""
+        return os.path.exists(self._path(key))
+
+    def open(self, key):
+        """Ouvre un objet en lecture binaire"""
+        return open(self._path(key), 'rb')
+
+    def delete(self, key):
+        """Supprime un objet (sans erreur s'il est absent)"""
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def url(self, key):
+        """URL publique d'un objet"""
+        return f'{self.base_url}/{key}'
+
+    def keys(self):
+        """Objets présents : [(clé, date de modification)]"""
+        for directory, subdirs, files in os.walk(self.root):
+            subdirs[:] = [name for name in subdirs if name != '.tmp']
+            for name in files:
+                path = os.path.join(directory, name)
+                key = os.path.relpath(path, self.root).replace(os.sep, '/')
+                yield key, datetime.utcfromtimestamp(os.path.getmtime(path))
+
+
+class S3Storage:
+    """
+    Stockage compatible S3 (AWS, MinIO, Scaleway...)
+
+    Le fichier est reçu sur le disque local puis envoyé au bucket ; les
+    identifiants sont ceux de l'environnement (AWS_ACCESS_KEY_ID...).
+    """
+
+    def __init__(self, bucket, base_url, endpoint_url=None, region=None, prefix=''):
+        try:
+            import boto3
+        except ImportError:
+            raise ValueError("Le stockage 's3' nécessite le paquet boto3")
+        self.bucket = bucket
+        self.base_url = base_url.rstrip('/')
+        self.prefix = prefix.strip('/')
+        self._client = boto3.client('s3', endpoint_url=endpoint_url, region_name=region)
+
+    def _object_key(self, key):
+        return f'{self.prefix}/{key}' if self.prefix else key
+
+    def temp_dir(self):
+        """Dossier des fichiers en cours de réception"""
+        return tempfile.gettempdir()
+
+    def save(self, temp_path, key, mime_type=None):
+        """Envoie un fichier reçu vers le bucket puis supprime la copie locale"""
+        extra = {'CacheControl': 'public, max-age=31536000, immutable'}
+        if mime_type:
+            extra['ContentType'] = mime_type
+        try:
+            self._client.upload_file(temp_path, self.bucket, self._object_key(key), ExtraArgs=extra)
+        finally:
+            os.remove(temp_path)
+
+    def exists(self, key):
+        """Indique si un objet est présent"""
+        try:
+            self._client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+            return True
+        except self._client.exceptions.ClientError:
+            return False
+
+    def open(self, key):
+        """Télécharge un objet en mémoire et l'ouvre en lecture binaire"""
+        response = self._client.get_object(Bucket=self.bucket, Key=self._object_key(key))
+        return io.BytesIO(response['Body'].read())
+
+    def delete(self, key):
+        """Supprime un objet"""
+        self._client.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+
+    def url(self, key):
+        """URL publique d'un objet"""
+        return f'{self.base_url}/{key}'
+
+    def keys(self):
+        """Objets présents : [(clé, date de modification)]"""
+        prefix = f'{self.prefix}/' if self.prefix else ''
+        paginator = self._client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            for item in page.get('Contents', ()):
+                yield item['Key'][len(prefix):], item['LastModified'].replace(tzinfo=None)
+
+
+def _local_root(config):
+    return config.get('STORAGE_LOCAL_ROOT') or os.path.join(current_app.static_folder, 'uploads', 'objects')
+
+
+# Stockages disponibles : {nom: fabrique(config)}
+_BACKENDS = {
+    'local': lambda config: LocalStorage(_local_root(config),
+                                         config.get('STORAGE_BASE_URL', '/static/uploads/objects')),
+    's3': lambda config: S3Storage(config.get('STORAGE_S3_BUCKET'),
+                                   config.get('STORAGE_BASE_URL'),
+                                   endpoint_url=config.get('STORAGE_S3_ENDPOINT_URL'),
+                                   region=config.get('STORAGE_S3_REGION'),
+                                   prefix=config.get('STORAGE_S3_PREFIX', '')),
+}
+
+
+def register_backend(name, factory):
+    """
+    Déclare un stockage supplémentaire
+
+    Args:
+        name: Valeur de STORAGE_BACKEND
+        factory: Fonction (config) -> stockage
+    """
+    _BACKENDS[name] = factory
+
+
+class FileStorage:
+    """
+    Stockage des fichiers uploadés, adressé par contenu
+
+    L'upload est copié par blocs (STORAGE_CHUNK_SIZE) vers un fichier
+    temporaire tout en calculant son empreinte SHA-256 : le fichier n'est
+    jamais chargé en mémoire. Un contenu déjà stocké n'est pas réécrit, sa
+    ligne stored_files gagne une référence. Les URL renvoyées restent
+    stables : elles contiennent l'empreinte du contenu.
+    """
+
+    _backend = None
+    _pid = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def get_backend(config=None):
+        """
+        Stockage du processus (créé au premier appel, recréé après un fork)
+
+        Raises:
+            ValueError: Si STORAGE_BACKEND est inconnu
+        """
+        config = config or current_app.config
+        with FileStorage._lock:
+            if FileStorage._backend is None or FileStorage._pid != os.getpid():
+                name = config.get('STORAGE_BACKEND', 'local')
+                if name not in _BACKENDS:
+                    raise ValueError(f'Stockage de fichiers inconnu: {name}')
+                FileStorage._backend = _BACKENDS[name](config)
+                FileStorage._pid = os.getpid()
+            return FileStorage._backend
+
+    @staticmethod
+    def _spool(stream, directory, chunk_size):
+        """
+        Copie un flux vers un fichier temporaire en calculant son empreinte
+
+        Returns:
+            tuple: (chemin temporaire, empreinte hexadécimale, taille)
+        """
+        digest = hashlib.sha256()
+        size = 0
+        handle, temp_path = tempfile.mkstemp(dir=directory)
+        try:
+            with os.fdopen(handle, 'wb') as output:
+                while True:
+                    chunk = stream.read(chunk_size)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    output.write(chunk)
+                    size += len(chunk)
+        except Exception:
+            os.remove(temp_path)
+            raise
+        return temp_path, digest.hexdigest(), size
+
+    @staticmethod
+    def _acquire(digest):
+        """Ajoute une référence à un fichier existant ; renvoie False s'il n'existe pas"""
+        result = db.session.execute(
+            update(StoredFile)
+            .where(StoredFile.digest == digest)
+            .values(ref_count=StoredFile.ref_count + 1, released_at=None)
+            .execution_options(synchronize_session=False)
+        )
+        return bool(result.rowcount)
+
+    @staticmethod
+    def _get(digest):
+        return db.session.execute(select(StoredFile).where(StoredFile.digest == digest)).scalar_one()
+
+    @staticmethod
+    def store(upload):
+        """
+        Enregistre un fichier uploadé et lui ajoute une référence
+
+        Ne valide pas la transaction : l'appelant fait le commit (un
+        rollback laisse au pire un objet sans ligne, supprimé par la purge).
+
+        Args:
+            upload: Fichier reçu (werkzeug FileStorage)
+
+        Returns:
+            StoredFile: Fichier stocké (nouveau ou existant)
+        """
+        config = current_app.config
+        backend = FileStorage.get_backend(config)
+
+        filename = secure_filename(upload.filename or '')
+        extension = os.path.splitext(filename)[1].lower()
+        mime_type = mimetypes.guess_type(filename)[0] or upload.mimetype or 'application/octet-stream'
+
+        temp_path, digest, size = FileStorage._spool(
+            upload.stream, backend.temp_dir(), config.get('STORAGE_CHUNK_SIZE', 64 * 1024)
+        )
+
+        if FileStorage._acquire(digest):
+            # Contenu déjà stocké : la copie reçue est inutile
+            os.remove(temp_path)
+            return FileStorage._get(digest)
+
+        key = f'{digest[:2]}/{digest}{extension}'
+        backend.save(temp_path, key, mime_type)
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(StoredFile), [{
+                    'digest': digest,
+                    'storage_key': key,
+                    'size': size,
+                    'mime_type': mime_type,
+                    'ref_count': 1,
+                    'created_at': datetime.utcnow()
+                }])
+        except IntegrityError:
+            # Même contenu enregistré entre-temps par une autre requête : on le référence
+            if not FileStorage._acquire(digest):
+                raise
+        return FileStorage._get(digest)
+
+    @staticmethod
+    def url(stored_file):
+        """URL publique d'un fichier stocké"""
+        return FileStorage.get_backend().url(stored_file.storage_key)
+
+    @staticmethod
+    def digest_from_url(url):
+        """
+        Empreinte d'un fichier à partir de son URL (None pour un ancien upload)
+        """
+        if not url:
+            return None
+        name = os.path.splitext(url.rsplit('/', 1)[-1])[0]
+        if len(name) == 64 and all(char in '0123456789abcdef' for char in name):
+            return name
+        return None
+
+    @staticmethod
+    def release(url):
+        """
+        Retire une référence au fichier d'une URL
+
+        Le fichier n'est pas supprimé immédiatement : purge() supprime les
+        fichiers sans référence après un délai de grâce. Les anciens uploads
+        (nom horodaté sous static/uploads) sont supprimés directement.
+        Ne valide pas la transaction.
+
+        Args:
+            url: URL enregistrée (image_path, proof_document, file_path)
+        """
+        digest = FileStorage.digest_from_url(url)
+        if digest is None:
+            if url and url.startswith('/static/uploads/'):
+                path = os.path.join(current_app.static_folder, *url[len('/static/'):].split('/'))
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            return
+
+        db.session.execute(
+            update(StoredFile)
+            .where(StoredFile.digest == digest, StoredFile.ref_count > 0)
+            .values(ref_count=StoredFile.ref_count - 1)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.execute(
+            update(StoredFile)
+            .where(StoredFile.digest == digest, StoredFile.ref_count == 0)
+            .values(released_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+
+    @staticmethod
+    def purge(grace_seconds=None):
+        """
+        Supprime les fichiers sans référence depuis plus de grace_seconds
+
+        Supprime aussi les objets du stockage qui n'ont pas de ligne
+        stored_files (transaction annulée après l'écriture) et les fichiers
+        temporaires abandonnés. Valide la transaction.
+
+        Returns:
+            dict: {'released': n, 'orphans': n, 'bytes': n}
+        """
+        config = current_app.config
+        backend = FileStorage.get_backend(config)
+        if grace_seconds is None:
+            grace_seconds = config.get('STORAGE_PURGE_GRACE', 86400)
+        cutoff = datetime.utcnow() - timedelta(seconds=grace_seconds)
+
+        released = db.session.execute(
+            select(StoredFile.id, StoredFile.storage_key, StoredFile.thumbnail_key,
+                   StoredFile.display_key, StoredFile.size)
+            .where(StoredFile.ref_count == 0, StoredFile.released_at < cutoff)
+        ).all()
+        removed_bytes = 0
+        deleted = set()
+        if released:
+            ids = [row.id for row in released]
+            # La condition est revérifiée à la suppression : un upload concurrent a pu reprendre le fichier
+            db.session.execute(
+                delete(StoredFile)
+                .where(StoredFile.id.in_(ids), StoredFile.ref_count == 0)
+                .execution_options(synchronize_session=False)
+            )
+            remaining = set(db.session.execute(
+                select(StoredFile.id).where(StoredFile.id.in_(ids))
+            ).scalars())
+            # Objets supprimés avant le commit : les lignes restent verrouillées, un store()
+            # concurrent du même contenu attend le commit puis réécrit l'objet et sa ligne
+            try:
+                for row in released:
+                    if row.id not in remaining:
+                        for key in (row.storage_key, row.thumbnail_key, row.display_key):
+                            if key:
+                                backend.delete(key)
+                        deleted.add(row.id)
+                        removed_bytes += row.size
+            finally:
+                # Un objet non supprimé (erreur du stockage) devient orphelin, repris par une purge suivante
+                db.session.commit()
+
+        known = set()
+        for row in db.session.execute(
+            select(StoredFile.storage_key, StoredFile.thumbnail_key, StoredFile.display_key)
+        ):
+            known.update(key for key in row if key)
+        orphans = 0
+        for key, modified_at in list(backend.keys()):
+            if key not in known and modified_at < cutoff:
+                backend.delete(key)
+                orphans += 1
+
+        if isinstance(backend, LocalStorage):
+            temp_dir = backend.temp_dir()
+            for name in os.listdir(temp_dir):
+                path = os.path.join(temp_dir, name)
+                if os.path.getmtime(path) < time.time() - grace_seconds:
+                    os.remove(path)
+
+        return {'released': len(deleted), 'orphans': orphans, 'bytes': removed_bytes}
@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shabaka Syndic - Solution complète et digitale pour les syndics et résidents au Maroc.
+
+Shabaka Syndic
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+"""
+
+import logging
+import os
+import tempfile
+import threading
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import and_, or_, select, update
+from backend.models import db
+from backend.models.maintenance import MaintenanceRequest
+from backend.models.payment import Payment
+from backend.models.stored_file import StoredFile
+
+logger = logging.getLogger(__name__)
+
+
+# Types d'images décodables par Pillow
+IMAGE_MIME_TYPES = {'image/jpeg', 'image/png', 'image/gif', 'image/webp', 'image/bmp', 'image/tiff'}
+
+# Variantes générées : {nom: clé de configuration de la taille maximale (px)}
+VARIANTS = {
+    'thumbnail': 'IMAGE_THUMBNAIL_SIZE',
+    'display': 'IMAGE_DISPLAY_SIZE',
+}
+
+# Colonnes qui référencent une image et reçoivent ses variantes
+_LINKED_COLUMNS = (
+    (MaintenanceRequest, 'image_path', 'image_thumbnail_path', 'image_display_path'),
+    (Payment, 'proof_document', 'proof_thumbnail_path', 'proof_display_path'),
+)
+
+
+class ImagePipeline:
+    """
+    Génération en arrière-plan des variantes des photos uploadées
+
+    Une photo de demande de maintenance ou de justificatif de paiement est
+    marquée 'pending' sur sa ligne stored_files. Un pool de threads
+    (IMAGE_WORKERS par processus) réserve les images par un UPDATE atomique,
+    génère une miniature et une version d'affichage (WebP ou JPEG, orientation
+    EXIF appliquée, métadonnées retirées) puis renseigne leurs URL sur les
+    demandes et paiements qui pointent vers la photo. Une image déjà traitée
+    (même contenu) n'est pas retraitée.
+    """
+
+    _lock = threading.Lock()
+    _wakeup = threading.Event()
+    _threads = []
+    _pid = None
+
+    @staticmethod
+    def available():
+        """Indique si Pillow est installé"""
+        try:
+            import PIL  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    @staticmethod
+    def enqueue(stored_file):
+        """
+        Demande les variantes d'un fichier s'il s'agit d'une image
+
+        Ne valide pas la transaction ; appeler wake() après le commit.
+
+        Returns:
+            bool: True si l'image est (ou était déjà) en file ou traitée
+        """
+        if stored_file.mime_type not in IMAGE_MIME_TYPES:
+            return False
+        if stored_file.variants_status is None:
+            db.session.execute(
+                update(StoredFile)
+                .where(StoredFile.id == stored_file.id, StoredFile.variants_status.is_(None))
+                .values(variants_status='pending')
+                .execution_options(synchronize_session=False)
+            )
+            stored_file.variants_status = 'pending'
+        return True
+
+    @staticmethod
+    def variant_urls(stored_file):
+        """
+        URL des variantes d'un fichier stocké
+
+        Returns:
+            tuple: (miniature, affichage), (None, None) si pas encore générées
+        """
+        from backend.services.file_storage import FileStorage
+
+        if stored_file.variants_status != 'ready':
+            return None, None
+        backend = FileStorage.get_backend()
+        return backend.url(stored_file.thumbnail_key), backend.url(stored_file.display_key)
+
+    @staticmethod
+    def render(source, sizes, image_format='WEBP', quality=80):
+        """
+        Redimensionne une image à plusieurs tailles (un seul décodage)
+
+        Args:
+            source: Fichier image ouvert en lecture binaire
+            sizes: Tailles maximales en pixels (largeur et hauteur)
+            image_format: 'WEBP' ou 'JPEG'
+            quality: Qualité de compression (1-100)
+
+        Returns:
+            list: Images encodées, dans l'ordre de sizes
+        """
+        import io
+        from PIL import Image, ImageOps
+
+        with Image.open(source) as original:
+            # JPEG : décodage directement à l'échelle réduite la plus proche (1/2 à 1/8)
+            original.draft('RGB', (max(sizes), max(sizes)))
+            image = ImageOps.exif_transpose(original)
+            if image_format == 'JPEG':
+                image = image.convert('RGB')
+            elif image.mode not in ('RGB', 'RGBA'):
+                transparent = 'A' in image.getbands() or 'transparency' in image.info
+                image = image.convert('RGBA' if transparent else 'RGB')
+
+            options = {'quality': quality}
+            if image_format == 'JPEG':
+                options.update(optimize=True, progressive=True)
+            else:
+                options.update(method=4)
+
+            results = []
+            for size in sorted(set(sizes), reverse=True):
+                # Chaque variante est réduite depuis la précédente, plus grande
+                image.thumbnail((size, size), Image.LANCZOS)
+                output = io.BytesIO()
+                image.save(output, image_format, **options)
+                results.append((size, output.getvalue()))
+            encoded = dict(results)
+            return [encoded[size] for size in sizes]
+
+    @staticmethod
+    def process(stored_file, config):
+        """
+        Génère et enregistre les variantes d'une image
+
+        Returns:
+            dict: {nom de variante: clé de stockage}
+        """
+        from backend.services.file_storage import FileStorage
+
+        backend = FileStorage.get_backend(config)
+        image_format = config.get('IMAGE_VARIANT_FORMAT', 'WEBP').upper()
+        extension = '.webp' if image_format == 'WEBP' else '.jpg'
+        mime_type = 'image/webp' if image_format == 'WEBP' else 'image/jpeg'
+
+        names = list(VARIANTS)
+        with backend.open(stored_file.storage_key) as source:
+            images = ImagePipeline.render(source, [config.get(VARIANTS[name]) for name in names],
+                                          image_format, config.get('IMAGE_QUALITY', 80))
+
+        keys = {}
+        for name, data in zip(names, images):
+            handle, temp_path = tempfile.mkstemp(dir=backend.temp_dir())
+            with os.fdopen(handle, 'wb') as output:
+                output.write(data)
+            key = f'{stored_file.digest[:2]}/{stored_file.digest}.{name}{extension}'
+            backend.save(temp_path, key, mime_type)
+            keys[name] = key
+        return keys
+
+    @staticmethod
+    def link(stored_file):
+        """Renseigne les URL des variantes sur les enregistrements qui utilisent l'image"""
+        from backend.services.file_storage import FileStorage
+
+        url = FileStorage.url(stored_file)
+        thumbnail_url, display_url = ImagePipeline.variant_urls(stored_file)
+        for model, column, thumbnail_column, display_column in _LINKED_COLUMNS:
+            db.session.execute(
+                update(model)
+                .where(getattr(model, column) == url)
+                .values({thumbnail_column: thumbnail_url, display_column: display_url})
+                .execution_options(synchronize_session=False)
+            )
+
+    @staticmethod
+    def link_if_ready(stored_file):
+        """
+        Renseigne les variantes d'une image terminée pendant l'enregistrement
+
+        À appeler après le commit d'un enregistrement créé sans variantes :
+        si le worker a terminé entre la lecture du statut et ce commit, son
+        UPDATE n'a pas vu la nouvelle ligne.
+
+        Returns:
+            bool: True si les variantes sont prêtes (et renseignées)
+        """
+        db.session.refresh(stored_file)
+        if stored_file.variants_status != 'ready':
+            return False
+        ImagePipeline.link(stored_file)
+        db.session.commit()
+        return True
+
+    @staticmethod
+    def claim_batch(config):
+        """
+        Réserve un lot d'images à traiter
+
+        Les images restées 'processing' au-delà de IMAGE_TIMEOUT (worker
+        interrompu) sont reprises.
+
+        Returns:
+            list: Fichiers réservés par ce worker
+        """
+        now = datetime.utcnow()
+        stale = now - timedelta(seconds=config.get('IMAGE_TIMEOUT', 120))
+        claimable = or_(
+            StoredFile.variants_status == 'pending',
+            and_(StoredFile.variants_status == 'processing', StoredFile.variants_locked_at < stale)
+        )
+
+        candidate_ids = list(db.session.execute(
+            select(StoredFile.id).where(claimable)
+            .order_by(StoredFile.id)
+            .limit(config.get('IMAGE_BATCH_SIZE', 10))
+        ).scalars())
+        if not candidate_ids:
+            db.session.rollback()
+            return []
+
+        # Réservation atomique : un autre worker ne peut pas prendre les mêmes lignes
+        token = uuid.uuid4().hex
+        db.session.execute(
+            update(StoredFile)
+            .where(StoredFile.id.in_(candidate_ids), claimable)
+            .values(variants_status='processing', variants_locked_at=now, variants_claimed_by=token),
+            execution_options={'synchronize_session': False}
+        )
+        db.session.commit()
+
+        return StoredFile.query.filter_by(variants_claimed_by=token, variants_status='processing')\
+            .order_by(StoredFile.id).all()
+
+    @staticmethod
+    def process_batch(stored_files, config):
+        """
+        Traite un lot d'images et enregistre le statut de chacune
+
+        Returns:
+            int: Nombre d'images traitées avec succès
+        """
+        from PIL import Image, UnidentifiedImageError
+
+        max_attempts = config.get('IMAGE_MAX_ATTEMPTS', 3)
+        done = 0
+
+        # Jetons relevés avant tout commit : une ligne rechargée peut appartenir à un autre worker
+        claims = [(stored_file, stored_file.variants_claimed_by, stored_file.variants_attempts)
+                  for stored_file in stored_files]
+
+        for stored_file, token, attempts in claims:
+            attempts += 1
+            values = {'variants_attempts': attempts, 'variants_claimed_by': None}
+            try:
+                keys = ImagePipeline.process(stored_file, config)
+            except (UnidentifiedImageError, Image.DecompressionBombError) as e:
+                # Fichier illisible ou trop grand : inutile de réessayer
+                logger.warning("Image %s non traitée: %s", stored_file.digest, e)
+                values['variants_status'] = 'failed'
+            except Exception:
+                logger.exception("Erreur lors du traitement de l'image %s", stored_file.digest)
+                values['variants_status'] = 'failed' if attempts >= max_attempts else 'pending'
+            else:
+                values.update(thumbnail_key=keys['thumbnail'], display_key=keys['display'],
+                              variants_status='ready')
+
+            # Écriture conditionnelle : une image reprise par un autre worker
+            # (délai IMAGE_TIMEOUT dépassé) n'est pas écrasée
+            result = db.session.execute(
+                update(StoredFile)
+                .where(StoredFile.id == stored_file.id, StoredFile.variants_claimed_by == token,
+                       StoredFile.variants_status == 'processing')
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount != 1:
+                logger.warning("Image %s reprise par un autre worker : résultat ignoré", stored_file.digest)
+                db.session.rollback()
+                continue
+            if values['variants_status'] == 'ready':
+                db.session.refresh(stored_file)
+                ImagePipeline.link(stored_file)
+                done += 1
+            db.session.commit()
+
+        return done
+
+    @staticmethod
+    def drain(config):
+        """
+        Traite toutes les images en attente (contexte d'application requis)
+
+        Returns:
+            int: Nombre d'images traitées
+        """
+        processed = 0
+        while True:
+            stored_files = ImagePipeline.claim_batch(config)
+            if not stored_files:
+                return processed
+            ImagePipeline.process_batch(stored_files, config)
+            processed += len(stored_files)
+
+    @staticmethod
+    def _worker(app):
+        """Boucle d'un worker : traite la file puis attend un réveil ou l'intervalle de scrutation"""
+        config = app.config
+        with app.app_context():
+            while True:
+                try:
+                    processed = ImagePipeline.drain(config)
+                except Exception:
+                    logger.exception("Erreur lors du traitement des images")
+                    db.session.rollback()
+                    processed = 0
+                finally:
+                    db.session.remove()
+
+                if not processed:
+                    ImagePipeline._wakeup.wait(config.get('IMAGE_POLL_INTERVAL', 30))
+                    ImagePipeline._wakeup.clear()
+
+    @staticmethod
+    def wake(app):
+        """
+        Réveille les workers (démarrés au premier appel du processus)
+
+        Sans Pillow, les images restent en attente et les pages affichent
+        l'original.
+
+        Args:
+            app: Application Flask
+        """
+        workers = app.config.get('IMAGE_WORKERS', 0)
+        if not workers:
+            return
+        if not ImagePipeline.available():
+            logger.warning("Pillow n'est pas installé : variantes d'images non générées")
+            return
+
+        with ImagePipeline._lock:
+            # Après un fork (gunicorn), les threads du processus parent n'existent pas
+            if ImagePipeline._pid != os.getpid():
+                ImagePipeline._threads = []
+                ImagePipeline._pid = os.getpid()
+            if not ImagePipeline._threads:
+                for index in range(workers):
+                    thread = threading.Thread(
+                        target=ImagePipeline._worker, args=(app,),
+                        name=f'image-worker-{index}', daemon=True
+                    )
+                    thread.start()
+                    ImagePipeline._threads.append(thread)
+
+        ImagePipeline._wakeup.set()
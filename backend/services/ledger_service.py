@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shabaka Syndic - Solution complète et digitale pour les syndics et résidents au Maroc.
+
+Shabaka Syndic
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+"""
+
+from datetime import datetime
+from sqlalchemy import and_, bindparam, case, delete, func, insert, or_, true, update
+from sqlalchemy.exc import IntegrityError
+from backend.models import db
+from backend.models.residence import Unit
+from backend.models.charge import Charge, ChargeDistribution
+from backend.models.payment import Payment
+from backend.models.unit_balance import UnitBalance
+from backend.services.dashboard_stats import mark_dashboard_changed
+
+
+class LedgerService:
+    """
+    Service de tenue du grand livre des soldes par lot (table unit_balances)
+    
+    Les événements financiers appliquent des incréments atomiques en SQL
+    (col = col + delta) dans la transaction de l'appelant ; un lot sans
+    ligne de solde est reconstruit depuis les données sources.
+    """
+    
+    @staticmethod
+    def rebuild(unit_ids=None):
+        """
+        Reconstruit les soldes à partir des distributions et des paiements
+        
+        Args:
+            unit_ids: Lots à reconstruire (None = tous les lots)
+            
+        Returns:
+            int: Nombre de soldes reconstruits
+        """
+        units_query = db.session.query(Unit.id)
+        if unit_ids is not None:
+            if not unit_ids:
+                return 0
+            units_query = units_query.filter(Unit.id.in_(set(unit_ids)))
+        unit_ids = [row.id for row in units_query]
+        if not unit_ids:
+            return 0
+        
+        # Au-delà de quelques centaines de lots, agréger toute la table est plus simple qu'un IN
+        def in_scope(column):
+            return column.in_(unit_ids) if len(unit_ids) <= 500 else true()
+        
+        # Charges publiées par lot
+        charged = dict(
+            db.session.query(ChargeDistribution.unit_id, func.sum(ChargeDistribution.amount))
+            .join(Charge, ChargeDistribution.charge_id == Charge.id)
+            .filter(Charge.status == 'published', in_scope(ChargeDistribution.unit_id))
+            .group_by(ChargeDistribution.unit_id)
+            .all()
+        )
+        
+        # Paiements validés et en attente par lot
+        payments = {}
+        for row in db.session.query(
+            Payment.unit_id, Payment.status,
+            func.sum(Payment.amount).label('total'),
+            func.count(Payment.id).label('count')
+        ).filter(
+            Payment.status.in_(['validated', 'pending']),
+            in_scope(Payment.unit_id)
+        ).group_by(Payment.unit_id, Payment.status):
+            payments[(row.unit_id, row.status)] = row
+        
+        # Dernier paiement validé par lot
+        last_dates = db.session.query(
+            Payment.unit_id,
+            func.max(Payment.payment_date).label('max_date')
+        ).filter(
+            Payment.status == 'validated',
+            in_scope(Payment.unit_id)
+        ).group_by(Payment.unit_id).subquery()
+        
+        last_payments = {}
+        for row in db.session.query(Payment.unit_id, Payment.payment_date, Payment.amount).join(
+            last_dates,
+            and_(Payment.unit_id == last_dates.c.unit_id, Payment.payment_date == last_dates.c.max_date)
+        ).filter(Payment.status == 'validated').order_by(Payment.id):
+            last_payments[row.unit_id] = row
+        
+        now = datetime.utcnow()
+        rows = []
+        for unit_id in unit_ids:
+            validated = payments.get((unit_id, 'validated'))
+            pending = payments.get((unit_id, 'pending'))
+            last = last_payments.get(unit_id)
+            rows.append({
+                'unit_id': unit_id,
+                'total_charged': charged.get(unit_id) or 0,
+                'total_validated': validated.total if validated else 0,
+                'pending_amount': pending.total if pending else 0,
+                'pending_count': pending.count if pending else 0,
+                'last_payment_date': last.payment_date if last else None,
+                'last_payment_amount': last.amount if last else None,
+                'updated_at': now
+            })
+        
+        for start in range(0, len(unit_ids), 500):
+            chunk = unit_ids[start:start + 500]
+            db.session.execute(delete(UnitBalance).where(UnitBalance.unit_id.in_(chunk)))
+        db.session.execute(insert(UnitBalance), rows)
+        return len(rows)
+    
+    @staticmethod
+    def _missing(unit_ids):
+        """Retourne les lots qui n'ont pas encore de ligne de solde"""
+        existing = {
+            row.unit_id for row in
+            db.session.query(UnitBalance.unit_id).filter(UnitBalance.unit_id.in_(unit_ids))
+        }
+        return [unit_id for unit_id in unit_ids if unit_id not in existing]
+    
+    @staticmethod
+    def _increment(unit_id, assignments=None, **deltas):
+        """
+        Applique des incréments atomiques au solde d'un lot
+        
+        Args:
+            unit_id: ID du lot
+            assignments: Affectations supplémentaires {colonne: expression}
+            **deltas: Incréments {colonne: delta}
+        """
+        if LedgerService._missing([unit_id]):
+            # Les changements de la transaction sont déjà visibles : la reconstruction les inclut
+            LedgerService.rebuild([unit_id])
+            return
+        
+        table = UnitBalance.__table__
+        values = {name: table.c[name] + delta for name, delta in deltas.items()}
+        values.update(assignments or {})
+        values['updated_at'] = datetime.utcnow()
+        db.session.execute(update(table).where(table.c.unit_id == unit_id).values(**values))
+    
+    @staticmethod
+    def record_charge_published(charge_id):
+        """
+        Ajoute les parts d'une charge nouvellement publiée aux soldes des lots
+        
+        À appeler une seule fois, après l'écriture des distributions et le
+        passage de la charge au statut 'published'.
+        
+        Args:
+            charge_id: ID de la charge
+        """
+        distributions = db.session.query(ChargeDistribution.unit_id, ChargeDistribution.amount)\
+            .filter_by(charge_id=charge_id).all()
+        if not distributions:
+            return
+        
+        missing = set(LedgerService._missing([d.unit_id for d in distributions]))
+        
+        table = UnitBalance.__table__
+        increments = [
+            {'b_unit_id': d.unit_id, 'b_amount': d.amount}
+            for d in distributions if d.unit_id not in missing
+        ]
+        if increments:
+            db.session.execute(
+                update(table)
+                .where(table.c.unit_id == bindparam('b_unit_id'))
+                .values(total_charged=table.c.total_charged + bindparam('b_amount'),
+                        updated_at=datetime.utcnow()),
+                increments
+            )
+        
+        if missing:
+            LedgerService.rebuild(missing)
+    
+    @staticmethod
+    def record_charge_distributed(charge):
+        """
+        Publie une charge répartie et reporte ses parts sur les soldes des lots
+        
+        Le passage au statut 'published' est une mise à jour conditionnelle
+        (statut différent de 'published') : si deux publications concurrentes
+        lisent la même charge en brouillon, une seule ajoute les parts aux
+        soldes, l'autre les reconstruit à partir des distributions.
+        
+        Args:
+            charge: Charge dont les distributions viennent d'être écrites
+            
+        Returns:
+            bool: True si la charge vient d'être publiée par cet appel
+        """
+        result = db.session.execute(
+            update(Charge)
+            .where(Charge.id == charge.id, Charge.status != 'published')
+            .values(status='published')
+        )
+        if result.rowcount == 1:
+            LedgerService.record_charge_published(charge.id)
+            return True
+        LedgerService.record_charge_redistributed(charge.id)
+        return False
+    
+    @staticmethod
+    def record_charge_redistributed(charge_id):
+        """Reconstruit les soldes des lots d'une charge déjà publiée puis répartie à nouveau"""
+        unit_ids = [
+            row.unit_id for row in
+            db.session.query(ChargeDistribution.unit_id).filter_by(charge_id=charge_id)
+        ]
+        LedgerService.rebuild(unit_ids)
+    
+    @staticmethod
+    def record_payment_declared(payment):
+        """
+        Ajoute un paiement déclaré (en attente) au solde du lot
+        
+        Args:
+            payment: Paiement déjà ajouté à la session
+        """
+        if payment.status != 'pending':
+            return
+        LedgerService._increment(payment.unit_id, pending_amount=payment.amount, pending_count=1)
+    
+    @staticmethod
+    def record_payment_validated(payment, previous_status, **values):
+        """
+        Valide un paiement et reporte la validation sur le solde du lot
+        
+        Le changement de statut est une mise à jour conditionnelle (statut
+        encore égal à previous_status) : si deux validations concurrentes
+        lisent le même paiement en attente, une seule modifie la ligne et
+        applique l'incrément, l'autre ne change rien.
+        
+        Args:
+            payment: Paiement à valider
+            previous_status: Statut lu avant validation
+            **values: Colonnes du paiement mises à jour en même temps (admin_notes...)
+            
+        Returns:
+            bool: True si ce paiement vient d'être validé par cet appel
+        """
+        if previous_status == 'validated':
+            return False
+        
+        result = db.session.execute(
+            update(Payment)
+            .where(Payment.id == payment.id, Payment.status == previous_status)
+            .values(status='validated', **values)
+        )
+        if result.rowcount != 1:
+            return False
+        mark_dashboard_changed()
+        
+        table = UnitBalance.__table__
+        deltas = {'total_validated': payment.amount}
+        if previous_status == 'pending':
+            deltas['pending_amount'] = -payment.amount
+            deltas['pending_count'] = -1
+        
+        # Dernier paiement : remplacé si ce paiement est plus récent
+        is_latest = or_(table.c.last_payment_date.is_(None), table.c.last_payment_date <= payment.payment_date)
+        assignments = {
+            'last_payment_date': case((is_latest, payment.payment_date), else_=table.c.last_payment_date),
+            'last_payment_amount': case((is_latest, payment.amount), else_=table.c.last_payment_amount)
+        }
+        LedgerService._increment(payment.unit_id, assignments=assignments, **deltas)
+        return True
+    
+    @staticmethod
+    def get_balances(unit_ids):
+        """
+        Récupère les soldes de plusieurs lots (reconstruits s'ils manquent)
+        
+        Args:
+            unit_ids: Liste d'IDs de lots
+            
+        Returns:
+            dict: Soldes par lot ({unit_id: UnitBalance})
+        """
+        if not unit_ids:
+            return {}
+        
+        balances = {
+            balance.unit_id: balance for balance in
+            UnitBalance.query.filter(UnitBalance.unit_id.in_(unit_ids)).all()
+        }
+        
+        missing = [unit_id for unit_id in unit_ids if unit_id not in balances]
+        if missing:
+            try:
+                LedgerService.rebuild(missing)
+                db.session.commit()
+            except IntegrityError:
+                # Reconstruction concurrente : les lignes existent désormais
+                db.session.rollback()
+            balances.update({
+                balance.unit_id: balance for balance in
+                UnitBalance.query.filter(UnitBalance.unit_id.in_(missing)).all()
+            })
+        
+        return balances
+    
+    @staticmethod
+    def get_balance(unit_id):
+        """
+        Récupère le solde d'un lot (lecture par clé primaire)
+        
+        Returns:
+            UnitBalance ou None si le lot n'existe pas
+        """
+        balance = db.session.get(UnitBalance, unit_id)
+        if balance is None:
+            balance = LedgerService.get_balances([unit_id]).get(unit_id)
+        return balance
@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shabaka Syndic - Solution complète et digitale pour les syndics et résidents au Maroc.
+
+Shabaka Syndic
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+"""
+
+import json
+import logging
+import os
+import queue
+import threading
+from datetime import date, datetime
+from decimal import Decimal
+from flask import Response, current_app, jsonify
+from backend.models import db
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """Abonnement d'un client à un canal (file d'événements bornée)"""
+
+    def __init__(self, channel, max_size):
+        self.channel = channel
+        self.queue = queue.Queue(maxsize=max_size)
+        self.closed = False
+
+
+class InProcessBroker:
+    """
+    Diffusion des événements entre les threads d'un même processus
+
+    Un client trop lent dont la file est pleine est désabonné : son flux
+    se termine et le navigateur se reconnecte en rechargeant l'état.
+    """
+
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, channel):
+        """Abonne un client à un canal"""
+        subscription = Subscription(channel, self.queue_size)
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """Désabonne un client"""
+        subscription.closed = True
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel)
+            if subscribers:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.channel]
+
+    def subscriber_count(self, channel):
+        """Nombre de clients abonnés à un canal dans ce processus"""
+        with self._lock:
+            return len(self._subscribers.get(channel, ()))
+
+    def deliver(self, channel, message):
+        """Remet un message aux abonnés locaux du canal"""
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait(message)
+            except queue.Full:
+                self.unsubscribe(subscription)
+
+    def publish(self, channel, message):
+        """Publie un message sur un canal"""
+        self.deliver(channel, message)
+
+    def close(self):
+        """Libère les ressources du broker"""
+
+
+class RedisBroker(InProcessBroker):
+    """
+    Diffusion entre processus via Redis PUBLISH/SUBSCRIBE
+
+    Chaque processus (worker gunicorn) écoute les canaux de l'application
+    dans un thread et remet les messages reçus à ses abonnés locaux.
+    """
+
+    PREFIX = 'mysindic:live:'
+
+    def __init__(self, url, queue_size=100):
+        super().__init__(queue_size)
+        try:
+            import redis
+        except ImportError:
+            raise ValueError("Le broker 'redis' nécessite le paquet redis")
+        self._client = redis.Redis.from_url(url)
+        self._pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.psubscribe(f'{self.PREFIX}*')
+        self._listener = threading.Thread(target=self._listen, name='live-events-redis', daemon=True)
+        self._listener.start()
+
+    def _listen(self):
+        """Relaie les messages Redis aux abonnés locaux"""
+        try:
+            for item in self._pubsub.listen():
+                if item.get('type') != 'pmessage':
+                    continue
+                channel = item['channel'].decode('utf-8')[len(self.PREFIX):]
+                self.deliver(channel, item['data'].decode('utf-8'))
+        except Exception:
+            logger.exception('Écoute Redis des événements en direct interrompue')
+
+    def publish(self, channel, message):
+        """Publie un message pour tous les processus"""
+        self._client.publish(f'{self.PREFIX}{channel}', message)
+
+    def close(self):
+        """Ferme la connexion d'écoute"""
+        self._pubsub.close()
+
+
+# Brokers disponibles : {nom: fabrique(config)} ; 'none' désactive le direct (rafraîchissement périodique)
+_BROKERS = {
+    'none': lambda config: None,
+    'memory': lambda config: InProcessBroker(config.get('LIVE_EVENTS_QUEUE_SIZE', 100)),
+    'redis': lambda config: RedisBroker(config.get('LIVE_EVENTS_REDIS_URL'),
+                                        config.get('LIVE_EVENTS_QUEUE_SIZE', 100)),
+}
+
+
+def register_broker(name, factory):
+    """
+    Déclare un broker supplémentaire
+
+    Args:
+        name: Valeur de LIVE_EVENTS_BROKER
+        factory: Fonction (config) -> broker
+    """
+    _BROKERS[name] = factory
+
+
+def _json_default(value):
+    """Sérialise les dates et décimaux des payloads"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f'Type non sérialisable: {type(value).__name__}')
+
+
+class LiveEvents:
+    """
+    Flux d'événements en direct (Server-Sent Events)
+
+    Les routes publient les changements après commit (présences, votes,
+    statut des résolutions et de l'AG) ; chaque client abonné reçoit les
+    événements du canal de son assemblée sans interroger l'API.
+    """
+
+    _broker = None
+    _pid = None
+    _lock = threading.Lock()
+    _streams = 0
+
+    @staticmethod
+    def get_broker(config):
+        """
+        Broker du processus (créé au premier appel, recréé après un fork)
+
+        Args:
+            config: Configuration de l'application
+
+        Raises:
+            ValueError: Si LIVE_EVENTS_BROKER est inconnu
+        """
+        with LiveEvents._lock:
+            if LiveEvents._broker is None or LiveEvents._pid != os.getpid():
+                name = config.get('LIVE_EVENTS_BROKER', 'memory')
+                if name not in _BROKERS:
+                    raise ValueError(f'Broker d\'événements inconnu: {name}')
+                LiveEvents._broker = _BROKERS[name](config)
+                LiveEvents._pid = os.getpid()
+            return LiveEvents._broker
+
+    @staticmethod
+    def enabled(config):
+        """Indique si les événements en direct sont actifs (LIVE_EVENTS_BROKER différent de 'none')"""
+        return config.get('LIVE_EVENTS_BROKER', 'memory') != 'none'
+
+    @staticmethod
+    def acquire_stream(config):
+        """
+        Réserve une place de flux dans ce processus (LIVE_EVENTS_MAX_STREAMS)
+
+        Returns:
+            bool: False si la limite est atteinte
+        """
+        limit = config.get('LIVE_EVENTS_MAX_STREAMS', 0)
+        with LiveEvents._lock:
+            if limit and LiveEvents._streams >= limit:
+                return False
+            LiveEvents._streams += 1
+            return True
+
+    @staticmethod
+    def release_stream():
+        """Libère une place de flux (fermeture de la réponse)"""
+        with LiveEvents._lock:
+            LiveEvents._streams -= 1
+
+    @staticmethod
+    def format_event(event_type, data):
+        """Formate un événement au format text/event-stream"""
+        payload = json.dumps(data, default=_json_default, separators=(',', ':'))
+        return f'event: {event_type}\ndata: {payload}\n\n'
+
+    @staticmethod
+    def publish(config, channel, event_type, data):
+        """
+        Publie un événement sur un canal
+
+        Une erreur du broker est journalisée sans faire échouer la requête :
+        l'écriture est déjà validée en base.
+
+        Args:
+            config: Configuration de l'application
+            channel: Canal (ex: 'assembly:12')
+            event_type: Type d'événement ('attendance', 'resolution', ...)
+            data: Données JSON de l'événement
+        """
+        if not LiveEvents.enabled(config):
+            return
+        try:
+            broker = LiveEvents.get_broker(config)
+            broker.publish(channel, LiveEvents.format_event(event_type, data))
+        except Exception:
+            logger.exception('Publication de l\'événement %s sur %s impossible', event_type, channel)
+
+    @staticmethod
+    def stream(config, channel):
+        """
+        Générateur du flux SSE d'un canal
+
+        Envoie un commentaire de maintien de connexion toutes les
+        LIVE_EVENTS_HEARTBEAT secondes sans événement.
+
+        Args:
+            config: Configuration de l'application
+            channel: Canal à suivre
+        """
+        heartbeat = config.get('LIVE_EVENTS_HEARTBEAT', 15)
+        broker = LiveEvents.get_broker(config)
+        subscription = broker.subscribe(channel)
+        try:
+            yield 'retry: 3000\n\n'
+            while not subscription.closed:
+                try:
+                    yield subscription.queue.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ': keep-alive\n\n'
+        finally:
+            broker.unsubscribe(subscription)
+
+
+class AssemblyEvents:
+    """
+    Événements en direct d'une assemblée générale
+
+    - attendance : présences modifiées, nombre de présents et quorum
+    - resolution : résolution créée, votée ou clôturée (décomptes inclus)
+    - assembly : changement de statut de l'AG
+
+    Le canal 'assembly:<id>' est diffusé aux participants : les présences
+    n'y portent que le nom et l'état de chacun. Le canal
+    'assembly:<id>:admin' reçoit les mêmes événements avec la liste de
+    présence complète (email, rôle, tantièmes).
+    """
+
+    @staticmethod
+    def channel(assembly_id, admin=False):
+        """Canal des événements d'une assemblée générale (participants ou administrateurs)"""
+        return f'assembly:{assembly_id}:admin' if admin else f'assembly:{assembly_id}'
+
+    @staticmethod
+    def _publish(assembly_id, event, data):
+        """Publie un événement sur les canaux participants et administrateurs"""
+        config = current_app.config
+        for admin in (False, True):
+            LiveEvents.publish(config, AssemblyEvents.channel(assembly_id, admin), event, data)
+
+    @staticmethod
+    def publish_attendance(assembly, user_ids, quorum=None):
+        """
+        Publie les présences modifiées et le quorum (à appeler après commit)
+
+        Args:
+            assembly: Assemblée générale
+            user_ids: Utilisateurs dont la présence a changé
+            quorum: Quorum déjà lu (None = lu ici)
+        """
+        from backend.services.attendance_service import AttendanceService
+        from backend.services.assembly_engine import AssemblyEngine
+
+        if quorum is None:
+            quorum = AssemblyEngine.quorum(assembly)
+        roster = AttendanceService.roster(assembly.id, user_ids)
+        config = current_app.config
+        LiveEvents.publish(config, AssemblyEvents.channel(assembly.id, admin=True), 'attendance', {
+            'attendances': roster,
+            'quorum': quorum
+        })
+        # Participants : ni email, ni rôle, ni tantièmes des autres copropriétaires
+        LiveEvents.publish(config, AssemblyEvents.channel(assembly.id), 'attendance', {
+            'attendances': [{
+                'user_id': row['user_id'],
+                'user_name': row['user_name'],
+                'is_present': row['is_present'],
+                'represented_by': row['represented_by']
+            } for row in roster],
+            'quorum': quorum
+        })
+
+    @staticmethod
+    def publish_resolution(resolution):
+        """Publie l'état d'une résolution (à appeler après commit)"""
+        AssemblyEvents._publish(resolution.assembly_id, 'resolution', resolution.to_dict())
+
+    @staticmethod
+    def publish_assembly(assembly):
+        """Publie le statut d'une AG (à appeler après commit)"""
+        AssemblyEvents._publish(assembly.id, 'assembly', {
+            'id': assembly.id,
+            'status': assembly.status,
+            'agora_started_at': assembly.agora_started_at.isoformat() if assembly.agora_started_at else None,
+            'end_date': assembly.end_date.isoformat() if assembly.end_date else None
+        })
+
+    @staticmethod
+    def response(assembly_id, admin=False):
+        """
+        Réponse text/event-stream des événements d'une AG
+
+        La session SQLAlchemy est fermée avant le flux : une connexion
+        ouverte ne reste pas réservée pendant toute la durée de l'AG. Au-delà
+        de LIVE_EVENTS_MAX_STREAMS flux dans le processus, ou si le direct
+        est désactivé, la réponse est 503 : le navigateur se replie sur le
+        rafraîchissement périodique.
+
+        Args:
+            assembly_id: ID de l'AG
+            admin: Canal administrateurs (liste de présence complète)
+        """
+        config = current_app.config
+        if not LiveEvents.enabled(config) or not LiveEvents.acquire_stream(config):
+            return jsonify({
+                'success': False,
+                'error': 'Trop de connexions en direct sur ce serveur'
+            }), 503, {'Retry-After': '30'}
+
+        generator = LiveEvents.stream(config, AssemblyEvents.channel(assembly_id, admin))
+        db.session.close()
+        response = Response(generator, mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        })
+        # Appelé par le serveur WSGI à la fin du flux, même s'il n'a jamais démarré
+        response.call_on_close(LiveEvents.release_stream)
+        return response
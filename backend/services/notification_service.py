@@ -11,6 +11,8 @@ www.myoneart.com
 
 from datetime import datetime
 import logging
+from flask import current_app
+from sqlalchemy import insert
 
 logger = logging.getLogger(__name__)
 
@@ -20,10 +22,51 @@ class NotificationService:
     Service centralisé de notifications
     """
     
+    @staticmethod
+    def queue_emails(messages):
+        """
+        Ajoute des emails à la file d'envoi (table email_outbox)
+        
+        Les messages sont insérés en une requête groupée puis envoyés en
+        arrière-plan : la requête HTTP n'attend pas le serveur SMTP.
+        
+        Args:
+            messages: Liste de dictionnaires (to_email, subject, body, html_body)
+            
+        Returns:
+            int: Nombre d'emails mis en file
+        """
+        from backend.models import db
+        from backend.models.email_outbox import EmailOutbox
+        from backend.services.email_dispatcher import EmailDispatcher
+        
+        rows = [
+            {
+                'to_email': message['to_email'],
+                'subject': message['subject'],
+                'body': message['body'],
+                'html_body': message.get('html_body'),
+                'status': 'pending',
+                'attempts': 0,
+                'next_attempt_at': datetime.utcnow(),
+                'created_at': datetime.utcnow()
+            }
+            for message in messages if message.get('to_email')
+        ]
+        if not rows:
+            return 0
+        
+        db.session.execute(insert(EmailOutbox), rows)
+        db.session.commit()
+        
+        EmailDispatcher.wake(current_app._get_current_object())
+        logger.info(f"{len(rows)} email(s) mis en file d'envoi")
+        return len(rows)
+    
     @staticmethod
     def send_email(to_email, subject, body, html_body=None):
         """
-        Envoie un email
+        Envoie un email (mis en file, envoyé en arrière-plan)
         
         Args:
             to_email: Email du destinataire
@@ -31,8 +74,12 @@ class NotificationService:
             body: Corps du message (texte)
             html_body: Corps du message (HTML)
         """
-        # TODO: Implémenter l'envoi réel avec Flask-Mail
-        logger.info(f"Email envoyé à {to_email}: {subject}")
+        NotificationService.queue_emails([{
+            'to_email': to_email,
+            'subject': subject,
+            'body': body,
+            'html_body': html_body
+        }])
         return True
     
     @staticmethod
@@ -42,13 +89,13 @@ class NotificationService:
         """
         from backend.models.user import User
         
-        admins = User.query.filter_by(role='superadmin').all()
+        admin_emails = [row.email for row in User.query.with_entities(User.email).filter_by(role='superadmin')]
         
-        for admin in admins:
-            NotificationService.send_email(
-                to_email=admin.email,
-                subject=f"Nouvelle demande de maintenance: {maintenance_request.title}",
-                body=f"""
+        NotificationService.queue_emails([
+            {
+                'to_email': email,
+                'subject': f"Nouvelle demande de maintenance: {maintenance_request.title}",
+                'body': f"""
                 Une nouvelle demande de maintenance a été créée.
                 
                 Titre: {maintenance_request.title}
@@ -56,7 +103,9 @@ class NotificationService:
                 Priorité: {maintenance_request.priority}
                 Description: {maintenance_request.description}
                 """
-            )
+            }
+            for email in admin_emails
+        ])
     
     @staticmethod
     def notify_maintenance_status_update(maintenance_request):
@@ -79,23 +128,24 @@ class NotificationService:
         Notifie les résidents qu'une nouvelle charge a été publiée
         """
         from backend.models.user import User
-        from backend.models.residence import Residence
         
-        residence = Residence.query.get(charge.residence_id)
-        residents = User.query.filter_by(residence_id=residence.id, role='resident').all()
+        resident_emails = [
+            row.email for row in
+            User.query.with_entities(User.email).filter_by(residence_id=charge.residence_id, role='resident')
+        ]
         
-        for resident in residents:
-            NotificationService.send_email(
-                to_email=resident.email,
-                subject=f"Nouvel appel de fonds: {charge.title}",
-                body=f"""
+        body = f"""
                 Un nouvel appel de fonds a été publié pour votre résidence.
                 
                 Titre: {charge.title}
                 Montant total: {charge.total_amount} MAD
                 Date limite: {charge.due_date.strftime('%d/%m/%Y') if charge.due_date else 'Non définie'}
                 """
-            )
+        
+        NotificationService.queue_emails([
+            {'to_email': email, 'subject': f"Nouvel appel de fonds: {charge.title}", 'body': body}
+            for email in resident_emails
+        ])
     
     @staticmethod
     def notify_assembly_convocation(assembly):
@@ -103,16 +153,13 @@ class NotificationService:
         Envoie les convocations pour une assemblée générale
         """
         from backend.models.user import User
-        from backend.models.residence import Residence
         
-        residence = Residence.query.get(assembly.residence_id)
-        residents = User.query.filter_by(residence_id=residence.id, role='resident').all()
+        resident_emails = [
+            row.email for row in
+            User.query.with_entities(User.email).filter_by(residence_id=assembly.residence_id, role='resident')
+        ]
         
-        for resident in residents:
-            NotificationService.send_email(
-                to_email=resident.email,
-                subject=f"Convocation: {assembly.title}",
-                body=f"""
+        body = f"""
                 Vous êtes convoqué(e) à l'assemblée générale suivante:
                 
                 Type: {assembly.assembly_type}
@@ -122,4 +169,8 @@ class NotificationService:
                 Description:
                 {assembly.description}
                 """
-            )
+        
+        NotificationService.queue_emails([
+            {'to_email': email, 'subject': f"Convocation: {assembly.title}", 'body': body}
+            for email in resident_emails
+        ])
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shabaka Syndic - Solution complète et digitale pour les syndics et résidents au Maroc.
+
+Shabaka Syndic
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+"""
+
+import threading
+import time
+from flask import current_app
+from sqlalchemy import func, select
+from backend.models import db
+from backend.models.poll import Poll, PollOption, PollVote
+from backend.utils.session_invalidation import register_session_invalidation
+
+
+# Décomptes par sondage : {poll_id: (expiration, {option_id: votes})}
+_tallies = {}
+_tallies_lock = threading.Lock()
+
+
+class PollResults:
+    """
+    Résultats des sondages
+
+    Les votes sont comptés en SQL (GROUP BY option_id) sans charger les
+    lignes PollVote. Les décomptes sont conservés par sondage pendant
+    POLL_RESULTS_CACHE_TTL secondes et invalidés dès qu'un vote, une option
+    ou un sondage est validé en base.
+    """
+
+    @staticmethod
+    def count_votes(poll_ids):
+        """
+        Compte les votes par option pour plusieurs sondages en une requête
+
+        Args:
+            poll_ids: Liste des IDs de sondages
+
+        Returns:
+            dict: {poll_id: {option_id: votes}}
+        """
+        tallies = {poll_id: {} for poll_id in poll_ids}
+        if not tallies:
+            return tallies
+
+        rows = db.session.execute(
+            select(PollVote.poll_id, PollVote.option_id, func.count(PollVote.id))
+            .where(PollVote.poll_id.in_(list(tallies)))
+            .group_by(PollVote.poll_id, PollVote.option_id)
+        ).all()
+        for poll_id, option_id, votes in rows:
+            tallies[poll_id][option_id] = votes
+        return tallies
+
+    @staticmethod
+    def get_tallies(poll_ids):
+        """
+        Récupère les décomptes de plusieurs sondages (cache si valide)
+
+        Args:
+            poll_ids: Liste des IDs de sondages
+
+        Returns:
+            dict: {poll_id: {option_id: votes}}
+        """
+        ttl = current_app.config.get('POLL_RESULTS_CACHE_TTL', 0)
+        now = time.monotonic()
+        tallies = {}
+
+        if ttl:
+            with _tallies_lock:
+                for poll_id in poll_ids:
+                    cached = _tallies.get(poll_id)
+                    if cached and cached[0] > now:
+                        tallies[poll_id] = cached[1]
+
+        missing = [poll_id for poll_id in poll_ids if poll_id not in tallies]
+        if missing:
+            computed = PollResults.count_votes(missing)
+            tallies.update(computed)
+            if ttl:
+                with _tallies_lock:
+                    for poll_id, counts in computed.items():
+                        _tallies[poll_id] = (now + ttl, counts)
+
+        return {poll_id: dict(counts) for poll_id, counts in tallies.items()}
+
+    @staticmethod
+    def build(poll, counts):
+        """
+        Construit les résultats d'un sondage à partir de ses décomptes
+
+        Args:
+            poll: Sondage (options chargées)
+            counts: Décomptes {option_id: votes}
+
+        Returns:
+            dict: Résultats au format de Poll.get_results()
+        """
+        total_votes = sum(counts.values())
+        results = []
+
+        for option in poll.options:
+            vote_count = counts.get(option.id, 0)
+            percentage = (vote_count / total_votes * 100) if total_votes > 0 else 0
+
+            results.append({
+                'option_id': option.id,
+                'option_text': option.option_text,
+                'votes': vote_count,
+                'percentage': round(percentage, 2)
+            })
+
+        return {
+            'poll_id': poll.id,
+            'question': poll.question,
+            'total_votes': total_votes,
+            'options': results
+        }
+
+    @staticmethod
+    def get(poll):
+        """
+        Récupère les résultats d'un sondage
+
+        Args:
+            poll: Sondage
+
+        Returns:
+            dict: Résultats du sondage
+        """
+        counts = PollResults.get_tallies([poll.id])[poll.id]
+        return PollResults.build(poll, counts)
+
+    @staticmethod
+    def get_voted_poll_ids(user_id, poll_ids):
+        """
+        Sondages auxquels un utilisateur a déjà participé (une requête)
+
+        Args:
+            user_id: ID de l'utilisateur
+            poll_ids: Liste des IDs de sondages à vérifier
+
+        Returns:
+            set: IDs des sondages où l'utilisateur a voté
+        """
+        if not poll_ids:
+            return set()
+        return set(db.session.execute(
+            select(PollVote.poll_id).distinct()
+            .where(PollVote.user_id == user_id, PollVote.poll_id.in_(list(poll_ids)))
+        ).scalars())
+
+    @staticmethod
+    def invalidate(poll_ids=None):
+        """
+        Invalide les décomptes en cache
+
+        Args:
+            poll_ids: Sondages modifiés (None = tous)
+        """
+        with _tallies_lock:
+            if poll_ids is None:
+                _tallies.clear()
+                return
+            for poll_id in poll_ids:
+                _tallies.pop(poll_id, None)
+
+
+def _changed_poll_ids(obj):
+    """Sondages touchés par un objet modifié (None = impossible à déterminer)"""
+    if isinstance(obj, Poll):
+        return [obj.id]
+    if obj.poll_id is None:
+        return None
+    return [obj.poll_id]
+
+
+# Invalidation après commit ; mark_polls_changed() pour les écritures Core
+mark_polls_changed = register_session_invalidation((Poll, PollOption, PollVote), PollResults.invalidate, _changed_poll_ids)
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shabaka Syndic - Solution complète et digitale pour les syndics et résidents au Maroc.
+
+Shabaka Syndic
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+"""
+
+from datetime import datetime
+from sqlalchemy import case, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from backend.models import db
+from backend.models.general_assembly import Resolution, Vote
+
+
+# Colonne de compteur par valeur de vote
+VOTE_COLUMNS = {
+    'for': 'votes_for',
+    'against': 'votes_against',
+    'abstain': 'votes_abstain',
+}
+
+
+class ResolutionVoteService:
+    """
+    Enregistrement des votes sur les résolutions d'AG
+
+    Un vote est inséré (ou modifié) dans la table votes, unique par
+    (resolution_id, user_id), puis les compteurs de la résolution sont
+    ajustés par un UPDATE atomique (col = col + delta) : des votes simultanés
+    ne se perdent pas et ne verrouillent la ligne de la résolution que le
+    temps de l'UPDATE. recount() recalcule les compteurs depuis la table
+    votes, à la clôture.
+    """
+
+    @staticmethod
+    def _insert_vote(resolution_id, user_id, vote_value, weight, voices):
+        """
+        Tente d'insérer un nouveau vote
+
+        Returns:
+            bool: True si le vote a été créé, False s'il existait déjà
+        """
+        values = {
+            'resolution_id': resolution_id,
+            'user_id': user_id,
+            'vote_value': vote_value,
+            'weight': weight,
+            'voices': voices,
+            'voted_at': datetime.utcnow(),
+        }
+
+        if db.session.get_bind().dialect.name == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+            statement = pg_insert(Vote).values(**values)\
+                .on_conflict_do_nothing(index_elements=['resolution_id', 'user_id'])\
+                .returning(Vote.id)
+            return db.session.execute(statement).first() is not None
+
+        # Autres bases : insertion dans un savepoint, le conflit annule seulement celle-ci
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(Vote), [values])
+            return True
+        except IntegrityError:
+            return False
+
+    @staticmethod
+    def record_vote(resolution_id, user_id, vote_value, assembly_id=None, power=None):
+        """
+        Enregistre ou modifie le vote d'un utilisateur
+
+        Le bulletin pèse les tantièmes du votant et de ses mandants
+        (AssemblyEngine.voting_power). Ne valide pas la transaction :
+        l'appelant fait le commit.
+
+        Args:
+            resolution_id: ID de la résolution
+            user_id: ID du votant
+            vote_value: 'for', 'against' ou 'abstain'
+            assembly_id: ID de l'AG (lu depuis la résolution si absent)
+            power: (poids, voix) déjà lus par AssemblyEngine.voting_power()
+
+        Returns:
+            str: Valeur du vote précédent (None si premier vote)
+
+        Raises:
+            ValueError: Si la valeur du vote est invalide
+        """
+        from backend.services.assembly_engine import AssemblyEngine
+
+        if vote_value not in VOTE_COLUMNS:
+            raise ValueError('Valeur de vote invalide')
+
+        if assembly_id is None:
+            assembly_id = db.session.execute(
+                select(Resolution.assembly_id).where(Resolution.id == resolution_id)
+            ).scalar_one()
+        weight, voices = power if power is not None else AssemblyEngine.voting_power(assembly_id, user_id)
+
+        previous = None
+        if not ResolutionVoteService._insert_vote(resolution_id, user_id, vote_value, weight, voices):
+            # Vote existant : le verrou de ligne sérialise les votes d'un même utilisateur
+            previous = tuple(db.session.execute(
+                select(Vote.vote_value, Vote.weight, Vote.voices)
+                .where(Vote.resolution_id == resolution_id, Vote.user_id == user_id)
+                .with_for_update()
+            ).one())
+            db.session.execute(
+                update(Vote)
+                .where(Vote.resolution_id == resolution_id, Vote.user_id == user_id)
+                .values(vote_value=vote_value, weight=weight, voices=voices, voted_at=datetime.utcnow())
+            )
+
+        values = {
+            getattr(Resolution, column): func.coalesce(getattr(Resolution, column), 0) + delta
+            for column, delta in AssemblyEngine.vote_deltas(previous, (vote_value, weight, voices)).items()
+        }
+
+        # Le premier vote ouvre la résolution
+        values[Resolution.status] = case(
+            (Resolution.status == 'pending', 'voting'),
+            else_=Resolution.status
+        )
+
+        db.session.execute(
+            update(Resolution)
+            .where(Resolution.id == resolution_id)
+            .values(values)
+            .execution_options(synchronize_session=False)
+        )
+        return previous[0] if previous else None
+
+    @staticmethod
+    def count_votes(resolution_id):
+        """
+        Compte les votes d'une résolution depuis la table votes
+
+        Returns:
+            dict: {'for': n, 'against': n, 'abstain': n}
+        """
+        return ResolutionVoteService.tally(resolution_id)['votes']
+
+    @staticmethod
+    def tally(resolution_id):
+        """
+        Bulletins, poids et voix d'une résolution depuis la table votes (une requête)
+
+        Returns:
+            dict: {'votes': {valeur: n}, 'weights': {valeur: tantièmes}, 'voices_for': n}
+        """
+        result = {
+            'votes': {value: 0 for value in VOTE_COLUMNS},
+            'weights': {value: 0 for value in VOTE_COLUMNS},
+            'voices_for': 0
+        }
+        rows = db.session.execute(
+            select(Vote.vote_value, func.count(Vote.id),
+                   func.coalesce(func.sum(Vote.weight), 0), func.coalesce(func.sum(Vote.voices), 0))
+            .where(Vote.resolution_id == resolution_id)
+            .group_by(Vote.vote_value)
+        ).all()
+        for vote_value, total, weight, voices in rows:
+            if vote_value in VOTE_COLUMNS:
+                result['votes'][vote_value] = total
+                result['weights'][vote_value] = int(weight)
+                if vote_value == 'for':
+                    result['voices_for'] = int(voices)
+        return result
+
+    @staticmethod
+    def recount(resolution):
+        """
+        Recalcule les compteurs d'une résolution depuis la table votes
+
+        Args:
+            resolution: Résolution à recompter (modifiée en session)
+
+        Returns:
+            dict: Décompte des bulletins
+        """
+        tally = ResolutionVoteService.tally(resolution.id)
+        for vote_value, column in VOTE_COLUMNS.items():
+            setattr(resolution, column, tally['votes'][vote_value])
+            setattr(resolution, f'weight_{vote_value}', tally['weights'][vote_value])
+        resolution.voices_for = tally['voices_for']
+        return tally['votes']
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shabaka Syndic - Solution complète et digitale pour les syndics et résidents au Maroc.
+
+Shabaka Syndic
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+"""
+
+import csv
+import io
+from datetime import datetime
+from sqlalchemy import insert
+from backend.models import db
+from backend.models.residence import Residence, Unit
+from backend.services.dashboard_stats import mark_dashboard_changed
+
+
+# Colonnes acceptées (en-tête normalisé -> champ de Unit)
+COLUMN_ALIASES = {
+    'unit_number': 'unit_number',
+    'numero': 'unit_number',
+    'lot': 'unit_number',
+    'floor': 'floor',
+    'etage': 'floor',
+    'building': 'building',
+    'division': 'building',
+    'batiment': 'building',
+    'unit_type': 'unit_type',
+    'type': 'unit_type',
+    'surface_area': 'surface_area',
+    'surface': 'surface_area',
+    'tantiemes': 'tantiemes',
+    'owner_name': 'owner_name',
+    'owner_email': 'owner_email',
+    'owner_phone': 'owner_phone',
+    'is_occupied': 'is_occupied',
+}
+
+# Erreurs par ligne reprises dans le bilan final (error_count donne le total)
+MAX_REPORTED_ERRORS = 1000
+
+_TRUE_VALUES = {'1', 'true', 'oui', 'yes', 'o', 'y'}
+_FALSE_VALUES = {'0', 'false', 'non', 'no', 'n'}
+
+
+class UnitImportService:
+    """
+    Service d'import groupé des lots d'une résidence
+    
+    Les fichiers CSV/XLSX sont lus ligne par ligne (jamais chargés en
+    entier), validés par lots de lignes puis insérés par INSERT groupés.
+    """
+    
+    @staticmethod
+    def iter_rows(stream, filename):
+        """
+        Lit un fichier CSV ou XLSX ligne par ligne
+        
+        Args:
+            stream: Flux binaire du fichier
+            filename: Nom du fichier (détermine le format)
+            
+        Yields:
+            tuple: (numéro de ligne, dictionnaire {en-tête: valeur})
+        """
+        extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+        
+        if extension == 'csv':
+            text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+            sample = text.read(4096)
+            try:
+                dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+            except csv.Error:
+                dialect = csv.excel
+            text.seek(0)
+            reader = csv.DictReader(text, dialect=dialect)
+            for row in reader:
+                yield reader.line_num, row
+            return
+        
+        if extension == 'xlsx':
+            try:
+                from openpyxl import load_workbook
+            except ImportError:
+                raise ValueError("L'import XLSX nécessite le paquet openpyxl")
+            
+            workbook = load_workbook(stream, read_only=True, data_only=True)
+            try:
+                rows = workbook.active.iter_rows(values_only=True)
+                headers = [str(h).strip() if h is not None else '' for h in next(rows, [])]
+                for line, values in enumerate(rows, start=2):
+                    yield line, dict(zip(headers, values))
+            finally:
+                workbook.close()
+            return
+        
+        raise ValueError("Format de fichier non supporté (CSV ou XLSX attendu)")
+    
+    @staticmethod
+    def normalize_row(raw):
+        """
+        Convertit une ligne brute en champs de Unit
+        
+        Args:
+            raw: Dictionnaire {en-tête: valeur}
+            
+        Returns:
+            dict: Champs de Unit
+            
+        Raises:
+            ValueError: Si une valeur est invalide
+        """
+        row = {}
+        for header, value in raw.items():
+            if header is None:
+                continue
+            field = COLUMN_ALIASES.get(str(header).strip().lower().replace(' ', '_'))
+            if field is None:
+                continue
+            if isinstance(value, str):
+                value = value.strip()
+            if value in (None, ''):
+                continue
+            row[field] = value
+        
+        if not row.get('unit_number'):
+            raise ValueError("Numéro de lot manquant")
+        row['unit_number'] = str(row['unit_number'])
+        
+        try:
+            if 'floor' in row:
+                row['floor'] = int(float(row['floor']))
+            if 'tantiemes' in row:
+                row['tantiemes'] = int(float(row['tantiemes']))
+            if 'surface_area' in row:
+                row['surface_area'] = float(str(row['surface_area']).replace(',', '.'))
+        except ValueError:
+            raise ValueError("Valeur numérique invalide (étage, surface ou tantièmes)")
+        
+        if 'is_occupied' in row and not isinstance(row['is_occupied'], bool):
+            flag = str(row['is_occupied']).lower()
+            if flag not in _TRUE_VALUES | _FALSE_VALUES:
+                raise ValueError("Valeur invalide pour is_occupied")
+            row['is_occupied'] = flag in _TRUE_VALUES
+        
+        for field in ('building', 'unit_type', 'owner_name', 'owner_email', 'owner_phone'):
+            if field in row:
+                row[field] = str(row[field])
+        
+        return row
+    
+    @staticmethod
+    def insert_units(residence_id, rows):
+        """
+        Insère des lots en une seule requête groupée
+        
+        Args:
+            residence_id: ID de la résidence
+            rows: Liste de dictionnaires de champs de Unit
+            
+        Returns:
+            int: Nombre de lots insérés
+        """
+        if not rows:
+            return 0
+        now = datetime.utcnow()
+        mark_dashboard_changed([residence_id])
+        db.session.execute(insert(Unit), [
+            {'is_occupied': True, **row, 'residence_id': residence_id, 'created_at': now, 'updated_at': now}
+            for row in rows
+        ])
+        return len(rows)
+    
+    @staticmethod
+    def import_units(residence_id, rows, batch_size=500):
+        """
+        Importe des lots par lots de lignes et rend compte de la progression
+        
+        Chaque lot de lignes valides est inséré puis validé (commit) ; les
+        lignes invalides ou en doublon sont ignorées et signalées. Chaque
+        progression contient les erreurs de son lot ; le bilan final reprend
+        celles de tout le fichier (au plus MAX_REPORTED_ERRORS) et leur
+        nombre total (error_count).
+        
+        Args:
+            residence_id: ID de la résidence
+            rows: Itérable de (numéro de ligne, ligne brute)
+            batch_size: Nombre de lignes par lot
+            
+        Yields:
+            dict: Progression après chaque lot, puis le bilan final ('done': True)
+        """
+        # Numéros de lots existants (doublons refusés)
+        seen = {
+            number for (number,) in
+            db.session.query(Unit.unit_number).filter_by(residence_id=residence_id)
+        }
+        
+        processed = created = error_count = 0
+        batch = []
+        errors = []
+        reported_errors = []
+        
+        def flush():
+            nonlocal created
+            created += UnitImportService.insert_units(residence_id, batch)
+            db.session.commit()
+            batch.clear()
+        
+        for line, raw in rows:
+            processed += 1
+            try:
+                row = UnitImportService.normalize_row(raw)
+                if row['unit_number'] in seen:
+                    raise ValueError(f"Le lot {row['unit_number']} existe déjà")
+                seen.add(row['unit_number'])
+                batch.append(row)
+            except ValueError as e:
+                error_count += 1
+                errors.append({'line': line, 'error': str(e)})
+                if len(reported_errors) < MAX_REPORTED_ERRORS:
+                    reported_errors.append(errors[-1])
+            
+            if processed % batch_size == 0:
+                flush()
+                yield {'processed': processed, 'created': created, 'errors': errors, 'error_count': error_count}
+                errors = []
+        
+        flush()
+        
+        # Mettre à jour le nombre total de lots de la résidence
+        residence = Residence.query.get(residence_id)
+        residence.total_units = Unit.query.filter_by(residence_id=residence_id).count()
+        db.session.commit()
+        
+        yield {
+            'processed': processed,
+            'created': created,
+            'errors': reported_errors,
+            'error_count': error_count,
+            'errors_truncated': error_count > len(reported_errors),
+            'total_units': residence.total_units,
+            'done': True
+        }
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shabaka Syndic - Solution complète et digitale pour les syndics et résidents au Maroc.
+
+Shabaka Syndic
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+"""
+
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import threading
+from flask import Response, current_app, send_from_directory, url_for
+from werkzeug.exceptions import NotFound
+from werkzeug.security import safe_join
+
+
+# Fichiers statiques servis sous un nom à empreinte (cache immuable)
+FINGERPRINT_EXTENSIONS = {'.css', '.js', '.svg', '.png', '.jpg', '.jpeg', '.gif', '.webp', '.ico',
+                          '.woff', '.woff2'}
+
+# Exclus : fichiers uploadés (déjà nommés par contenu) et fichiers à URL fixe
+EXCLUDED_PREFIXES = ('uploads/',)
+EXCLUDED_FILES = {'sw.js', 'manifest.json'}
+
+# Fichiers mis en cache par le service worker à l'installation
+PRECACHE_PREFIXES = ('css/', 'js/', 'favicon/')
+PRECACHE_EXTERNAL = ('https://cdn.tailwindcss.com',)
+
+# Nom à empreinte : <nom>.<12 caractères hexadécimaux>.<extension>
+_FINGERPRINTED = re.compile(r'^(?P<stem>.+)\.[0-9a-f]{12}(?P<ext>\.[^./]+)$')
+
+# Upload adressé par contenu (FileStorage) : <empreinte SHA-256>[.variante].<extension>
+_CONTENT_ADDRESSED = re.compile(r'(^|/)[0-9a-f]{64}(\.[a-z]+)?\.[^./]+$')
+
+_PRECACHE_LINE = re.compile(r'^const PRECACHE_MANIFEST = .*;$', re.MULTILINE)
+
+
+class StaticAssets:
+    """
+    Fichiers statiques à empreinte et service worker généré
+
+    Au démarrage, chaque fichier CSS, JS ou image de frontend/static est
+    haché : url_for('static', filename='css/main.css') renvoie
+    /static/css/main.<empreinte>.css, servi avec Cache-Control immutable.
+    Une modification du fichier change son URL, le navigateur n'a donc
+    jamais de version périmée. Les uploads peuvent être délégués au serveur
+    frontal (X-Sendfile ou X-Accel-Redirect). /sw.js est généré avec la
+    liste de précache et un nom de cache dérivé des empreintes.
+    """
+
+    def __init__(self, app):
+        self.static_folder = app.static_folder
+        self.debug = app.debug
+        self._files = {}  # {nom logique: (date de modification, nom à empreinte)}
+        self._reverse = {}  # {nom à empreinte: nom logique}
+        self._service_worker = None
+        self._lock = threading.Lock()
+        if app.config.get('STATIC_FINGERPRINT', True):
+            self.build()
+
+    @staticmethod
+    def fingerprint(path):
+        """Empreinte du contenu d'un fichier (12 caractères)"""
+        digest = hashlib.sha256()
+        with open(path, 'rb') as source:
+            for chunk in iter(lambda: source.read(64 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()[:12]
+
+    def _entry(self, filename, path):
+        """Calcule le nom à empreinte d'un fichier"""
+        stem, extension = os.path.splitext(filename)
+        return os.path.getmtime(path), f'{stem}.{self.fingerprint(path)}{extension}'
+
+    def _eligible(self, filename):
+        return (os.path.splitext(filename)[1].lower() in FINGERPRINT_EXTENSIONS
+                and filename not in EXCLUDED_FILES
+                and not filename.startswith(EXCLUDED_PREFIXES))
+
+    def build(self):
+        """Calcule les empreintes de tous les fichiers statiques"""
+        files = {}
+        for directory, subdirs, names in os.walk(self.static_folder):
+            relative_dir = os.path.relpath(directory, self.static_folder).replace(os.sep, '/')
+            if relative_dir != '.' and f'{relative_dir}/'.startswith(EXCLUDED_PREFIXES):
+                subdirs[:] = []
+                continue
+            for name in names:
+                filename = name if relative_dir == '.' else f'{relative_dir}/{name}'
+                if self._eligible(filename):
+                    files[filename] = self._entry(filename, os.path.join(directory, name))
+
+        with self._lock:
+            self._files = files
+            self._reverse = {fingerprinted: filename for filename, (_, fingerprinted) in files.items()}
+            self._service_worker = None
+
+    def url_filename(self, filename):
+        """
+        Nom à utiliser dans l'URL d'un fichier statique
+
+        En mode debug, un fichier modifié depuis le démarrage est haché à
+        nouveau (sans redémarrer le serveur).
+        """
+        entry = self._files.get(filename)
+        if entry is None:
+            return filename
+        if self.debug:
+            path = os.path.join(self.static_folder, filename)
+            if os.path.exists(path) and os.path.getmtime(path) != entry[0]:
+                entry = self._entry(filename, path)
+                with self._lock:
+                    self._files[filename] = entry
+                    self._reverse[entry[1]] = filename
+                    self._service_worker = None
+        return entry[1]
+
+    def resolve(self, filename):
+        """
+        Nom logique d'un fichier demandé
+
+        Returns:
+            tuple: (nom logique, True si l'URL contient l'empreinte courante)
+        """
+        logical = self._reverse.get(filename)
+        if logical is not None:
+            return logical, True
+        # Empreinte d'un déploiement précédent : le fichier courant est servi sans cache long
+        match = _FINGERPRINTED.match(filename)
+        if match and match.group('stem') + match.group('ext') in self._files:
+            return match.group('stem') + match.group('ext'), False
+        return filename, False
+
+    def precache_manifest(self):
+        """
+        Liste de précache du service worker
+
+        Returns:
+            dict: {'version': empreinte de l'ensemble des fichiers, 'urls': [...]}
+        """
+        urls = ['/'] + sorted(
+            url_for('static', filename=filename)
+            for filename in self._files if filename.startswith(PRECACHE_PREFIXES)
+        ) + [url_for('static', filename='manifest.json')] + list(PRECACHE_EXTERNAL)
+        fingerprints = ''.join(sorted(fingerprinted for _, fingerprinted in self._files.values()))
+        version = hashlib.sha256((fingerprints + '\n'.join(urls)).encode('utf-8')).hexdigest()[:12]
+        return {'version': version, 'urls': urls}
+
+    def service_worker(self):
+        """Source de sw.js avec la liste de précache du déploiement"""
+        if self._service_worker is None:
+            with open(os.path.join(self.static_folder, 'sw.js'), encoding='utf-8') as source:
+                script = source.read()
+            manifest = json.dumps(self.precache_manifest(), separators=(',', ':'))
+            self._service_worker = _PRECACHE_LINE.sub(
+                lambda _: f'const PRECACHE_MANIFEST = {manifest};', script, count=1
+            )
+        return self._service_worker
+
+    def send(self, filename):
+        """Réponse d'un fichier statique avec les en-têtes de cache adaptés"""
+        config = current_app.config
+
+        if filename == 'sw.js':
+            return service_worker_response()
+
+        logical, fingerprinted = self.resolve(filename)
+        immutable = fingerprinted or bool(
+            logical.startswith('uploads/') and _CONTENT_ADDRESSED.search(logical)
+        )
+
+        accel_prefix = config.get('UPLOADS_ACCEL_REDIRECT')
+        if accel_prefix and logical.startswith('uploads/'):
+            # Nginx sert le fichier depuis une location interne
+            if safe_join(self.static_folder, logical) is None or \
+                    not os.path.isfile(os.path.join(self.static_folder, logical)):
+                raise NotFound()
+            response = Response(mimetype=mimetypes.guess_type(logical)[0] or 'application/octet-stream')
+            response.headers['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + logical[len('uploads/'):]
+        else:
+            # USE_X_SENDFILE : send_from_directory délègue l'envoi au serveur frontal
+            response = send_from_directory(self.static_folder, logical)
+
+        if immutable:
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = config.get('STATIC_IMMUTABLE_MAX_AGE', 31536000)
+            response.cache_control.immutable = True
+        return response
+
+
+def service_worker_response():
+    """Réponse de /sw.js (jamais mise en cache : le navigateur détecte les nouvelles versions)"""
+    assets = current_app.extensions['static_assets']
+    response = Response(assets.service_worker(), mimetype='application/javascript')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['Service-Worker-Allowed'] = '/'
+    return response
+
+
+def init_assets(app):
+    """
+    Installe les fichiers à empreinte et le service worker sur l'application
+
+    Args:
+        app: Application Flask
+    """
+    assets = StaticAssets(app)
+    app.extensions['static_assets'] = assets
+
+    @app.url_defaults
+    def fingerprint_static_urls(endpoint, values):
+        """Remplace le nom des fichiers statiques par leur nom à empreinte"""
+        if endpoint == 'static' and 'filename' in values:
+            values['filename'] = assets.url_filename(values['filename'])
+
+    app.view_functions['static'] = assets.send
+    app.add_url_rule('/sw.js', 'service_worker', service_worker_response)
+    return assets
@@ -6,12 +6,22 @@ Shabaka Syndic - Décorateurs de sécurité réutilisables
 Contient tous les décorateurs pour contrôler l'accès par rôle et résidence.
 """
 
+import threading
+import time
 from functools import wraps
-from flask import jsonify, abort
+from flask import jsonify, abort, current_app, g
 from flask_login import current_user
 from backend.models.residence_admin import ResidenceAdmin
 
 
+# Cache inter-requêtes des résidences assignées aux admins : {user_id: (expiration, ids)}
+# Désactivé par défaut (RESIDENCE_SCOPE_CACHE_TTL = 0) : il est propre à chaque
+# processus et l'invalidation n'atteint pas les autres workers, qui garderaient
+# un accès retiré jusqu'à l'expiration. Seul le cache par requête (g) reste actif.
+_scope_cache = {}
+_scope_cache_lock = threading.Lock()
+
+
 def superadmin_required(f):
     """Décorateur pour vérifier que l'utilisateur est un superadmin"""
     @wraps(f)
@@ -67,25 +77,71 @@ def owner_or_above_required(f):
     return decorated_function
 
 
+def _get_assigned_residence_ids(user_id):
+    """Résidences assignées à un admin (cache TTL optionnel, sinon une requête)"""
+    ttl = current_app.config.get('RESIDENCE_SCOPE_CACHE_TTL', 0)
+    if ttl:
+        with _scope_cache_lock:
+            cached = _scope_cache.get(user_id)
+        if cached and cached[0] > time.monotonic():
+            return list(cached[1])
+    
+    residence_ids = [
+        row.residence_id for row in
+        ResidenceAdmin.query.with_entities(ResidenceAdmin.residence_id).filter_by(user_id=user_id)
+    ]
+    
+    if ttl:
+        with _scope_cache_lock:
+            _scope_cache[user_id] = (time.monotonic() + ttl, tuple(residence_ids))
+    return residence_ids
+
+
+def invalidate_residence_scope(user_id=None):
+    """
+    Invalide le périmètre de résidences mis en cache
+    
+    À appeler après toute modification des assignations admin/résidence
+    ou du rôle / de la résidence d'un utilisateur.
+    
+    Args:
+        user_id: Utilisateur concerné (None = tous les utilisateurs)
+    """
+    with _scope_cache_lock:
+        if user_id is None:
+            _scope_cache.clear()
+        else:
+            _scope_cache.pop(user_id, None)
+    g.pop('residence_scope', None)
+
+
 def get_user_residence_ids():
     """
     Récupère les IDs des résidences auxquelles l'utilisateur a accès
     
+    Le résultat est mis en cache pour la durée de la requête (flask.g) :
+    au plus une requête SQL par requête HTTP.
+    
     Returns:
         list: Liste des IDs de résidence ou None si accès à toutes les résidences (superadmin)
     """
+    cached = g.get('residence_scope')
+    if cached is not None and cached[0] == current_user.id:
+        return None if cached[1] is None else list(cached[1])
+    
     if current_user.is_superadmin():
-        return None  # None signifie accès à toutes les résidences
+        residence_ids = None  # None signifie accès à toutes les résidences
     elif current_user.is_admin():
         # Admin voit seulement les résidences assignées
-        assignments = ResidenceAdmin.query.filter_by(user_id=current_user.id).all()
-        return [a.residence_id for a in assignments]
+        residence_ids = _get_assigned_residence_ids(current_user.id)
     elif current_user.is_owner() or current_user.is_resident():
         # Propriétaire et résident voient seulement leur résidence
-        if current_user.residence_id:
-            return [current_user.residence_id]
-        return []
-    return []
+        residence_ids = [current_user.residence_id] if current_user.residence_id else []
+    else:
+        residence_ids = []
+    
+    g.residence_scope = (current_user.id, None if residence_ids is None else tuple(residence_ids))
+    return residence_ids
 
 
 def check_residence_access(residence_id):
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shabaka Syndic - Solution complète et digitale pour les syndics et résidents au Maroc.
+
+Shabaka Syndic
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+"""
+
+import gzip
+from flask import current_app, request
+
+
+# Types compressés (les images et PDF le sont déjà)
+COMPRESSIBLE_TYPES = {'application/json', 'text/html', 'text/css', 'text/csv', 'text/plain',
+                      'application/javascript', 'image/svg+xml'}
+
+
+def _brotli():
+    """Module brotli s'il est installé (optionnel, gzip sinon)"""
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def _conditional_response(response):
+    """ETag faible calculé sur le corps des réponses JSON et 304 si le client l'a déjà"""
+    if request.method not in ('GET', 'HEAD') or response.status_code != 200 \
+            or response.mimetype != 'application/json' or response.is_streamed:
+        return response
+    # Réponse propre à l'utilisateur : revalidée à chaque affichage, jamais partagée
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    if 'ETag' not in response.headers:
+        response.add_etag(weak=True)
+    return response.make_conditional(request)
+
+
+def _compress(response):
+    """Compresse le corps (brotli si accepté et installé, sinon gzip) au-delà de COMPRESS_MIN_SIZE"""
+    config = current_app.config
+    if response.status_code != 200 or response.direct_passthrough or response.is_streamed \
+            or 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE_TYPES \
+            or (response.content_length or 0) < config.get('COMPRESS_MIN_SIZE', 1024):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    brotli = _brotli() if request.accept_encodings['br'] else None
+    if brotli is not None:
+        encoding = 'br'
+        data = brotli.compress(response.get_data(), quality=config.get('COMPRESS_BROTLI_QUALITY', 5))
+    elif request.accept_encodings['gzip']:
+        encoding = 'gzip'
+        data = gzip.compress(response.get_data(), compresslevel=config.get('COMPRESS_LEVEL', 6))
+    else:
+        return response
+
+    if len(data) < response.content_length:
+        response.set_data(data)
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def init_http_cache(app):
+    """
+    Installe les réponses conditionnelles (ETag / 304) et la compression
+
+    Args:
+        app: Application Flask
+    """
+    @app.after_request
+    def finalize_response(response):
+        """Réponse conditionnelle puis compression"""
+        if app.config.get('HTTP_CONDITIONAL_GET', True):
+            response = _conditional_response(response)
+        if app.config.get('COMPRESS_ENABLED', True):
+            response = _compress(response)
+        return response
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shabaka Syndic - Solution complète et digitale pour les syndics et résidents au Maroc.
+
+Shabaka Syndic
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+"""
+
+import hmac
+import logging
+import threading
+import time
+from collections import Counter
+from flask import Response, current_app, g, has_request_context, request, template_rendered, \
+    before_render_template
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from werkzeug.exceptions import NotFound
+
+logger = logging.getLogger(__name__)
+
+
+# Bornes des histogrammes
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+class RequestTimer:
+    """Mesures de la requête en cours (stockées dans flask.g)"""
+
+    __slots__ = ('started', 'queries', 'db_time', 'serialize_time', 'render_time', 'statements')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+        self.render_time = 0.0
+        self.statements = Counter()
+
+
+def current_timer():
+    """Mesures de la requête en cours (None hors requête ou instrumentation désactivée)"""
+    if not has_request_context():
+        return None
+    return g.get('_request_timer')
+
+
+class _Histogram:
+    """Histogramme cumulatif au format Prometheus"""
+
+    __slots__ = ('buckets', 'counts', 'total', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+        self.total += value
+        self.count += 1
+
+
+class _EndpointStats:
+    """Agrégats d'un endpoint"""
+
+    __slots__ = ('requests', 'duration', 'queries', 'db_seconds', 'serialize_seconds',
+                 'render_seconds', 'flagged')
+
+    def __init__(self):
+        self.requests = Counter()  # {(méthode, statut): nombre}
+        self.duration = _Histogram(DURATION_BUCKETS)
+        self.queries = _Histogram(QUERY_BUCKETS)
+        self.db_seconds = 0.0
+        self.serialize_seconds = 0.0
+        self.render_seconds = 0.0
+        self.flagged = 0
+
+
+class MetricsRegistry:
+    """
+    Agrégats par endpoint des requêtes du processus
+
+    Chaque requête mesure le nombre d'instructions SQL exécutées, le temps
+    passé en base, le temps de sérialisation JSON et de rendu des templates
+    et la latence totale. Les mesures sont renvoyées dans l'en-tête
+    Server-Timing (en debug, en test ou avec le jeton METRICS_TOKEN),
+    agrégées ici et exposées au format Prometheus sur /metrics (route
+    enregistrée seulement si METRICS_TOKEN est défini). Une requête qui
+    dépasse METRICS_QUERY_THRESHOLD instructions SQL est journalisée avec
+    les instructions les plus répétées (N+1).
+
+    Les agrégats sont propres au processus : avec plusieurs workers
+    gunicorn, chaque worker expose ses propres compteurs.
+    """
+
+    def __init__(self):
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, method, status, timer, duration, flagged):
+        """Ajoute les mesures d'une requête terminée"""
+        with self._lock:
+            stats = self._endpoints.get(endpoint)
+            if stats is None:
+                stats = self._endpoints[endpoint] = _EndpointStats()
+            stats.requests[(method, str(status))] += 1
+            stats.duration.observe(duration)
+            stats.queries.observe(timer.queries)
+            stats.db_seconds += timer.db_time
+            stats.serialize_seconds += timer.serialize_time
+            stats.render_seconds += timer.render_time
+            if flagged:
+                stats.flagged += 1
+
+    def reset(self):
+        """Remet les agrégats à zéro"""
+        with self._lock:
+            self._endpoints = {}
+
+    def snapshot(self):
+        """
+        Résumé par endpoint (nombre de requêtes, moyennes)
+
+        Returns:
+            dict: {endpoint: {'requests', 'avg_ms', 'avg_queries', 'avg_db_ms', ...}}
+        """
+        with self._lock:
+            result = {}
+            for endpoint, stats in self._endpoints.items():
+                count = stats.duration.count or 1
+                result[endpoint] = {
+                    'requests': stats.duration.count,
+                    'avg_ms': round(stats.duration.total / count * 1000, 2),
+                    'avg_queries': round(stats.queries.total / count, 2),
+                    'avg_db_ms': round(stats.db_seconds / count * 1000, 2),
+                    'avg_serialize_ms': round(stats.serialize_seconds / count * 1000, 2),
+                    'flagged': stats.flagged
+                }
+            return result
+
+    def render(self):
+        """Agrégats au format texte Prometheus"""
+        lines = []
+
+        def header(name, kind, description):
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} {kind}')
+
+        def histogram(name, endpoint, histogram):
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                lines.append(f'{name}_bucket{{endpoint="{endpoint}",le="{bound}"}} {count}')
+            lines.append(f'{name}_bucket{{endpoint="{endpoint}",le="+Inf"}} {histogram.count}')
+            lines.append(f'{name}_sum{{endpoint="{endpoint}"}} {histogram.total:.6f}')
+            lines.append(f'{name}_count{{endpoint="{endpoint}"}} {histogram.count}')
+
+        with self._lock:
+            endpoints = sorted(self._endpoints.items())
+
+            header('mysindic_http_requests_total', 'counter', 'Requêtes HTTP par endpoint, méthode et statut')
+            for endpoint, stats in endpoints:
+                for (method, status), count in sorted(stats.requests.items()):
+                    lines.append(f'mysindic_http_requests_total{{endpoint="{endpoint}",method="{method}",'
+                                 f'status="{status}"}} {count}')
+
+            header('mysindic_http_request_duration_seconds', 'histogram', 'Latence totale des requêtes')
+            for endpoint, stats in endpoints:
+                histogram('mysindic_http_request_duration_seconds', endpoint, stats.duration)
+
+            header('mysindic_db_queries_per_request', 'histogram', 'Instructions SQL par requête')
+            for endpoint, stats in endpoints:
+                histogram('mysindic_db_queries_per_request', endpoint, stats.queries)
+
+            for name, attribute, description in (
+                ('mysindic_db_seconds_total', 'db_seconds', 'Temps passé en base'),
+                ('mysindic_serialize_seconds_total', 'serialize_seconds', 'Temps de sérialisation JSON'),
+                ('mysindic_render_seconds_total', 'render_seconds', 'Temps de rendu des templates'),
+                ('mysindic_query_threshold_exceeded_total', 'flagged',
+                 'Requêtes au-delà de METRICS_QUERY_THRESHOLD instructions SQL'),
+            ):
+                header(name, 'counter', description)
+                for endpoint, stats in endpoints:
+                    value = getattr(stats, attribute)
+                    value = f'{value:.6f}' if isinstance(value, float) else value
+                    lines.append(f'{name}{{endpoint="{endpoint}"}} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_timer() is not None:
+        conn.info.setdefault('_metrics_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    timer = current_timer()
+    started = conn.info.get('_metrics_started')
+    if timer is None or not started:
+        return
+    timer.db_time += time.perf_counter() - started.pop()
+    timer.queries += 1
+    timer.statements[statement[:200]] += 1
+
+
+@event.listens_for(Engine, 'handle_error')
+def _handle_error(context):
+    started = context.connection.info.get('_metrics_started') if context.connection is not None else None
+    if started:
+        started.pop()
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Sérialiseur JSON de Flask qui mesure le temps d'encodage"""
+
+    def dumps(self, obj, **kwargs):
+        timer = current_timer()
+        if timer is None:
+            return super().dumps(obj, **kwargs)
+        started = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            timer.serialize_time += time.perf_counter() - started
+
+
+def _render_started(sender, template, context, **extra):
+    timer = current_timer()
+    if timer is not None:
+        g._render_started = time.perf_counter()
+
+
+def _render_finished(sender, template, context, **extra):
+    timer = current_timer()
+    started = g.pop('_render_started', None)
+    if timer is not None and started is not None:
+        timer.render_time += time.perf_counter() - started
+
+
+def _start_timer():
+    g._request_timer = RequestTimer()
+
+
+def _finish_timer(response):
+    timer = g.pop('_request_timer', None)
+    if timer is None:
+        return response
+    config = current_app.config
+    duration = time.perf_counter() - timer.started
+
+    threshold = config.get('METRICS_QUERY_THRESHOLD', 0)
+    flagged = bool(threshold) and timer.queries > threshold
+    if flagged:
+        repeated = ', '.join(f'{count}× « {statement[:80]} »'
+                             for statement, count in timer.statements.most_common(3) if count > 1)
+        logger.warning('%s %s : %d instructions SQL (%.1f ms en base)%s',
+                       request.method, request.path, timer.queries, timer.db_time * 1000,
+                       f' ; répétées : {repeated}' if repeated else '')
+
+    endpoint = request.url_rule.endpoint if request.url_rule is not None else 'unmatched'
+    if endpoint != 'metrics':
+        registry.record(endpoint, request.method, response.status_code, timer, duration, flagged)
+
+    # Temps internes réservés au développement et aux clients munis du jeton
+    if config.get('METRICS_SERVER_TIMING', True) and (current_app.debug or current_app.testing
+                                                      or _token_provided()):
+        response.headers.add('Server-Timing', ', '.join((
+            f'db;dur={timer.db_time * 1000:.1f};desc="{timer.queries} SQL"',
+            f'serialize;dur={timer.serialize_time * 1000:.1f}',
+            f'render;dur={timer.render_time * 1000:.1f}',
+            f'app;dur={duration * 1000:.1f}',
+        )))
+    return response
+
+
+def _token_provided():
+    """Indique si la requête présente le jeton METRICS_TOKEN (Authorization: Bearer)"""
+    token = current_app.config.get('METRICS_TOKEN')
+    if not token:
+        return False
+    provided = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+    return hmac.compare_digest(provided.encode('utf-8'), token.encode('utf-8'))
+
+
+def metrics_endpoint():
+    """Agrégats du processus au format Prometheus (jeton METRICS_TOKEN requis)"""
+    if not current_app.config.get('METRICS_TOKEN'):
+        raise NotFound()
+    if not _token_provided():
+        return Response('Accès refusé\n', status=401, mimetype='text/plain')
+    return Response(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def init_metrics(app):
+    """
+    Installe l'instrumentation sur l'application (si METRICS_ENABLED)
+
+    Args:
+        app: Application Flask
+    """
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+
+    app.json = TimedJSONProvider(app)
+    app.before_request(_start_timer)
+    app.after_request(_finish_timer)
+    before_render_template.connect(_render_started, app)
+    template_rendered.connect(_render_finished, app)
+    if app.config.get('METRICS_TOKEN'):
+        app.add_url_rule('/metrics', 'metrics', metrics_endpoint)
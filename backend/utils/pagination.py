@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shabaka Syndic - Pagination par curseur (keyset) et filtres SQL
+
+Les routes de liste paginent sur leur clé de tri (ex: created_at, id)
+au lieu d'un OFFSET : le coût d'une page reste constant quelle que soit
+la taille de la table. Le curseur renvoyé (next_cursor) encode les
+valeurs de tri du dernier élément de la page.
+"""
+
+import base64
+import json
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from flask import current_app, request
+from sqlalchemy import and_, func, literal, or_
+from sqlalchemy.orm import QueryableAttribute
+
+
+class PaginationError(ValueError):
+    """Paramètre de pagination ou de filtre invalide (erreur 400)"""
+
+
+def _encode_value(value):
+    """Encode une valeur de tri en type JSON étiqueté"""
+    if isinstance(value, datetime):
+        return ['dt', value.isoformat()]
+    if isinstance(value, date):
+        return ['d', value.isoformat()]
+    if isinstance(value, Decimal):
+        return ['dec', str(value)]
+    return ['v', value]
+
+
+def _decode_value(item):
+    """Décode une valeur de tri étiquetée"""
+    tag, value = item
+    if tag == 'dt':
+        return datetime.fromisoformat(value)
+    if tag == 'd':
+        return date.fromisoformat(value)
+    if tag == 'dec':
+        return Decimal(value)
+    return value
+
+
+def encode_cursor(values):
+    """
+    Encode les valeurs de tri d'un élément en curseur opaque
+
+    Args:
+        values: Liste des valeurs des colonnes de tri
+
+    Returns:
+        str: Curseur encodé en base64 (URL-safe)
+    """
+    payload = json.dumps([_encode_value(v) for v in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor, expected_length):
+    """
+    Décode un curseur produit par encode_cursor()
+
+    Raises:
+        PaginationError: Si le curseur est invalide
+    """
+    try:
+        payload = base64.urlsafe_b64decode(cursor.encode('ascii'))
+        values = [_decode_value(item) for item in json.loads(payload)]
+    except (ValueError, TypeError, json.JSONDecodeError):
+        raise PaginationError('Curseur de pagination invalide')
+    if len(values) != expected_length:
+        raise PaginationError('Curseur de pagination invalide')
+    return values
+
+
+def get_pagination_args():
+    """
+    Lit les paramètres limit et cursor de la requête
+
+    Sans limit, la page contient ITEMS_PER_PAGE éléments : une liste
+    n'est jamais renvoyée en entier (le client suit next_cursor).
+
+    Returns:
+        tuple: (limit, cursor ou None)
+    """
+    limit = request.args.get('limit')
+    cursor = request.args.get('cursor') or None
+
+    if limit is None:
+        limit = current_app.config.get('ITEMS_PER_PAGE', 20)
+    else:
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise PaginationError('Le paramètre limit doit être un entier')
+
+    max_limit = current_app.config.get('MAX_ITEMS_PER_PAGE', 100)
+    return max(1, min(limit, max_limit)), cursor
+
+
+def _parse_date_arg(name):
+    """Parse un paramètre de date ISO (YYYY-MM-DD ou datetime complet)"""
+    raw = request.args.get(name)
+    if not raw:
+        return None, False
+    try:
+        return datetime.fromisoformat(raw), len(raw) == 10
+    except ValueError:
+        raise PaginationError(f'Le paramètre {name} doit être une date ISO')
+
+
+def apply_filters(query, date_column=None, **columns):
+    """
+    Applique les filtres de la requête HTTP directement en SQL
+
+    Args:
+        query: Requête SQLAlchemy à filtrer
+        date_column: Colonne filtrée par date_from / date_to (incluses)
+        **columns: Filtres d'égalité {nom_du_paramètre: colonne}
+
+    Returns:
+        Query: Requête filtrée
+    """
+    for arg_name, column in columns.items():
+        value = request.args.get(arg_name)
+        if value not in (None, ''):
+            query = query.filter(column == value)
+
+    if date_column is not None:
+        date_from, _ = _parse_date_arg('date_from')
+        if date_from:
+            query = query.filter(date_column >= date_from)
+
+        date_to, date_only = _parse_date_arg('date_to')
+        if date_to:
+            # Une date seule inclut toute la journée
+            if date_only:
+                query = query.filter(date_column < date_to + timedelta(days=1))
+            else:
+                query = query.filter(date_column <= date_to)
+
+    return query
+
+
+def _sort_expression(column, fallback):
+    """Colonne de tri, remplacée par fallback (colonne ou constante) lorsqu'elle est NULL"""
+    if fallback is None:
+        return column
+    if not isinstance(fallback, QueryableAttribute):
+        fallback = literal(fallback, type_=column.type)
+    return func.coalesce(column, fallback)
+
+
+def _sort_value(item, column, fallback):
+    """Valeur de tri d'un élément, telle que comparée par _sort_expression()"""
+    value = getattr(item, column.key)
+    if value is None and fallback is not None:
+        return getattr(item, fallback.key) if isinstance(fallback, QueryableAttribute) else fallback
+    return value
+
+
+def _keyset_condition(sort, values):
+    """Construit la condition « après le curseur » pour un tri multi-colonnes"""
+    # Valeurs liées explicitement pour autoriser < / > sur les booléens
+    bound = [literal(value, type_=expression.type) for (expression, _), value in zip(sort, values)]
+    conditions = []
+    for index, (expression, descending) in enumerate(sort):
+        previous_equal = [sort[i][0] == bound[i] for i in range(index)]
+        after = expression < bound[index] if descending else expression > bound[index]
+        conditions.append(and_(*previous_equal, after))
+    return or_(*conditions)
+
+
+def paginate(query, order_by, limit=None, cursor=None):
+    """
+    Trie et pagine une requête par curseur
+
+    La dernière colonne de tri doit être unique (généralement la clé
+    primaire) pour garantir un ordre total. Une colonne nullable est
+    accompagnée d'une valeur de remplacement (colonne ou constante),
+    appliquée par COALESCE au tri comme à la condition du curseur : un
+    NULL ne se compare à rien et ferait disparaître des éléments.
+
+    Args:
+        query: Requête SQLAlchemy
+        order_by: Liste de tuples (colonne, décroissant[, remplacement si NULL])
+        limit: Taille de page (None = pas de pagination)
+        cursor: Curseur renvoyé par la page précédente
+
+    Returns:
+        tuple: (éléments, next_cursor ou None)
+    """
+    columns = [(entry[0], entry[2] if len(entry) > 2 else None) for entry in order_by]
+    sort = [(_sort_expression(column, fallback), entry[1])
+            for (column, fallback), entry in zip(columns, order_by)]
+
+    if cursor:
+        values = decode_cursor(cursor, len(sort))
+        query = query.filter(_keyset_condition(sort, values))
+
+    query = query.order_by(*[
+        expression.desc() if descending else expression.asc()
+        for expression, descending in sort
+    ])
+
+    if limit is None:
+        return query.all(), None
+
+    # Charger un élément de plus pour savoir s'il existe une page suivante
+    items = query.limit(limit + 1).all()
+    if len(items) <= limit:
+        return items, None
+
+    items = items[:limit]
+    last = items[-1]
+    next_cursor = encode_cursor([_sort_value(last, column, fallback) for column, fallback in columns])
+    return items, next_cursor
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shabaka Syndic - Sérialisation groupée des modèles
+
+Évite les requêtes N+1 lors de la conversion de listes en JSON :
+les relations many-to-one utilisées par les to_dict() (auteur, résidence,
+utilisateur assigné...) sont préchargées en un nombre fixe de requêtes
+(une requête IN par modèle cible) avant la sérialisation.
+"""
+
+from sqlalchemy.orm.attributes import set_committed_value
+
+from backend.models import db
+
+
+# Registre des relations à précharger par modèle :
+# {Modèle: [(nom_relation, nom_colonne_fk, 'NomModeleCible'), ...]}
+_PREFETCH_REGISTRY = {}
+
+
+def register_prefetch(model, *relations):
+    """
+    Déclare les relations many-to-one à précharger pour un modèle
+
+    Args:
+        model: Classe du modèle SQLAlchemy
+        relations: Tuples (relation, colonne FK, nom du modèle cible)
+    """
+    _PREFETCH_REGISTRY.setdefault(model, []).extend(relations)
+
+
+def _resolve_model(name):
+    """Retrouve une classe de modèle à partir de son nom"""
+    for mapper in db.Model.registry.mappers:
+        if mapper.class_.__name__ == name:
+            return mapper.class_
+    raise ValueError(f"Modèle inconnu: {name}")
+
+
+def prefetch_related(model, rows):
+    """
+    Précharge les relations déclarées pour une liste d'objets
+
+    Les identifiants sont regroupés par modèle cible : l'auteur et
+    l'utilisateur assigné d'une demande de maintenance sont par exemple
+    chargés par une seule requête sur la table users.
+
+    Args:
+        model: Classe du modèle des objets
+        rows: Liste d'objets déjà chargés
+
+    Returns:
+        dict: Objets chargés par modèle cible ({Modèle: {id: objet}})
+    """
+    relations = _PREFETCH_REGISTRY.get(model)
+    if not rows or not relations:
+        return {}
+
+    # Regrouper les identifiants à charger par modèle cible
+    ids_by_target = {}
+    for _, fk_name, target_name in relations:
+        ids = ids_by_target.setdefault(target_name, set())
+        for row in rows:
+            fk_value = getattr(row, fk_name)
+            if fk_value is not None:
+                ids.add(fk_value)
+
+    # Une requête IN par modèle cible
+    loaded = {}
+    for target_name, ids in ids_by_target.items():
+        target = _resolve_model(target_name)
+        loaded[target_name] = {
+            obj.id: obj for obj in target.query.filter(target.id.in_(ids)).all()
+        } if ids else {}
+
+    # Renseigner les relations sans déclencher de chargement paresseux
+    for row in rows:
+        for relation_name, fk_name, target_name in relations:
+            fk_value = getattr(row, fk_name)
+            related = loaded[target_name].get(fk_value) if fk_value is not None else None
+            set_committed_value(row, relation_name, related)
+
+    return loaded
+
+
+def serialize_many(model, rows, **kwargs):
+    """
+    Sérialise une liste d'objets en préchargeant leurs relations
+
+    Args:
+        model: Classe du modèle des objets
+        rows: Liste d'objets à sérialiser
+        **kwargs: Arguments transmis à to_dict()
+
+    Returns:
+        list: Liste de dictionnaires
+    """
+    rows = list(rows)
+    prefetch_related(model, rows)
+    return [row.to_dict(**kwargs) for row in rows]
+
+
+def _register_defaults():
+    """Enregistre les relations utilisées par les to_dict() des modèles"""
+    from backend.models.maintenance import MaintenanceRequest
+    from backend.models.maintenance_comment import MaintenanceComment
+    from backend.models.maintenance_document import MaintenanceDocument
+    from backend.models.news import News
+    from backend.models.charge import ChargeDistribution
+
+    register_prefetch(
+        MaintenanceRequest,
+        ('author', 'author_id', 'User'),
+        ('assigned_user', 'assigned_user_id', 'User'),
+        ('residence', 'residence_id', 'Residence'),
+    )
+    register_prefetch(
+        News,
+        ('author', 'author_id', 'User'),
+        ('residence', 'residence_id', 'Residence'),
+    )
+    register_prefetch(
+        MaintenanceComment,
+        ('author', 'author_id', 'User'),
+        ('mentioned_user', 'mentioned_user_id', 'User'),
+    )
+    register_prefetch(
+        MaintenanceDocument,
+        ('uploader', 'uploaded_by', 'User'),
+    )
+    register_prefetch(
+        ChargeDistribution,
+        ('charge', 'charge_id', 'Charge'),
+    )
+
+
+_register_defaults()
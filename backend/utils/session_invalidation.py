@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shabaka Syndic - Invalidation de caches à la validation des transactions
+
+Les caches en mémoire (statistiques du tableau de bord, décomptes des
+sondages...) déclarent les modèles dont ils dépendent : les objets ORM
+ajoutés, modifiés ou supprimés sont relevés avant chaque flush et le cache
+est invalidé après le commit (rien n'est invalidé si la transaction est
+annulée). Les écritures Core (insert / update groupés) ne passent pas par
+le flush : elles signalent leurs changements avec la fonction renvoyée par
+register_session_invalidation().
+"""
+
+from sqlalchemy import event
+from backend.models import db
+
+
+def register_session_invalidation(models, callback, keys=None):
+    """
+    Invalide un cache après le commit des écritures sur des modèles
+
+    Args:
+        models: Modèles surveillés (tuple de classes)
+        callback: Fonction d'invalidation, appelée avec l'ensemble des clés
+            modifiées ou None (tout invalider)
+        keys: Fonction objet -> clés du cache touchées (itérable), ou None
+            si elles ne peuvent être déterminées ; sans fonction, toute
+            écriture invalide tout le cache
+
+    Returns:
+        function: mark_changed(keys=None), à appeler après une écriture Core
+            sur ces modèles dans la session courante
+    """
+    slot = f'invalidation:{callback.__module__}.{callback.__qualname__}'
+
+    def record(session, changed):
+        """Ajoute des clés (None = tout) aux changements en attente de la session"""
+        pending = session.info.get(slot, set())
+        if changed is None or pending is None:
+            session.info[slot] = None
+        else:
+            session.info[slot] = pending | set(changed)
+
+    @event.listens_for(db.session, 'before_flush')
+    def collect_changes(session, flush_context, instances):
+        """Mémorise les clés modifiées jusqu'au commit"""
+        changed = set()
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+            if not isinstance(obj, models):
+                continue
+            obj_keys = keys(obj) if keys is not None else None
+            if obj_keys is None:
+                record(session, None)
+                return
+            changed.update(obj_keys)
+        if changed:
+            record(session, changed)
+
+    @event.listens_for(db.session, 'after_commit')
+    def invalidate(session):
+        """Invalide le cache après validation des écritures"""
+        if slot in session.info:
+            callback(session.info.pop(slot))
+
+    @event.listens_for(db.session, 'after_rollback')
+    def discard_changes(session):
+        session.info.pop(slot, None)
+
+    def mark_changed(changed=None):
+        """
+        Signale une écriture Core : le cache sera invalidé au prochain commit
+
+        Args:
+            changed: Clés modifiées (None = tout le cache)
+        """
+        record(db.session(), changed)
+
+    return mark_changed
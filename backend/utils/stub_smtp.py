@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shabaka Syndic - Serveur SMTP factice pour le développement et les tests
+
+Accepte toutes les connexions et conserve les messages reçus en mémoire
+(aucun envoi réel). Utilisable dans un test :
+
+    server = StubSMTPServer(port=0).start()
+    app.config.update(MAIL_BACKEND='smtp', MAIL_SERVER=server.host,
+                      MAIL_PORT=server.port, MAIL_USE_TLS=False)
+    ...
+    server.messages  # [(expéditeur, [destinataires], données)]
+    server.stop()
+
+ou en ligne de commande (affiche les messages reçus) :
+
+    python -m backend.utils.stub_smtp --port 1025
+"""
+
+import argparse
+import socketserver
+import threading
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """Implémente le sous-ensemble de SMTP utilisé par smtplib"""
+    
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode('utf-8'))
+    
+    def handle(self):
+        server = self.server
+        mail_from, recipients = None, []
+        self.reply('220 stub-smtp ready')
+        
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('utf-8', 'replace').strip()
+            verb = command.split(' ', 1)[0].upper()
+            
+            if verb == 'EHLO':
+                self.reply('250-stub-smtp')
+                self.reply('250 8BITMIME')
+            elif verb == 'HELO':
+                self.reply('250 stub-smtp')
+            elif verb == 'MAIL':
+                mail_from, recipients = command[10:].strip().strip('<>'), []
+                self.reply('250 OK')
+            elif verb == 'RCPT':
+                recipient = command[8:].strip().strip('<>')
+                if recipient in server.refused_recipients:
+                    self.reply('550 Mailbox unavailable')
+                else:
+                    recipients.append(recipient)
+                    self.reply('250 OK')
+            elif verb == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                lines = []
+                while True:
+                    data_line = self.rfile.readline()
+                    if not data_line or data_line in (b'.\r\n', b'.\n'):
+                        break
+                    lines.append(data_line[1:] if data_line.startswith(b'..') else data_line)
+                with server.lock:
+                    server.messages.append((mail_from, recipients, b''.join(lines).decode('utf-8', 'replace')))
+                if server.verbose:
+                    print(f"📧 {mail_from} -> {', '.join(recipients)}")
+                self.reply('250 OK')
+            elif verb in ('RSET', 'NOOP'):
+                mail_from, recipients = (None, []) if verb == 'RSET' else (mail_from, recipients)
+                self.reply('250 OK')
+            elif verb == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+
+class StubSMTPServer(socketserver.ThreadingTCPServer):
+    """Serveur SMTP factice exécuté dans un thread"""
+    
+    daemon_threads = True
+    allow_reuse_address = True
+    
+    def __init__(self, host='127.0.0.1', port=1025, verbose=False):
+        super().__init__((host, port), _SMTPHandler)
+        self.verbose = verbose
+        self.messages = []
+        self.refused_recipients = set()
+        self.lock = threading.Lock()
+        self._thread = None
+    
+    @property
+    def host(self):
+        return self.server_address[0]
+    
+    @property
+    def port(self):
+        return self.server_address[1]
+    
+    def start(self):
+        """Démarre le serveur en arrière-plan"""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        """Arrête le serveur"""
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serveur SMTP factice')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=1025)
+    args = parser.parse_args()
+    
+    server = StubSMTPServer(args.host, args.port, verbose=True)
+    print(f"🚀 Serveur SMTP factice sur {server.host}:{server.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shabaka Syndic - Benchmark des principales routes de l'API
+
+Charge les données de démonstration (init_demo_data) puis un jeu de données
+synthétiques (benchmarks.synthetic_data), appelle les routes principales
+des espaces administration et résident avec le client de test Flask et
+relève pour chacune les latences p50 / p95 et le nombre d'instructions SQL
+(lu dans l'en-tête Server-Timing).
+
+Usage:
+    python -m benchmarks.bench_api_routes [--residences 3] [--units 200] [--residents 150]
+                                          [--years 2] [--iterations 20] [--database-url URL]
+                                          [--save FICHIER] [--baseline FICHIER] [--tolerance 0.25]
+
+Sans --database-url, une base SQLite en mémoire est utilisée ; une base
+PostgreSQL locale (vidée puis recréée) reproduit la production.
+--save enregistre les résultats en JSON ; --baseline compare à un
+enregistrement précédent et renvoie le code de sortie 1 si une route émet
+plus d'instructions SQL ou si son p95 dépasse la référence de plus de
+--tolerance (et de 5 ms).
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import re
+import sys
+import time
+
+
+# Routes mesurées : (espace, nom, URL ; {residence_id} et {charge_id} sont remplacés)
+ROUTES = (
+    ('superadmin', 'admin.dashboard', '/api/admin/dashboard'),
+    ('superadmin', 'admin.residences', '/api/admin/residences'),
+    ('superadmin', 'admin.units', '/api/admin/residences/{residence_id}/units'),
+    ('superadmin', 'admin.charges', '/api/admin/charges?residence_id={residence_id}'),
+    ('superadmin', 'admin.payment_status', '/api/admin/charges/{charge_id}/payment-status'),
+    ('superadmin', 'admin.payment_registry', '/api/admin/payment-registry?residence_id={residence_id}'),
+    ('superadmin', 'admin.payments', '/api/admin/payments'),
+    ('superadmin', 'admin.maintenance', '/api/admin/maintenance'),
+    ('superadmin', 'admin.users', '/api/admin/users'),
+    ('superadmin', 'admin.users_stats', '/api/admin/users/stats'),
+    ('admin', 'syndic.dashboard', '/api/admin/dashboard'),
+    ('admin', 'syndic.maintenance', '/api/admin/maintenance'),
+    ('admin', 'syndic.news', '/api/admin/news'),
+    ('resident', 'resident.dashboard', '/api/resident/dashboard'),
+    ('resident', 'resident.charges', '/api/resident/charges'),
+    ('resident', 'resident.charges_unpaid', '/api/resident/charges/unpaid'),
+    ('resident', 'resident.balance', '/api/resident/balance'),
+    ('resident', 'resident.payments', '/api/resident/payments'),
+    ('resident', 'resident.maintenance', '/api/resident/maintenance'),
+    ('resident', 'resident.news', '/api/resident/news'),
+)
+
+_SQL_COUNT = re.compile(r'db;dur=[\d.]+;desc="(\d+) SQL"')
+
+
+def percentile(values, fraction):
+    """Percentile par rang le plus proche"""
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, round(fraction * len(ordered)) - 1))]
+
+
+def load_app(database_url, residences, units, residents, years, seed):
+    """Crée l'application de test sur la base cible et la peuple"""
+    os.environ['FLASK_ENV'] = 'testing'
+    if database_url:
+        os.environ['TEST_DATABASE_URL'] = database_url
+
+    # L'import initialise déjà la base (données de démonstration) : sortie masquée
+    with contextlib.redirect_stdout(io.StringIO()):
+        from backend.app import app
+        from backend.init_demo_data import init_demo_data
+        from backend.models import db
+        from benchmarks.synthetic_data import generate
+
+        app.config['METRICS_ENABLED'] = True
+        app.config['METRICS_SERVER_TIMING'] = True
+        app.config['METRICS_QUERY_THRESHOLD'] = 0
+        with app.app_context():
+            db.drop_all()
+            init_demo_data(app, db)
+            start = time.perf_counter()
+            summary = generate(residences, units, residents, years, seed)
+    return app, summary, time.perf_counter() - start
+
+
+def login(app, email, password):
+    """Client de test connecté"""
+    client = app.test_client()
+    response = client.post('/api/auth/login', json={'email': email, 'password': password})
+    if response.status_code != 200:
+        raise RuntimeError(f'Connexion impossible pour {email}: HTTP {response.status_code}')
+    return client
+
+
+def measure(client, url, iterations):
+    """Appelle une URL iterations fois (après un appel de chauffe) ; renvoie (durées en ms, requêtes SQL)"""
+    durations, queries = [], 0
+    for index in range(iterations + 1):
+        start = time.perf_counter()
+        response = client.get(url)
+        response.get_data()
+        elapsed = (time.perf_counter() - start) * 1000
+        if response.status_code != 200:
+            raise RuntimeError(f'{url}: HTTP {response.status_code}')
+        if index:
+            durations.append(elapsed)
+            match = _SQL_COUNT.search(response.headers.get('Server-Timing', ''))
+            queries = max(queries, int(match.group(1))) if match else queries
+    return durations, queries
+
+
+def compare(results, baseline, tolerance):
+    """Liste des régressions par rapport à une référence"""
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        if result['queries'] > reference['queries']:
+            regressions.append(f"{name}: {reference['queries']} → {result['queries']} requêtes SQL")
+        limit = reference['p95_ms'] * (1 + tolerance) + 5
+        if result['p95_ms'] > limit:
+            regressions.append(f"{name}: p95 {reference['p95_ms']:.1f} → {result['p95_ms']:.1f} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--residences', type=int, default=3)
+    parser.add_argument('--units', type=int, default=200, help='Lots par résidence')
+    parser.add_argument('--residents', type=int, default=150, help='Résidents par résidence')
+    parser.add_argument('--years', type=int, default=2, help="Années d'historique")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--iterations', type=int, default=20, help='Appels mesurés par route')
+    parser.add_argument('--database-url', help='Base de données cible (vidée puis recréée)')
+    parser.add_argument('--save', help='Enregistre les résultats (JSON)')
+    parser.add_argument('--baseline', help='Résultats de référence (JSON) à comparer')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Dégradation du p95 tolérée (0.25 = 25 %%)')
+    args = parser.parse_args()
+
+    from benchmarks.synthetic_data import BENCH_PASSWORD
+
+    app, summary, seed_seconds = load_app(args.database_url, args.residences, args.units,
+                                          args.residents, args.years, args.seed)
+    print(f"📦 {summary['units']} lots, {summary['distributions']} répartitions, {summary['payments']} paiements, "
+          f"{summary['maintenance']} demandes générés en {seed_seconds:.1f} s "
+          f"({app.config['SQLALCHEMY_DATABASE_URI'].split(':')[0]})\n")
+
+    residence = summary['residences'][0]
+    params = {'residence_id': residence['id'], 'charge_id': residence['charge_ids'][-1]}
+    clients = {
+        'superadmin': login(app, 'admin@mysindic.ma', 'Admin123!'),
+        'admin': login(app, residence['admin_email'], BENCH_PASSWORD),
+        'resident': login(app, residence['resident_email'], BENCH_PASSWORD),
+    }
+
+    print(f"{'route':<26} | {'p50 (ms)':>9} | {'p95 (ms)':>9} | {'requêtes':>8}")
+    print('-' * 62)
+    results = {}
+    for role, name, url in ROUTES:
+        durations, queries = measure(clients[role], url.format(**params), args.iterations)
+        results[name] = {'p50_ms': round(percentile(durations, 0.5), 2),
+                         'p95_ms': round(percentile(durations, 0.95), 2), 'queries': queries}
+        print(f"{name:<26} | {results[name]['p50_ms']:>9.1f} | {results[name]['p95_ms']:>9.1f} | {queries:>8}")
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as output:
+            json.dump({'parameters': vars(args), 'routes': results}, output, indent=2, ensure_ascii=False)
+        print(f"\n💾 Résultats enregistrés dans {args.save}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as source:
+            baseline = json.load(source)['routes']
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print('\n❌ Régressions :')
+            for regression in regressions:
+                print(f'   {regression}')
+            sys.exit(1)
+        print('\n✅ Aucune régression par rapport à la référence')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shabaka Syndic - Benchmark du moteur de quorum et de majorités pondérés
+
+Simule une AG de 2 000 lots (un copropriétaire par lot, tantièmes
+variables) : émargement de la salle, procurations, votes de tous les
+présents puis clôture. Mesure la latence et le nombre de requêtes de
+chaque étape incrémentale, les compare à une reconstruction complète
+(AssemblyEngine.rebuild) et vérifie que les deux donnent les mêmes totaux.
+
+Usage:
+    python -m benchmarks.bench_assembly_engine [--lots 2000] [--proxies 200]
+                                               [--database-url URL]
+
+Code de sortie 1 si les totaux incrémentaux diffèrent de la reconstruction.
+"""
+
+import argparse
+import random
+import sys
+import time
+from datetime import datetime
+
+from sqlalchemy import event
+
+from backend.models import db
+from benchmarks.bench_charge_distribution import create_benchmark_app
+
+
+VALUES = ('for', 'against', 'abstain')
+
+
+def seed_assembly(lot_count):
+    """Crée une résidence de lot_count lots et copropriétaires ; renvoie (assembly_id, owner_ids)"""
+    from backend.models.residence import Residence, Unit
+    from backend.models.user import User
+    from backend.models.general_assembly import GeneralAssembly
+
+    rng = random.Random(42)
+    residence = Residence(name=f'AG {lot_count}', address='1 rue du Test',
+                          city='Casablanca', total_units=lot_count)
+    db.session.add(residence)
+    db.session.flush()
+
+    db.session.execute(db.insert(Unit), [
+        {'residence_id': residence.id, 'unit_number': f'U{i:05d}', 'tantiemes': rng.randint(20, 120)}
+        for i in range(lot_count)
+    ])
+    unit_ids = [row.id for row in db.session.query(Unit.id)
+                .filter(Unit.residence_id == residence.id).order_by(Unit.id)]
+
+    db.session.execute(db.insert(User), [
+        {'email': f'copro{i}@bench.test', 'password_hash': '-', 'first_name': 'Copro',
+         'last_name': str(i), 'role': 'owner', 'residence_id': residence.id, 'unit_id': unit_id}
+        for i, unit_id in enumerate(unit_ids)
+    ])
+    owner_ids = [row.id for row in db.session.query(User.id)
+                 .filter(User.residence_id == residence.id).order_by(User.id)]
+
+    assembly = GeneralAssembly(residence_id=residence.id, title='AG benchmark',
+                               assembly_type='ordinaire', scheduled_date=datetime.utcnow(),
+                               created_by=owner_ids[0])
+    db.session.add(assembly)
+    db.session.commit()
+    return assembly.id, owner_ids
+
+
+class Probe:
+    """Mesure la durée et le nombre de requêtes SQL d'un bloc"""
+
+    def __init__(self):
+        self.queries = 0
+        self.elapsed = 0.0
+
+    def _count(self, *args):
+        self.queries += 1
+
+    def __enter__(self):
+        event.listen(db.engine, 'before_cursor_execute', self._count)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = (time.perf_counter() - self._start) * 1000
+        event.remove(db.engine, 'before_cursor_execute', self._count)
+
+
+def snapshot(assembly, resolutions):
+    """Totaux pondérés courants de l'AG et des résolutions"""
+    db.session.expire_all()
+    totals = {
+        'assembly': (assembly.present_count, assembly.present_weight, assembly.quorum_reached)
+    }
+    for resolution in resolutions:
+        totals[resolution.id] = (resolution.votes_for, resolution.votes_against, resolution.votes_abstain,
+                                 resolution.weight_for, resolution.weight_against,
+                                 resolution.weight_abstain, resolution.voices_for)
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--lots', type=int, default=2000, help='Nombre de lots (un copropriétaire par lot)')
+    parser.add_argument('--proxies', type=int, default=200,
+                        help='Copropriétaires absents représentés (10 par mandataire)')
+    parser.add_argument('--database-url', default='sqlite:///:memory:',
+                        help='Base de données cible (vidée puis recréée)')
+    args = parser.parse_args()
+
+    app = create_benchmark_app(args.database_url)
+    with app.app_context():
+        from backend.models.general_assembly import GeneralAssembly, Resolution
+        from backend.services.assembly_engine import AssemblyEngine
+        from backend.services.attendance_service import AttendanceService
+        from backend.services.resolution_votes import ResolutionVoteService
+
+        db.drop_all()
+        db.create_all()
+        assembly_id, owner_ids = seed_assembly(args.lots)
+        assembly = db.session.get(GeneralAssembly, assembly_id)
+
+        resolutions = []
+        for vote_type in ('simple', 'absolue', 'double_majorite'):
+            resolution = Resolution(assembly_id=assembly_id, title=f'Résolution {vote_type}', vote_type=vote_type)
+            db.session.add(resolution)
+            resolutions.append(resolution)
+        db.session.commit()
+
+        represented = owner_ids[:args.proxies]
+        present = owner_ids[args.proxies:]
+        proxy_holders = present[:max(1, args.proxies // 10)]
+        rows = []
+
+        # Ouverture : copropriétaires et tantièmes figés
+        with Probe() as probe:
+            AssemblyEngine.rebuild(assembly)
+            db.session.commit()
+        rows.append(('Ouverture (reconstruction)', 1, probe))
+
+        # Émargement de toute la salle en une opération
+        with Probe() as probe:
+            AttendanceService.mark(assembly, present, marked_by=owner_ids[0])
+            db.session.commit()
+        rows.append(('Émargement des présents', 1, probe))
+
+        # Procurations : 10 mandants par mandataire
+        with Probe() as probe:
+            for index, holder in enumerate(proxy_holders):
+                AttendanceService.mark(assembly, represented[index * 10:(index + 1) * 10],
+                                       represented_by=holder, marked_by=owner_ids[0])
+                db.session.commit()
+        rows.append(('Procurations', len(proxy_holders), probe))
+
+        # Votes de tous les présents sur chaque résolution
+        rng = random.Random(7)
+        ballots = [(resolution.id, user_id, rng.choice(VALUES) if rng.random() < 0.4 else 'for')
+                   for resolution in resolutions for user_id in present]
+        with Probe() as probe:
+            for resolution_id, user_id, value in ballots:
+                ResolutionVoteService.record_vote(resolution_id, user_id, value, assembly_id)
+                db.session.commit()
+        rows.append(('Votes', len(ballots), probe))
+
+        # Procuration modifiée après les votes (ajuste les bulletins déjà déposés)
+        with Probe() as probe:
+            AttendanceService.mark(assembly, represented[:10], represented_by=proxy_holders[-1],
+                                   marked_by=owner_ids[0])
+            db.session.commit()
+        rows.append(('Changement de procuration', 1, probe))
+
+        # Lecture du quorum (totaux tenus à jour)
+        db.session.expire_all()
+        with Probe() as probe:
+            quorum = AssemblyEngine.quorum(assembly)
+        rows.append(('Lecture du quorum', 1, probe))
+
+        with Probe() as probe:
+            results = [AssemblyEngine.decide(resolution, assembly) for resolution in resolutions]
+        rows.append(('Décision des résolutions', len(resolutions), probe))
+
+        incremental = snapshot(assembly, resolutions)
+        with Probe() as probe:
+            AssemblyEngine.rebuild(assembly)
+            db.session.flush()
+        rows.append(('Reconstruction complète', 1, probe))
+        rebuilt = snapshot(assembly, resolutions)
+        db.session.rollback()
+
+        print(f'AG de {args.lots} lots, {len(present)} présents, {len(represented)} représentés '
+              f'(base: {db.engine.dialect.name})')
+        print(f"{'étape':<30} | {'opérations':>10} | {'total (ms)':>10} | {'ms/op':>8} | {'requêtes/op':>11}")
+        print('-' * 82)
+        for label, operations, probe in rows:
+            print(f'{label:<30} | {operations:>10} | {probe.elapsed:>10.1f} | '
+                  f'{probe.elapsed / operations:>8.2f} | {probe.queries / operations:>11.1f}')
+
+        print()
+        print(f"Quorum : {quorum['present_weight']}/{quorum['eligible_weight']} tantièmes "
+              f"({quorum['percentage']}%), atteint : {quorum['reached']}")
+        for resolution, result in zip(resolutions, results):
+            print(f"{resolution.vote_type:<16} pour {result['weight_for']:>7} / contre {result['weight_against']:>7}"
+                  f" -> {'adoptée' if result['approved'] else 'rejetée'}")
+
+        ok = incremental == rebuilt
+        print('Totaux incrémentaux identiques à la reconstruction : ' + ('OK' if ok else 'ÉCHEC'))
+        if not ok:
+            for key in incremental:
+                if incremental[key] != rebuilt[key]:
+                    print(f'  {key}: incrémental {incremental[key]} != reconstruit {rebuilt[key]}')
+
+        db.drop_all()
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
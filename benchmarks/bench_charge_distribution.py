@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shabaka Syndic - Benchmark de la répartition des charges
+
+Mesure la latence de ChargeCalculator.calculate_distribution() et le
+nombre de requêtes SQL émises en fonction du nombre de lots de la
+résidence (premier calcul puis recalcul d'une charge déjà répartie).
+
+Usage:
+    python -m benchmarks.bench_charge_distribution [--units 10,100,1000,5000]
+                                                   [--database-url URL]
+"""
+
+import argparse
+import time
+from decimal import Decimal
+
+from flask import Flask
+from sqlalchemy import event
+
+from backend.config import TestingConfig
+from backend.models import db, init_db
+
+
+def create_benchmark_app(database_url):
+    """Crée une application minimale (sans données de démonstration)"""
+    app = Flask(__name__)
+    app.config.from_object(TestingConfig)
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+    init_db(app)
+    return app
+
+
+def seed_residence(unit_count):
+    """Crée une résidence avec unit_count lots et une charge à répartir"""
+    from backend.models.residence import Residence, Unit
+    from backend.models.charge import Charge
+
+    residence = Residence(name=f'Bench {unit_count}', address='1 rue du Test',
+                          city='Casablanca', total_units=unit_count)
+    db.session.add(residence)
+    db.session.flush()
+
+    db.session.execute(db.insert(Unit), [
+        {'residence_id': residence.id, 'unit_number': f'U{i:05d}'}
+        for i in range(unit_count)
+    ])
+
+    charge = Charge(residence_id=residence.id, title='Charges benchmark',
+                    charge_type='monthly', total_amount=Decimal('100000.00'),
+                    period_year=2025)
+    db.session.add(charge)
+    db.session.commit()
+    return charge.id
+
+
+def measure(charge_id):
+    """Exécute une répartition et renvoie (durée en ms, nombre de requêtes)"""
+    from backend.services.charge_calculator import ChargeCalculator
+
+    statements = []
+
+    def count(*args):
+        statements.append(1)
+
+    event.listen(db.engine, 'before_cursor_execute', count)
+    try:
+        start = time.perf_counter()
+        ChargeCalculator.calculate_distribution(charge_id)
+        db.session.commit()
+        elapsed = (time.perf_counter() - start) * 1000
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', count)
+    return elapsed, len(statements)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--units', default='10,100,1000,5000',
+                        help='Nombres de lots à tester, séparés par des virgules')
+    parser.add_argument('--database-url', default='sqlite:///:memory:',
+                        help='Base de données cible (vidée puis recréée)')
+    args = parser.parse_args()
+
+    app = create_benchmark_app(args.database_url)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        print(f"{'lots':>8} | {'publication (ms)':>17} | {'requêtes':>8} | {'recalcul (ms)':>14} | {'requêtes':>8}")
+        print('-' * 68)
+        for unit_count in [int(n) for n in args.units.split(',')]:
+            charge_id = seed_residence(unit_count)
+            first_ms, first_queries = measure(charge_id)
+            again_ms, again_queries = measure(charge_id)
+            print(f'{unit_count:>8} | {first_ms:>17.1f} | {first_queries:>8} | {again_ms:>14.1f} | {again_queries:>8}')
+
+        db.drop_all()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shabaka Syndic - Benchmark du rapport de statut des paiements d'une charge
+
+Appelle GET /api/admin/charges/<id>/payment-status (JSON et CSV) pour des
+résidences de tailles croissantes et vérifie que le nombre de requêtes SQL
+reste constant quel que soit le nombre de lots (code de sortie 1 sinon).
+
+Usage:
+    python -m benchmarks.bench_payment_status [--units 10,100,600,2000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault('FLASK_ENV', 'testing')
+
+from sqlalchemy import event
+
+from backend.app import app
+from backend.models import db
+from benchmarks.bench_charge_distribution import seed_residence
+
+
+def seed_charge(unit_count):
+    """Crée une résidence, répartit et publie sa charge, puis ajoute des paiements validés"""
+    from backend.models.charge import Charge
+    from backend.models.payment import Payment
+    from backend.models.residence import Unit
+    from backend.models.user import User
+    from backend.services.charge_calculator import ChargeCalculator
+
+    charge_id = seed_residence(unit_count)
+    ChargeCalculator.calculate_distribution(charge_id)
+    charge = db.session.get(Charge, charge_id)
+    charge.status = 'published'
+
+    user_id = User.query.filter_by(role='superadmin').first().id
+    unit_ids = [row.id for row in db.session.query(Unit.id).filter_by(residence_id=charge.residence_id)]
+    db.session.execute(db.insert(Payment), [
+        {'unit_id': unit_id, 'user_id': user_id, 'amount': random.randint(10, 200),
+         'payment_date': datetime.utcnow() + timedelta(minutes=1), 'status': 'validated'}
+        for unit_id in unit_ids if random.random() < 0.7
+    ])
+    db.session.commit()
+    return charge_id
+
+
+def measure(client, url):
+    """Appelle une URL et renvoie (durée en ms, nombre de requêtes SQL)"""
+    statements = []
+
+    def count(*args):
+        statements.append(1)
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', count)
+    try:
+        start = time.perf_counter()
+        response = client.get(url)
+        response.get_data()
+        elapsed = (time.perf_counter() - start) * 1000
+    finally:
+        with app.app_context():
+            event.remove(db.engine, 'before_cursor_execute', count)
+    if response.status_code != 200:
+        raise RuntimeError(f'{url}: HTTP {response.status_code}')
+    return elapsed, len(statements)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--units', default='10,100,600,2000',
+                        help='Nombres de lots à tester, séparés par des virgules')
+    args = parser.parse_args()
+
+    client = app.test_client()
+    client.post('/api/auth/login', json={'email': 'admin@mysindic.ma', 'password': 'Admin123!'})
+
+    print(f"{'lots':>8} | {'JSON (ms)':>10} | {'requêtes':>8} | {'CSV (ms)':>9} | {'requêtes':>8}")
+    print('-' * 56)
+    counts = set()
+    for unit_count in [int(n) for n in args.units.split(',')]:
+        with app.app_context():
+            charge_id = seed_charge(unit_count)
+        url = f'/api/admin/charges/{charge_id}/payment-status'
+        json_ms, json_queries = measure(client, url)
+        csv_ms, csv_queries = measure(client, url + '?format=csv')
+        counts.add((json_queries, csv_queries))
+        print(f'{unit_count:>8} | {json_ms:>10.1f} | {json_queries:>8} | {csv_ms:>9.1f} | {csv_queries:>8}')
+
+    if len(counts) != 1:
+        print('❌ Le nombre de requêtes varie avec le nombre de lots')
+        sys.exit(1)
+    print('✅ Nombre de requêtes constant')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shabaka Syndic - Débit du serveur de développement et de gunicorn
+
+Démarre successivement `python main.py` (serveur Werkzeug) et
+`gunicorn -c gunicorn.conf.py main:app`, envoie pendant --duration
+secondes des requêtes depuis --concurrency clients HTTP/1.1 (connexions
+persistantes) et compare le débit, les latences p50 / p95 et les erreurs.
+
+Usage:
+    python -m benchmarks.bench_wsgi_throughput [--duration 10] [--concurrency 16]
+                                               [--paths /health,/api/info,/login]
+                                               [--database-url URL] [--port 5099]
+
+Les variables GUNICORN_* / WEB_CONCURRENCY de l'environnement s'appliquent
+à gunicorn ; le direct des AG est désactivé (LIVE_EVENTS_BROKER=none) sauf
+si la variable est définie. Sans --database-url, une base SQLite temporaire est créée.
+Le générateur de charge tourne sur la même machine : sur un petit nombre
+de cœurs, il limite lui-même le débit mesuré.
+"""
+
+import argparse
+import http.client
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVERS = {
+    'werkzeug': [sys.executable, 'main.py'],
+    'gunicorn': [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'main:app'],
+}
+
+
+def start_server(command, env, port, timeout=60):
+    """Démarre un serveur et attend qu'il réponde sur /health"""
+    process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL,
+                               stderr=subprocess.DEVNULL, start_new_session=True)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{' '.join(command)} s'est arrêté (code {process.returncode})")
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            connection.request('GET', '/health')
+            if connection.getresponse().status == 200:
+                connection.close()
+                return process
+        except OSError:
+            time.sleep(0.2)
+    stop_server(process)
+    raise RuntimeError(f"{' '.join(command)} ne répond pas après {timeout} s")
+
+
+def stop_server(process):
+    """Arrêt progressif (SIGTERM) ; renvoie la durée d'arrêt en secondes"""
+    start = time.monotonic()
+    os.killpg(process.pid, signal.SIGTERM)
+    try:
+        process.wait(timeout=60)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+    return time.monotonic() - start
+
+
+def client(port, paths, stop, results):
+    """Boucle d'un client : requêtes successives sur une connexion persistante"""
+    latencies, errors = [], 0
+    connection = None
+    index = 0
+    while not stop.is_set():
+        path = paths[index % len(paths)]
+        index += 1
+        try:
+            if connection is None:
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            start = time.perf_counter()
+            connection.request('GET', path)
+            response = connection.getresponse()
+            response.read()
+            latencies.append(time.perf_counter() - start)
+            if response.status >= 400:
+                errors += 1
+            if response.will_close:
+                connection.close()
+                connection = None
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            if connection is not None:
+                connection.close()
+            connection = None
+    if connection is not None:
+        connection.close()
+    results.append((latencies, errors))
+
+
+def run_load(port, paths, concurrency, duration):
+    """Envoie la charge ; renvoie (requêtes/s, p50 ms, p95 ms, erreurs)"""
+    stop = threading.Event()
+    results = []
+    threads = [threading.Thread(target=client, args=(port, paths, stop, results)) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for thread_latencies, _ in results for latency in thread_latencies)
+    errors = sum(thread_errors for _, thread_errors in results)
+    if not latencies:
+        return 0.0, 0.0, 0.0, errors
+
+    def percentile(fraction):
+        return latencies[max(0, min(len(latencies) - 1, round(fraction * len(latencies)) - 1))] * 1000
+
+    return len(latencies) / elapsed, percentile(0.5), percentile(0.95), errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--duration', type=float, default=10, help='Durée de la charge par serveur (s)')
+    parser.add_argument('--concurrency', type=int, default=16, help='Clients simultanés')
+    parser.add_argument('--paths', default='/health,/api/info,/login', help='URL appelées à tour de rôle')
+    parser.add_argument('--servers', default='werkzeug,gunicorn', help='Serveurs à comparer')
+    parser.add_argument('--database-url', help='Base de données (initialisée avec les données de démonstration)')
+    parser.add_argument('--port', type=int, default=5099)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='mysindic-wsgi-')
+    env = dict(os.environ, FLASK_ENV='production', PORT=str(args.port),
+               SECRET_KEY=os.getenv('SECRET_KEY', 'benchmark'),
+               DATABASE_URL=args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+               GUNICORN_ACCESS_LOG=os.getenv('GUNICORN_ACCESS_LOG', '/dev/null'),
+               LIVE_EVENTS_BROKER=os.getenv('LIVE_EVENTS_BROKER', 'none'))
+    paths = args.paths.split(',')
+
+    print(f"{'serveur':<10} | {'req/s':>8} | {'p50 (ms)':>9} | {'p95 (ms)':>9} | {'erreurs':>7} | {'arrêt (s)':>9}")
+    print('-' * 67)
+    for name in args.servers.split(','):
+        process = start_server(SERVERS[name], env, args.port)
+        try:
+            throughput, p50, p95, errors = run_load(args.port, paths, args.concurrency, args.duration)
+        finally:
+            shutdown = stop_server(process)
+        print(f'{name:<10} | {throughput:>8.0f} | {p50:>9.1f} | {p95:>9.1f} | {errors:>7} | {shutdown:>9.1f}')
+
+
+if __name__ == '__main__':
+    main()
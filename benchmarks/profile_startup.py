@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shabaka Syndic - Profil de démarrage à froid
+
+Lance --runs interpréteurs neufs (`python -X importtime`) qui importent
+l'application (comme un worker gunicorn) puis servent une première
+requête, et mesure : le temps d'import des modules, la création de
+l'application (create_app et vérification de la base, temps propre de
+backend.app), la première requête et le temps total jusqu'à la première
+réponse depuis le lancement du processus. Les paquets et modules les plus
+coûteux à l'import sont ensuite classés.
+
+Usage:
+    python -m benchmarks.profile_startup [--runs 5] [--top 15] [--path /health]
+                                         [--budget-ms 1200] [--database-url URL]
+
+--budget-ms fixe un plafond pour le temps d'import médian (modules,
+hors création de l'application) : code de sortie 1 s'il est dépassé,
+par exemple lorsqu'une dépendance lourde est importée au chargement.
+Sans --database-url, une base SQLite temporaire est créée et initialisée
+avant les mesures (démarrage sur une base existante).
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Exécuté dans un interpréteur neuf : les durées sont mesurées par phase
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+from backend.app import app
+loaded = time.perf_counter()
+response = app.test_client().get(sys.argv[1])
+print(json.dumps({'load': loaded - start, 'first_request': time.perf_counter() - loaded,
+                  'status': response.status_code}))
+"""
+
+
+def run_child(env, path):
+    """
+    Démarre un interpréteur et sert une requête
+
+    Returns:
+        tuple: (mesures en s, {module: temps propre d'import en µs})
+    """
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', CHILD, path],
+                            cwd=ROOT, env=env, capture_output=True, text=True)
+    total = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr else 'échec')
+    measures = json.loads(result.stdout.strip().splitlines()[-1])
+    if measures['status'] >= 400:
+        raise RuntimeError(f"{path}: HTTP {measures['status']}")
+
+    modules = parse_importtime(result.stderr)
+    create_app = modules.get('backend.app', 0) / 1e6
+    measures.update(imports=measures['load'] - create_app, create_app=create_app, total=total)
+    return measures, modules
+
+
+def parse_importtime(output):
+    """Lit la sortie de -X importtime ; renvoie {module: temps propre en µs}"""
+    modules = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = int(self_us)
+    return modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15, help='Nombre de paquets et modules listés')
+    parser.add_argument('--path', default='/health', help='URL de la première requête')
+    parser.add_argument('--budget-ms', type=float, help="Temps d'import médian maximal (ms)")
+    parser.add_argument('--database-url', help='Base de données (initialisée si vide)')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='mysindic-startup-')
+    env = dict(os.environ, FLASK_ENV='production', SECRET_KEY=os.getenv('SECRET_KEY', 'benchmark'),
+               DATABASE_URL=args.database_url or f"sqlite:///{os.path.join(workdir, 'startup.db')}",
+               MAIL_WORKERS='0', IMAGE_WORKERS='0')
+
+    # Premier passage : initialisation de la base et compilation du bytecode
+    run_child(env, args.path)
+
+    runs = [run_child(env, args.path) for _ in range(args.runs)]
+    phases = {name: [measures[name] for measures, _ in runs]
+              for name in ('imports', 'create_app', 'first_request', 'total')}
+
+    labels = {'imports': 'Import des modules', 'create_app': "Création de l'application",
+              'first_request': 'Première requête', 'total': 'Lancement → première réponse'}
+    print(f"📊 Démarrage à froid ({args.runs} passages, médiane / min / max en ms)\n")
+    for name, values in phases.items():
+        print(f'{labels[name]:<30} {statistics.median(values) * 1000:>8.1f} {min(values) * 1000:>8.1f} '
+              f'{max(values) * 1000:>8.1f}')
+
+    modules = runs[-1][1]
+    packages = defaultdict(int)
+    for name, self_us in modules.items():
+        packages[name.split('.')[0]] += self_us
+
+    print(f"\n📦 Paquets les plus coûteux à l'import (temps propre cumulé, ms)\n")
+    for name, self_us in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+        print(f'{name:<40} {self_us / 1000:>8.1f}')
+
+    print(f"\n📄 Modules les plus coûteux (temps propre, ms)\n")
+    for name, self_us in sorted(modules.items(), key=lambda item: -item[1])[:args.top]:
+        print(f'{name:<60} {self_us / 1000:>8.1f}')
+
+    if args.budget_ms is not None:
+        imports_ms = statistics.median(phases['imports']) * 1000
+        if imports_ms > args.budget_ms:
+            print(f"\n❌ Temps d'import {imports_ms:.0f} ms au-delà du budget de {args.budget_ms:.0f} ms")
+            sys.exit(1)
+        print(f"\n✅ Temps d'import {imports_ms:.0f} ms dans le budget de {args.budget_ms:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shabaka Syndic - Test de charge des votes de résolution
+
+Lance des centaines de votes en parallèle (premiers votes, changements de
+vote et doubles soumissions d'un même votant) sur une même résolution,
+puis vérifie que les compteurs de la résolution correspondent exactement
+aux votes attendus et au contenu de la table votes.
+
+Usage:
+    python -m benchmarks.stress_resolution_votes [--voters 300] [--threads 32]
+                                                 [--changes 100]
+                                                 [--database-url URL]
+
+Sans --database-url, une base SQLite temporaire sur disque est utilisée
+(les écritures y sont sérialisées) ; une base PostgreSQL locale teste la
+concurrence réelle. Code de sortie 1 si un décompte est faux.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from sqlalchemy.exc import OperationalError
+
+from backend.models import db
+from benchmarks.bench_charge_distribution import create_benchmark_app
+
+
+VALUES = ('for', 'against', 'abstain')
+
+
+def seed_resolution(voter_count):
+    """Crée une AG, une résolution et voter_count votants ; renvoie (resolution_id, user_ids)"""
+    from backend.models.residence import Residence
+    from backend.models.user import User
+    from backend.models.general_assembly import GeneralAssembly, Resolution
+
+    residence = Residence(name='Stress votes', address='1 rue du Test',
+                          city='Casablanca', total_units=voter_count)
+    db.session.add(residence)
+    db.session.flush()
+
+    db.session.execute(db.insert(User), [
+        {'email': f'votant{i}@stress.test', 'password_hash': '-', 'first_name': 'Votant',
+         'last_name': str(i), 'role': 'owner', 'residence_id': residence.id}
+        for i in range(voter_count)
+    ])
+    user_ids = [row.id for row in db.session.query(User.id)
+                .filter(User.residence_id == residence.id).order_by(User.id)]
+
+    assembly = GeneralAssembly(residence_id=residence.id, title='AG stress',
+                               assembly_type='ordinaire', scheduled_date=datetime.utcnow(),
+                               status='in_progress', created_by=user_ids[0])
+    db.session.add(assembly)
+    db.session.flush()
+
+    resolution = Resolution(assembly_id=assembly.id, title='Résolution stress')
+    db.session.add(resolution)
+    db.session.commit()
+    return resolution.id, user_ids
+
+
+def cast_vote(app, resolution_id, user_id, vote_value, retries=20):
+    """Enregistre un vote dans sa propre session (comme une requête HTTP)"""
+    from backend.services.resolution_votes import ResolutionVoteService
+
+    with app.app_context():
+        for attempt in range(retries):
+            try:
+                ResolutionVoteService.record_vote(resolution_id, user_id, vote_value)
+                db.session.commit()
+                return
+            except OperationalError:
+                # SQLite : base verrouillée par un autre écrivain
+                db.session.rollback()
+                time.sleep(0.01 * (attempt + 1))
+        raise RuntimeError(f'Vote du votant {user_id} non enregistré')
+
+
+def run_parallel(app, threads, resolution_id, ballots):
+    """Soumet les bulletins [(user_id, valeur), ...] en parallèle"""
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        futures = [pool.submit(cast_vote, app, resolution_id, user_id, value)
+                   for user_id, value in ballots]
+        for future in futures:
+            future.result()
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--voters', type=int, default=300, help='Nombre de votants')
+    parser.add_argument('--threads', type=int, default=32, help='Votes simultanés')
+    parser.add_argument('--changes', type=int, default=100,
+                        help='Votants qui changent leur vote en deuxième phase')
+    parser.add_argument('--database-url', default=None,
+                        help='Base de données cible (vidée puis recréée)')
+    args = parser.parse_args()
+
+    temp_path = None
+    database_url = args.database_url
+    if database_url is None:
+        handle, temp_path = tempfile.mkstemp(suffix='.db')
+        os.close(handle)
+        database_url = f'sqlite:///{temp_path}'
+
+    app = create_benchmark_app(database_url)
+    try:
+        with app.app_context():
+            from backend.models.general_assembly import Resolution
+            from backend.services.resolution_votes import ResolutionVoteService
+
+            db.drop_all()
+            db.create_all()
+            resolution_id, user_ids = seed_resolution(args.voters)
+
+            expected = {user_id: VALUES[i % 3] for i, user_id in enumerate(user_ids)}
+
+            # Phase 1 : premiers votes, chaque votant soumet deux fois son bulletin
+            ballots = [(user_id, value) for user_id, value in expected.items()] * 2
+            first_ms = run_parallel(app, args.threads, resolution_id, ballots)
+
+            # Phase 2 : changements de vote, soumis en double eux aussi
+            changed = {}
+            for user_id in user_ids[:args.changes]:
+                changed[user_id] = VALUES[(VALUES.index(expected[user_id]) + 1) % 3]
+            expected.update(changed)
+            second_ms = run_parallel(app, args.threads, resolution_id, list(changed.items()) * 2)
+
+            db.session.expire_all()
+            resolution = db.session.get(Resolution, resolution_id)
+            counters = {value: getattr(resolution, f'votes_{value}') for value in VALUES}
+            stored = ResolutionVoteService.count_votes(resolution_id)
+            wanted = {value: sum(1 for v in expected.values() if v == value) for value in VALUES}
+
+            print(f'Base: {db.engine.dialect.name} | votants: {args.voters} | threads: {args.threads}')
+            print(f'Phase 1 ({len(user_ids) * 2} bulletins): {first_ms:.0f} ms')
+            print(f'Phase 2 ({len(changed) * 2} bulletins): {second_ms:.0f} ms')
+            print(f"{'':>10} | {'attendu':>8} | {'compteur':>8} | {'table':>8}")
+            for value in VALUES:
+                print(f'{value:>10} | {wanted[value]:>8} | {counters[value]:>8} | {stored[value]:>8}')
+
+            ok = counters == wanted == stored
+            print('OK' if ok else 'ÉCHEC : décomptes incohérents')
+            db.drop_all()
+    finally:
+        if temp_path:
+            os.remove(temp_path)
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shabaka Syndic - Test de charge des numéros de suivi de maintenance
+
+Crée des centaines de demandes de maintenance en parallèle, réparties sur
+plusieurs résidences, puis vérifie que les numéros de suivi sont uniques
+et consécutifs (1..N sans trou) pour chaque résidence, et que le compteur
+correspond au nombre de demandes créées.
+
+Usage:
+    python -m benchmarks.stress_tracking_numbers [--requests 400] [--residences 3]
+                                                 [--threads 32] [--database-url URL]
+
+Sans --database-url, une base SQLite temporaire sur disque est utilisée
+(les écritures y sont sérialisées) ; une base PostgreSQL locale teste la
+concurrence réelle. Code de sortie 1 en cas de doublon ou de trou.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from sqlalchemy.exc import OperationalError
+
+from backend.models import db
+from benchmarks.bench_charge_distribution import create_benchmark_app
+
+
+def seed_residences(residence_count):
+    """Crée les résidences et un auteur par résidence ; renvoie {residence_id: author_id}"""
+    from backend.models.residence import Residence
+    from backend.models.user import User
+
+    authors = {}
+    for i in range(residence_count):
+        residence = Residence(name=f'Stress suivi {i}', address='1 rue du Test', city='Casablanca',
+                              total_units=1)
+        db.session.add(residence)
+        db.session.flush()
+        author = User(email=f'auteur{i}@stress.test', password_hash='-', first_name='Auteur',
+                      last_name=str(i), role='resident', residence_id=residence.id)
+        db.session.add(author)
+        db.session.flush()
+        authors[residence.id] = author.id
+    db.session.commit()
+    return authors
+
+
+def create_request(app, residence_id, author_id, retries=50):
+    """Crée une demande dans sa propre session (comme une requête HTTP)"""
+    from backend.models.maintenance import MaintenanceRequest
+
+    with app.app_context():
+        for attempt in range(retries):
+            try:
+                db.session.add(MaintenanceRequest(
+                    tracking_number=MaintenanceRequest.generate_tracking_number(residence_id),
+                    residence_id=residence_id,
+                    author_id=author_id,
+                    zone='autre',
+                    title='Demande stress',
+                    description='Créée en parallèle'
+                ))
+                db.session.commit()
+                return
+            except OperationalError:
+                # SQLite : base verrouillée par un autre écrivain
+                db.session.rollback()
+                time.sleep(0.01 * (attempt + 1))
+        raise RuntimeError(f'Demande de la résidence {residence_id} non créée')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=400, help='Nombre de demandes créées')
+    parser.add_argument('--residences', type=int, default=3, help='Nombre de résidences')
+    parser.add_argument('--threads', type=int, default=32, help='Créations simultanées')
+    parser.add_argument('--database-url', default=None,
+                        help='Base de données cible (vidée puis recréée)')
+    args = parser.parse_args()
+
+    temp_path = None
+    database_url = args.database_url
+    if database_url is None:
+        handle, temp_path = tempfile.mkstemp(suffix='.db')
+        os.close(handle)
+        database_url = f'sqlite:///{temp_path}'
+
+    app = create_benchmark_app(database_url)
+    try:
+        with app.app_context():
+            from backend.models.maintenance import MaintenanceRequest
+            from backend.models.tracking_counter import TrackingCounter
+
+            db.drop_all()
+            db.create_all()
+            authors = seed_residences(args.residences)
+            residence_ids = list(authors)
+            jobs = [residence_ids[i % len(residence_ids)] for i in range(args.requests)]
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.threads) as pool:
+                futures = [pool.submit(create_request, app, residence_id, authors[residence_id])
+                           for residence_id in jobs]
+                for future in futures:
+                    future.result()
+            elapsed = (time.perf_counter() - start) * 1000
+
+            db.session.expire_all()
+            year = datetime.utcnow().year
+            numbers = [row for row in db.session.query(MaintenanceRequest.residence_id,
+                                                       MaintenanceRequest.tracking_number)]
+            duplicates = [number for number, total in Counter(n for _, n in numbers).items() if total > 1]
+
+            print(f'Base: {db.engine.dialect.name} | demandes: {args.requests} | threads: {args.threads}')
+            print(f'Création: {elapsed:.0f} ms ({elapsed / args.requests:.2f} ms/demande)')
+            print(f"{'résidence':>10} | {'attendu':>8} | {'créées':>8} | {'compteur':>8} | {'séquence':>8}")
+
+            ok = not duplicates
+            expected = Counter(jobs)
+            for residence_id in residence_ids:
+                sequences = sorted(int(number.rsplit('-', 1)[1])
+                                   for rid, number in numbers if rid == residence_id)
+                counter = db.session.get(TrackingCounter, (residence_id, year))
+                last_value = counter.last_value if counter else 0
+                dense = sequences == list(range(1, expected[residence_id] + 1))
+                ok = ok and dense and last_value == expected[residence_id]
+                print(f'{residence_id:>10} | {expected[residence_id]:>8} | {len(sequences):>8} | '
+                      f"{last_value:>8} | {'dense' if dense else 'TROUS':>8}")
+
+            if duplicates:
+                print(f'Doublons: {duplicates[:10]}')
+            print('OK' if ok else 'ÉCHEC : numéros de suivi incohérents')
+            db.drop_all()
+    finally:
+        if temp_path:
+            os.remove(temp_path)
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shabaka Syndic - Générateur de données synthétiques
+
+Peuple la base avec des résidences de taille réaliste : lots, résidents,
+administrateurs, charges mensuelles publiées et réparties, paiements,
+demandes de maintenance et actualités sur plusieurs années. Les lignes
+sont insérées par lots (executemany) et les soldes reconstruits à la fin
+par LedgerService. Le générateur est déterministe pour une graine donnée.
+
+Usage:
+    python -m benchmarks.synthetic_data [--residences 5] [--units 200] [--residents 150]
+                                        [--years 3] [--seed 42] [--database-url URL] [--reset]
+
+Les comptes créés ont pour mot de passe Bench123! :
+admin.r<résidence>@bench.test et resident.r<résidence>.<n>@bench.test.
+"""
+
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from werkzeug.security import generate_password_hash
+
+from backend.models import db
+
+BENCH_PASSWORD = 'Bench123!'
+
+# Nombre de lignes par INSERT multiple
+CHUNK_SIZE = 5000
+
+ZONES = ('appartement', 'escalier', 'ascenseur', 'parking', 'jardin', 'toiture', 'facade', 'autre')
+PRIORITIES = ('low', 'medium', 'medium', 'high', 'urgent')
+UNIT_TYPES = ('F2', 'F3', 'F3', 'F4', 'Commerce')
+PAYMENT_METHODS = ('virement', 'cheque', 'especes', 'carte')
+
+
+def bulk_insert(model, rows):
+    """Insère des lignes par paquets de CHUNK_SIZE"""
+    for start in range(0, len(rows), CHUNK_SIZE):
+        db.session.execute(db.insert(model), rows[start:start + CHUNK_SIZE])
+
+
+def generate(residences=5, units=200, residents=150, years=3, seed=42, today=None):
+    """
+    Génère un jeu de données synthétiques (contexte d'application requis)
+
+    Args:
+        residences: Nombre de résidences
+        units: Lots par résidence
+        residents: Résidents par résidence (un par lot, au plus units)
+        years: Années d'historique (charges, paiements, maintenance), année courante comprise
+        seed: Graine du générateur aléatoire
+        today: Date de référence (par défaut maintenant)
+
+    Returns:
+        dict: Nombre de lignes créées par table et identifiants utiles aux benchmarks
+    """
+    from backend.models.charge import Charge, ChargeDistribution
+    from backend.models.maintenance import MaintenanceRequest
+    from backend.models.news import News
+    from backend.models.payment import Payment
+    from backend.models.residence import Residence, Unit
+    from backend.models.residence_admin import ResidenceAdmin
+    from backend.models.tracking_counter import TrackingCounter
+    from backend.models.user import User
+    from backend.services.ledger_service import LedgerService
+
+    rng = random.Random(seed)
+    today = today or datetime.utcnow()
+    residents = min(residents, units)
+    # Un seul hachage : pbkdf2 coûte plusieurs dizaines de ms par appel
+    password_hash = generate_password_hash(BENCH_PASSWORD)
+    first_year = today.year - years + 1
+
+    summary = {'residences': [], 'units': 0, 'users': 0, 'charges': 0, 'distributions': 0,
+               'payments': 0, 'maintenance': 0, 'news': 0}
+
+    for r in range(residences):
+        residence = Residence(name=f'Résidence Bench {r}', address=f'{r + 1} boulevard du Benchmark',
+                              city=rng.choice(('Casablanca', 'Rabat', 'Marrakech', 'Tanger')),
+                              postal_code='20000', total_units=units, syndic_name='Shabaka Syndic')
+        db.session.add(residence)
+        db.session.flush()
+        residence_id = residence.id
+
+        # Lots
+        bulk_insert(Unit, [
+            {'residence_id': residence_id, 'unit_number': f'{chr(65 + i // 100 % 26)}{i % 100:03d}',
+             'floor': i % 10, 'building': f'Bâtiment {chr(65 + i // 100 % 26)}',
+             'unit_type': rng.choice(UNIT_TYPES), 'surface_area': round(rng.uniform(45, 160), 1),
+             'tantiemes': rng.randint(50, 200), 'owner_name': f'Propriétaire {r}-{i}',
+             'owner_email': f'lot.r{r}.{i}@bench.test', 'is_occupied': True}
+            for i in range(units)
+        ])
+        unit_ids = list(db.session.execute(
+            db.select(Unit.id).where(Unit.residence_id == residence_id).order_by(Unit.id)
+        ).scalars())
+
+        # Administrateur de résidence et résidents (un par lot)
+        admin = User(email=f'admin.r{r}@bench.test', password_hash=password_hash, first_name='Admin',
+                     last_name=f'Bench {r}', role='admin', is_active=True, email_verified=True,
+                     residence_id=residence_id)
+        db.session.add(admin)
+        db.session.flush()
+        db.session.add(ResidenceAdmin(residence_id=residence_id, user_id=admin.id))
+        bulk_insert(User, [
+            {'email': f'resident.r{r}.{i}@bench.test', 'password_hash': password_hash,
+             'first_name': 'Résident', 'last_name': f'{r}-{i}', 'role': 'owner' if i % 3 else 'resident',
+             'is_active': True, 'email_verified': True, 'residence_id': residence_id,
+             'unit_id': unit_ids[i]}
+            for i in range(residents)
+        ])
+        resident_ids = list(db.session.execute(
+            db.select(User.id).where(User.residence_id == residence_id, User.role.in_(('owner', 'resident')))
+            .order_by(User.id)
+        ).scalars())
+        payer_by_unit = dict(zip(unit_ids, resident_ids))
+
+        # Charges mensuelles publiées, réparties à parts égales
+        periods = [(year, month) for year in range(first_year, today.year + 1) for month in range(1, 13)
+                   if (year, month) <= (today.year, today.month)]
+        bulk_insert(Charge, [
+            {'residence_id': residence_id, 'title': f'Charges {month:02d}/{year}', 'charge_type': 'monthly',
+             'total_amount': Decimal(units * 500), 'period_month': month, 'period_year': year,
+             'distribution_method': 'equal', 'status': 'published',
+             'due_date': datetime(year, month, 28)}
+            for year, month in periods
+        ])
+        charges = list(db.session.execute(
+            db.select(Charge.id, Charge.due_date).where(Charge.residence_id == residence_id)
+            .order_by(Charge.id)
+        ))
+
+        # Répartitions et paiements : les mois anciens sont presque tous réglés
+        distributions, payments = [], []
+        for charge_id, due_date in charges:
+            age_days = (today - due_date).days
+            for unit_id in unit_ids:
+                payer_id = payer_by_unit.get(unit_id)
+                paid = payer_id is not None and rng.random() < (0.95 if age_days > 60 else 0.6)
+                paid_date = due_date - timedelta(days=rng.randint(0, 20))
+                distributions.append({'charge_id': charge_id, 'unit_id': unit_id, 'amount': Decimal('500.00'),
+                                      'is_paid': paid, 'paid_date': paid_date if paid else None})
+                if payer_id is None:
+                    continue
+                if paid:
+                    payments.append({'unit_id': unit_id, 'user_id': payer_id, 'amount': Decimal('500.00'),
+                                     'payment_method': rng.choice(PAYMENT_METHODS),
+                                     'reference': f'BENCH-{charge_id}-{unit_id}', 'payment_date': paid_date,
+                                     'status': 'validated'})
+                elif age_days < 60 and rng.random() < 0.3:
+                    payments.append({'unit_id': unit_id, 'user_id': payer_id, 'amount': Decimal('500.00'),
+                                     'payment_method': 'virement', 'reference': f'BENCH-{charge_id}-{unit_id}',
+                                     'payment_date': today - timedelta(days=rng.randint(0, 10)),
+                                     'status': 'pending'})
+        bulk_insert(ChargeDistribution, distributions)
+        bulk_insert(Payment, payments)
+
+        # Demandes de maintenance : environ une par lot et par an
+        requests, counters = [], []
+        for year in range(first_year, today.year + 1):
+            year_end = min(datetime(year, 12, 31), today)
+            count = max(1, units * year_end.timetuple().tm_yday // 366)
+            for sequence in range(1, count + 1):
+                created_at = datetime(year, 1, 1) + timedelta(
+                    seconds=rng.randint(0, int((year_end - datetime(year, 1, 1)).total_seconds())))
+                status = 'completed' if (today - created_at).days > 30 else rng.choice(
+                    ('pending', 'in_progress', 'completed'))
+                requests.append({
+                    'tracking_number': f'MNT-{year}-R{residence_id:03d}-{sequence:04d}',
+                    'request_type': 'resident_request', 'residence_id': residence_id,
+                    'author_id': rng.choice(resident_ids) if resident_ids else admin.id,
+                    'zone': rng.choice(ZONES), 'title': f'Intervention {sequence}',
+                    'description': 'Demande générée pour les benchmarks.', 'priority': rng.choice(PRIORITIES),
+                    'status': status, 'resolved_at': created_at + timedelta(days=3) if status == 'completed' else None,
+                    'created_at': created_at, 'updated_at': created_at
+                })
+            counters.append({'residence_id': residence_id, 'year': year, 'last_value': count})
+        bulk_insert(MaintenanceRequest, requests)
+        bulk_insert(TrackingCounter, counters)
+
+        # Actualités : deux par mois
+        news = [
+            {'residence_id': residence_id, 'title': f'Information {month:02d}/{year} #{n}',
+             'content': 'Actualité générée pour les benchmarks.',
+             'news_type': 'announcement' if n else 'feed', 'category': rng.choice(('info', 'travaux', 'evenement')),
+             'is_published': True, 'published_at': datetime(year, month, 1 + 14 * n), 'author_id': admin.id,
+             'created_at': datetime(year, month, 1 + 14 * n)}
+            for year, month in periods for n in range(2)
+        ]
+        bulk_insert(News, news)
+        db.session.commit()
+
+        summary['residences'].append({'id': residence_id, 'admin_email': admin.email,
+                                      'resident_email': f'resident.r{r}.0@bench.test' if residents else None,
+                                      'charge_ids': [charge_id for charge_id, _ in charges]})
+        summary['units'] += units
+        summary['users'] += residents + 1
+        summary['charges'] += len(charges)
+        summary['distributions'] += len(distributions)
+        summary['payments'] += len(payments)
+        summary['maintenance'] += len(requests)
+        summary['news'] += len(news)
+
+    LedgerService.rebuild()
+    db.session.commit()
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--residences', type=int, default=5)
+    parser.add_argument('--units', type=int, default=200, help='Lots par résidence')
+    parser.add_argument('--residents', type=int, default=150, help='Résidents par résidence')
+    parser.add_argument('--years', type=int, default=3, help="Années d'historique")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--database-url', default='sqlite:///mysindic_bench.db',
+                        help='Base de données cible')
+    parser.add_argument('--reset', action='store_true', help='Vide la base avant de générer')
+    args = parser.parse_args()
+
+    from benchmarks.bench_charge_distribution import create_benchmark_app
+
+    try:
+        app = create_benchmark_app(args.database_url)
+        with app.app_context():
+            if args.reset:
+                db.drop_all()
+            db.create_all()
+            start = time.perf_counter()
+            summary = generate(args.residences, args.units, args.residents, args.years, args.seed)
+            elapsed = time.perf_counter() - start
+
+        print(f"✅ {len(summary['residences'])} résidence(s), {summary['units']} lots, {summary['users']} comptes, "
+              f"{summary['charges']} charges, {summary['distributions']} répartitions, "
+              f"{summary['payments']} paiements, {summary['maintenance']} demandes, "
+              f"{summary['news']} actualités en {elapsed:.1f} s")
+    except Exception as e:
+        print(f"\n❌ Erreur lors de la génération: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
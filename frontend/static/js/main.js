@@ -57,6 +57,28 @@ async function apiRequest(url, options = {}) {
     }
 }
 
+// Les listes de l'API sont paginées par curseur : parcourt toutes les pages
+async function fetchAllPages(url, key, options = {}) {
+    const items = [];
+    let cursor = null;
+    let data;
+    do {
+        const pageUrl = new URL(url, window.location.origin);
+        pageUrl.searchParams.set('limit', 100);
+        if (cursor) pageUrl.searchParams.set('cursor', cursor);
+
+        const response = await fetch(pageUrl, { credentials: 'same-origin', ...options });
+        data = await response.json();
+        if (!data.success) {
+            return data;
+        }
+        items.push(...(data[key] || []));
+        cursor = data.next_cursor;
+    } while (cursor);
+
+    return { ...data, [key]: items, next_cursor: null };
+}
+
 function openModal(modalId) {
     const modal = document.getElementById(modalId);
     if (modal) {
@@ -200,6 +222,7 @@ window.ShabakaSyndic = {
     showToast,
     confirmAction,
     apiRequest,
+    fetchAllPages,
     openModal,
     closeModal,
     toggleDropdown,
@@ -1,66 +1,68 @@
-const CACHE_NAME = 'mysindic-v1';
-const urlsToCache = [
-  '/',
-  '/static/css/main.css',
-  '/static/js/main.js',
-  '/static/manifest.json',
-  'https://cdn.tailwindcss.com'
-];
+// Liste de précache remplacée au service de /sw.js (backend/utils/assets.py) :
+// version = empreinte des fichiers statiques, urls = fichiers à empreinte
+const PRECACHE_MANIFEST = {"version": "dev", "urls": ["/"]};
+const CACHE_PREFIX = 'mysindic-';
+const CACHE_NAME = CACHE_PREFIX + PRECACHE_MANIFEST.version;
 
 self.addEventListener('install', event => {
   event.waitUntil(
     caches.open(CACHE_NAME)
-      .then(cache => {
-        console.log('Opened cache');
-        return cache.addAll(urlsToCache);
-      })
+      .then(cache => cache.addAll(PRECACHE_MANIFEST.urls))
+      .then(() => self.skipWaiting())
+  );
+});
+
+self.addEventListener('activate', event => {
+  // Supprimer les caches des versions précédentes
+  event.waitUntil(
+    caches.keys()
+      .then(cacheNames => Promise.all(
+        cacheNames
+          .filter(cacheName => cacheName.startsWith(CACHE_PREFIX) && cacheName !== CACHE_NAME)
+          .map(cacheName => caches.delete(cacheName))
+      ))
+      .then(() => self.clients.claim())
   );
 });
 
 self.addEventListener('fetch', event => {
-  event.respondWith(
-    caches.match(event.request)
-      .then(response => {
-        if (response) {
-          return response;
+  const request = event.request;
+  if (request.method !== 'GET') {
+    return;
+  }
+
+  const url = new URL(request.url);
+  const sameOrigin = url.origin === self.location.origin;
+
+  // API : toujours le réseau
+  if (sameOrigin && url.pathname.startsWith('/api/')) {
+    return;
+  }
+
+  // Pages : réseau d'abord, page d'accueil en cache hors ligne
+  if (request.mode === 'navigate') {
+    event.respondWith(
+      fetch(request).catch(() => caches.match('/'))
+    );
+    return;
+  }
+
+  // Fichiers statiques : cache d'abord (les URL changent avec le contenu) ; uploads non conservés
+  const isStatic = sameOrigin && url.pathname.startsWith('/static/') && !url.pathname.startsWith('/static/uploads/');
+  if (isStatic || PRECACHE_MANIFEST.urls.includes(request.url)) {
+    event.respondWith(
+      caches.match(request).then(cached => {
+        if (cached) {
+          return cached;
         }
-        
-        return fetch(event.request).then(
-          response => {
-            if (!response || response.status !== 200 || response.type !== 'basic') {
-              return response;
-            }
-            
+        return fetch(request).then(response => {
+          if (response && response.status === 200 && response.type === 'basic') {
             const responseToCache = response.clone();
-            
-            caches.open(CACHE_NAME)
-              .then(cache => {
-                cache.put(event.request, responseToCache);
-              });
-            
-            return response;
+            caches.open(CACHE_NAME).then(cache => cache.put(request, responseToCache));
           }
-        );
-      })
-      .catch(() => {
-        if (event.request.destination === 'document') {
-          return caches.match('/');
-        }
+          return response;
+        });
       })
-  );
-});
-
-self.addEventListener('activate', event => {
-  const cacheWhitelist = [CACHE_NAME];
-  event.waitUntil(
-    caches.keys().then(cacheNames => {
-      return Promise.all(
-        cacheNames.map(cacheName => {
-          if (cacheWhitelist.indexOf(cacheName) === -1) {
-            return caches.delete(cacheName);
-          }
-        })
-      );
-    })
-  );
+    );
+  }
 });
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shabaka Syndic - Solution complète et digitale pour les syndics et résidents au Maroc.
+
+Configuration gunicorn de production :
+
+    gunicorn -c gunicorn.conf.py main:app
+
+Workers gevent (GUNICORN_WORKER_CONNECTIONS connexions chacun), par défaut
+tant que le direct des AG est actif, ou gthread (GUNICORN_THREADS threads,
+application préchargée dans le processus maître : mémoire partagée par copie
+à l'écriture), pool de connexions recréé dans chaque worker et arrêt
+progressif : sur SIGTERM, les requêtes en cours ont GUNICORN_GRACEFUL_TIMEOUT
+secondes pour se terminer.
+
+Shabaka Syndic
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+"""
+
+import os
+import sys
+
+from backend.config import config as app_configs, web_concurrency, worker_class as default_worker_class, \
+    worker_concurrency
+
+
+bind = os.getenv('GUNICORN_BIND', f"0.0.0.0:{os.getenv('PORT', 5000)}")
+
+# Modèle de workers : 'gevent' (par défaut, flux en direct des AG ; paquets gevent et psycogreen
+# requis) ou 'gthread' (par défaut avec LIVE_EVENTS_BROKER=none)
+worker_class = default_worker_class()
+workers = web_concurrency()
+if worker_class == 'gevent':
+    worker_connections = worker_concurrency()
+else:
+    threads = worker_concurrency()
+
+# gevent doit patcher la bibliothèque standard avant l'import de l'application
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() == 'true' and worker_class != 'gevent'
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 60))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+
+# Recyclage des workers (fuites mémoire éventuelles) ; la gigue évite les redémarrages simultanés
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = max_requests // 10
+
+# Derrière nginx : X-Forwarded-* acceptés depuis le proxy local
+forwarded_allow_ips = os.getenv('FORWARDED_ALLOW_IPS', '127.0.0.1')
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
+
+
+def _dispose_engine(close):
+    """Abandonne (close=False) ou ferme les connexions du pool SQLAlchemy"""
+    from main import app
+    from backend.models import db
+
+    with app.app_context():
+        db.engine.dispose(close=close)
+
+
+def on_starting(server):
+    """Refuse une configuration où les événements en direct ne franchiraient pas les workers"""
+    settings = app_configs.get(os.getenv('FLASK_ENV', 'development'), app_configs['default'])
+    broker = settings.LIVE_EVENTS_BROKER
+    if broker == 'memory' and workers > 1:
+        server.log.error("LIVE_EVENTS_BROKER=memory avec %d workers : les événements en direct des AG "
+                         "n'atteindraient que les clients du même worker. Utilisez LIVE_EVENTS_BROKER=redis "
+                         "ou WEB_CONCURRENCY=1.", workers)
+        sys.exit(1)
+    if broker == 'redis':
+        try:
+            import redis  # noqa: F401
+        except ImportError:
+            server.log.error("LIVE_EVENTS_BROKER=redis nécessite le paquet redis (pip install redis)")
+            sys.exit(1)
+
+
+def when_ready(server):
+    """Résumé de la configuration au démarrage"""
+    concurrency = f'{worker_connections} connexions' if worker_class == 'gevent' else f'{threads} threads'
+    server.log.info("Shabaka Syndic : %d workers %s (%s chacun), préchargement %s",
+                    workers, worker_class, concurrency, 'actif' if preload_app else 'inactif')
+    if preload_app:
+        # Le maître ne sert aucune requête : ses connexions ouvertes au préchargement sont fermées
+        _dispose_engine(close=True)
+
+
+def post_fork(server, worker):
+    """Le worker ne doit pas réutiliser les connexions héritées du maître"""
+    if preload_app:
+        _dispose_engine(close=False)
+
+
+def post_worker_init(worker):
+    """gevent : rend psycopg2 coopératif"""
+    if worker_class != 'gevent':
+        return
+    try:
+        from psycogreen.gevent import patch_psycopg
+    except ImportError:
+        worker.log.warning("psycogreen n'est pas installé : les requêtes SQL bloquent le worker gevent")
+    else:
+        patch_psycopg()
+
+
+def worker_exit(server, worker):
+    """Arrêt du worker : connexions rendues proprement à PostgreSQL"""
+    try:
+        _dispose_engine(close=True)
+    except Exception as e:
+        server.log.warning("Fermeture du pool de connexions impossible: %s", e)
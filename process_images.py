@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shabaka Syndic - Solution complète et digitale pour les syndics et résidents au Maroc.
+
+Génère les variantes (miniature et affichage) des photos en attente puis
+s'arrête. Utile lorsque les workers intégrés sont désactivés
+(IMAGE_WORKERS=0), par exemple depuis une tâche cron.
+
+Shabaka Syndic
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+"""
+
+import sys
+
+
+if __name__ == "__main__":
+    try:
+        from backend.app import app
+        from backend.services.image_pipeline import ImagePipeline
+
+        with app.app_context():
+            count = ImagePipeline.drain(app.config)
+
+        print(f"✅ {count} image(s) traitée(s)")
+
+    except Exception as e:
+        print(f"\n❌ Erreur lors du traitement des images: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shabaka Syndic - Solution complète et digitale pour les syndics et résidents au Maroc.
+
+Supprime du stockage les fichiers uploadés qui ne sont plus référencés
+depuis STORAGE_PURGE_GRACE secondes, ainsi que les objets orphelins
+(upload dont la transaction a été annulée).
+
+Usage:
+    python purge_uploads.py [grace_seconds]
+
+Shabaka Syndic
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+"""
+
+import sys
+
+
+if __name__ == "__main__":
+    try:
+        from backend.app import app
+        from backend.services.file_storage import FileStorage
+
+        grace_seconds = int(sys.argv[1]) if len(sys.argv) > 1 else None
+
+        with app.app_context():
+            print("🧹 Purge des fichiers uploadés sans référence...")
+            result = FileStorage.purge(grace_seconds)
+
+        print(f"✅ {result['released']} fichier(s) libéré(s) ({result['bytes']} octets), "
+              f"{result['orphans']} objet(s) orphelin(s) supprimé(s)")
+
+    except Exception as e:
+        print(f"\n❌ Erreur lors de la purge: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
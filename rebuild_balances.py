@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shabaka Syndic - Solution complète et digitale pour les syndics et résidents au Maroc.
+
+Reconstruit le grand livre des soldes (table unit_balances) à partir des
+distributions de charges et des paiements.
+
+Usage:
+    python rebuild_balances.py [unit_id ...]
+
+Shabaka Syndic
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+"""
+
+import sys
+
+
+if __name__ == "__main__":
+    try:
+        from backend.app import app
+        from backend.models import db
+        from backend.services.ledger_service import LedgerService
+        
+        unit_ids = [int(arg) for arg in sys.argv[1:]] or None
+        
+        with app.app_context():
+            print("📒 Reconstruction des soldes des lots...")
+            count = LedgerService.rebuild(unit_ids)
+            db.session.commit()
+        
+        print(f"✅ {count} solde(s) reconstruit(s)")
+        
+    except Exception as e:
+        print(f"\n❌ Erreur lors de la reconstruction: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
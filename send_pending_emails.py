@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shabaka Syndic - Solution complète et digitale pour les syndics et résidents au Maroc.
+
+Envoie les emails en attente de la file (table email_outbox) puis s'arrête.
+Utile lorsque les workers intégrés sont désactivés (MAIL_WORKERS=0),
+par exemple depuis une tâche cron.
+
+Shabaka Syndic
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+"""
+
+import sys
+
+
+if __name__ == "__main__":
+    try:
+        from backend.app import app
+        from backend.services.email_dispatcher import EmailDispatcher
+        
+        with app.app_context():
+            count = EmailDispatcher.drain(app.config)
+        
+        print(f"✅ {count} email(s) traité(s)")
+        
+    except Exception as e:
+        print(f"\n❌ Erreur lors de l'envoi des emails: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)